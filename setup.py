@@ -14,7 +14,8 @@ setup(name='smc-python',
       packages=find_packages(exclude=["*.tests", "*.tests.*", "tests.*", "tests"]),
       install_requires=[
         'requests>=2.12.0',
-	    'ipaddress'
+	    'ipaddress',
+	    'futures;python_version<"3.0"'
       ],
       include_package_data=True,
       classifiers=[
@@ -0,0 +1,235 @@
+"""
+Archive stores policy snapshots and element exports in a local,
+content-addressed directory. Files are streamed to disk while being hashed
+and stored once per unique SHA-256 digest, so identical snapshots across
+engines or days only consume space once. An index of archived items is
+kept so subsequent runs skip anything that was already archived.
+
+Archive the snapshots of all engines, 4 downloads at a time and limited
+to 5 MB/s in total::
+
+    archive = Archive('/backups/smc', max_workers=4, bandwidth=5 * 1024 ** 2)
+    for result in archive.archive_snapshots(Engine.objects.all()):
+        if result.exception:
+            print(result.item, result.exception)
+
+    print(archive.get(snapshot.href))
+    {'name': 'fw1_snapshot_2017_08_01', 'engine': 'fw1', 'size': 18234,
+     'sha256': '3b5d...', 'archived': 1501600000.0}
+
+Archived files are found in ``<path>/objects/<sha256[:2]>/<sha256>``, use
+:meth:`Archive.path_of` to obtain the path of an archived item.
+
+Element exports can be archived in the same way::
+
+    archive.archive_exports([Engine('fw1'), Engine('fw2')])
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from smc.compat import replace_file
+from smc.api.exceptions import ActionCommandFailed
+from smc.base.concurrency import run_concurrent, RateLimiter
+
+
+class _HashingWriter(object):
+    """
+    File-like writer that hashes content as it is written, optionally
+    limited to a bandwidth shared between writers.
+    """
+    def __init__(self, handle, limiter=None):
+        self.handle = handle
+        self.limiter = limiter
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        if self.limiter is not None:
+            self.limiter.acquire(len(data))
+        self.sha256.update(data)
+        self.size += len(data)
+        self.handle.write(data)
+
+
+def _export(element, writer):
+    task = element.export(filename=writer)
+    if not task:  # Export resource not found for the element
+        raise ActionCommandFailed(
+            'Export is not supported for element: {}'.format(element.name))
+    task.download()
+    if not task.task.success:
+        raise ActionCommandFailed(
+            'Export failed for element: {}, {}'.format(
+                element.name, task.task.last_message))
+
+
+class Archive(object):
+    """
+    Content-addressed archive of snapshots and exports.
+
+    :param str path: directory to store the archive, created if it does
+        not exist
+    :param int max_workers: maximum concurrent downloads
+    :param int bandwidth: optional maximum bytes per second shared by all
+        downloads
+    """
+    def __init__(self, path, max_workers=4, bandwidth=None):
+        self.path = os.path.abspath(path)
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(bandwidth, burst=bandwidth) \
+            if bandwidth else None
+        self._lock = threading.Lock()
+        self._objects = os.path.join(self.path, 'objects')
+        self._index_file = os.path.join(self.path, 'index.json')
+        if not os.path.isdir(self._objects):
+            os.makedirs(self._objects)
+        self._index = {}
+        if os.path.exists(self._index_file):
+            with open(self._index_file) as f:
+                self._index = json.load(f)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, key):
+        """
+        Index entry for an archived item
+
+        :param str key: item key, the href of the snapshot or element
+        :rtype: dict or None
+        """
+        return self._index.get(key)
+
+    def path_of(self, key):
+        """
+        Path to the archived file for the given key
+
+        :param str key: item key, the href of the snapshot or element
+        :rtype: str or None
+        """
+        entry = self._index.get(key)
+        if entry:
+            return self._object_path(entry['sha256'])
+
+    def _object_path(self, digest):
+        return os.path.join(self._objects, digest[:2], digest)
+
+    def save(self):
+        """
+        Write the index to disk. The index is saved after each archive run.
+        It is written to a temporary file which then replaces the index, so
+        an interrupted save leaves the previous index intact.
+
+        :return: None
+        """
+        with self._lock:
+            data = json.dumps(self._index, indent=1, sort_keys=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            replace_file(tmp, self._index_file)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def add(self, key, fetch, **info):
+        """
+        Archive a single item. The fetch callable is provided a file-like
+        object to stream the content to. The item is skipped if the key has
+        already been archived.
+
+        :param str key: unique key for the item
+        :param callable fetch: callable taking a writable file-like object
+        :param info: additional values to store in the index entry
+        :return: index entry
+        :rtype: dict
+        """
+        if key in self._index:
+            return self._index[key]
+        fd, tmp = tempfile.mkstemp(dir=self._objects)
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                writer = _HashingWriter(handle, self.limiter)
+                fetch(writer)
+            digest = writer.sha256.hexdigest()
+            target = self._object_path(digest)
+            with self._lock:
+                if os.path.exists(target):
+                    os.remove(tmp)
+                else:
+                    if not os.path.isdir(os.path.dirname(target)):
+                        os.makedirs(os.path.dirname(target))
+                    shutil.move(tmp, target)
+                entry = dict(info, sha256=digest, size=writer.size,
+                             archived=time.time())
+                self._index[key] = entry
+            return entry
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _run(self, items):
+        """
+        Archive items concurrently. Items are tuples of (object, key,
+        fetch, info) and results are returned with the object as the item.
+        """
+        results = run_concurrent(
+            lambda item: self.add(item[1], item[2], **item[3]),
+            items, self.max_workers)
+        self.save()
+        return [result._replace(item=item[0])
+                for result, item in zip(results, items)]
+
+    def archive_snapshots(self, engines):
+        """
+        Archive all snapshots of the given engines that have not already
+        been archived. Snapshot lists are retrieved concurrently.
+
+        :param list engines: engines to archive snapshots for
+        :raises EngineCommandFailed: failure listing snapshots
+        :return: result for each snapshot that was not already archived,
+            the item is the snapshot
+        :rtype: list(Result)
+        """
+        items = []
+        for result in run_concurrent(
+                lambda engine: list(engine.snapshots), engines,
+                self.max_workers):
+            if result.exception is not None:
+                raise result.exception
+            for snapshot in result.result:
+                if snapshot.href not in self._index:
+                    items.append((
+                        snapshot, snapshot.href,
+                        lambda writer, s=snapshot: s.download(filename=writer),
+                        dict(name=snapshot.name, engine=result.item.name)))
+        return self._run(items)
+
+    def archive_exports(self, elements):
+        """
+        Export and archive the given elements. Elements that have already
+        been archived are skipped, use a new :class:`Archive` path or
+        remove the index entry to archive again.
+
+        Elements that cannot be exported are returned with an
+        :class:`~smc.api.exceptions.ActionCommandFailed` exception.
+
+        :param list elements: elements to export
+        :return: result for each element that was not already archived,
+            the item is the element
+        :rtype: list(Result)
+        """
+        items = [(element, element.href,
+                  lambda writer, e=element: _export(e, writer),
+                  dict(name=element.name, type=element.typeof))
+                 for element in elements if element.href not in self._index]
+        return self._run(items)
+
@@ -0,0 +1,303 @@
+"""
+Dump element definitions to a JSON lines file and load them into another
+(or the same) SMC. Each line holds the type, name and JSON of a single
+element. References to other elements are stored by type and name instead
+of href, so a dump can be loaded into an SMC where the referenced
+elements have different hrefs::
+
+    {"type": "group", "name": "servers", "data": {"element": [
+        {"$ref": ["host", "web1"]}, {"$ref": ["host", "web2"]}], ...}}
+
+References that cannot be resolved when dumping are stored as
+``{"$unresolved": href}``. Elements holding an unresolved reference are
+reported as failed when loading and are not created.
+
+Dump all hosts and groups, retrieving element data concurrently. Lines are
+written as each batch of elements is retrieved::
+
+    from smc.administration.dump import dump_elements, load_elements
+
+    with open('elements.jsonl', 'w') as f:
+        dump_elements(
+            list(Host.objects.all()) + list(Group.objects.all()), f)
+
+Load the dump. Elements are created concurrently in dependency order, so
+referenced elements are created before the elements that reference them.
+References to elements that are not in the dump are resolved by name on
+the target SMC. Elements that already exist are not modified, so an
+interrupted load is resumed by running it again::
+
+    with open('elements.jsonl') as f:
+        result = load_elements(f, max_workers=10)
+    print(len(result.created), len(result.existing))
+    for key, reason in result.failed:
+        print(key, reason)
+
+Use ``dry_run=True`` to see which elements would be created without
+modifying the SMC.
+
+.. note:: Only top level elements are dumped. Sub elements such as engine
+    interfaces or policy rules are not included.
+"""
+import re
+import json
+from collections import namedtuple, OrderedDict
+from smc import session
+from smc.compat import string_types
+from smc.api.web import SMCAPIConnection
+from smc.api.common import SMCRequest, fetch_entry_point
+from smc.api.exceptions import CreateElementFailed, FetchElementFailed, \
+    SMCOperationFailure, UnsupportedEntryPoint
+from smc.base.collection import hydrate
+from smc.base.concurrency import run_concurrent
+from smc.base.model import LoadElement
+
+
+#: Result of a load. created and existing are lists of (type, name),
+#: failed is a list of ((type, name), reason)
+LoadResult = namedtuple('LoadResult', 'created existing failed')
+
+#: Fields set by the SMC that are not used when creating an element
+SERVER_FIELDS = frozenset(['link', 'key', 'system_key', 'read_only',
+                           'system'])
+
+_element_href = re.compile(r'^https?://.+/elements/([^/]+)/([^/]+)$')
+
+
+def _walk(data, func):
+    """
+    Return a copy of data with func applied to every value that is not a
+    list or dict. Dicts returned by func replace the value.
+    """
+    if isinstance(data, dict):
+        return {k: _walk(v, func) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_walk(v, func) for v in data]
+    return func(data)
+
+
+def _hrefs(data):
+    found = set()
+    def collect(value):
+        if isinstance(value, string_types) and _element_href.match(value):
+            found.add(value)
+        return value
+    _walk(data, collect)
+    return found
+
+
+def _unresolved(data):
+    """
+    Source hrefs of references that could not be resolved when dumping
+    """
+    if isinstance(data, dict):
+        if '$unresolved' in data:
+            return set([data['$unresolved']])
+        data = list(data.values())
+    if isinstance(data, list):
+        return set().union(*[_unresolved(v) for v in data])
+    return set()
+
+
+def _references(data):
+    if isinstance(data, dict):
+        if '$ref' in data:
+            return set([tuple(data['$ref'])])
+        data = list(data.values())
+    if isinstance(data, list):
+        return set().union(*[_references(v) for v in data])
+    return set()
+
+
+def _substitute(data, refs):
+    """
+    Replace $ref values using refs, a dict of (type, name) -> href.
+    Raise KeyError if a reference is not found.
+    """
+    if isinstance(data, dict):
+        if '$ref' in data:
+            return refs[tuple(data['$ref'])]
+        return {k: _substitute(v, refs) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_substitute(v, refs) for v in data]
+    return data
+
+
+def dump_elements(elements, fp, max_workers=10, batch_size=500):
+    """
+    Write element definitions to a file object, one JSON document per
+    line. Element data is retrieved concurrently in batches and the names
+    of referenced elements that are not being dumped are retrieved
+    concurrently.
+
+    :param list elements: elements to dump
+    :param fp: writable file object
+    :param int max_workers: maximum concurrent requests
+    :param int batch_size: number of elements retrieved before being
+        written
+    :return: number of elements written
+    :rtype: int
+    """
+    elements = list(elements)
+    names = {element.href: (element.typeof, element.name)
+             for element in elements}
+    count = 0
+    for start in range(0, len(elements), batch_size):
+        batch = hydrate(elements[start:start + batch_size], max_workers)
+        unknown = set()
+        for element in batch:
+            unknown.update(_hrefs(element.data))
+        unknown.difference_update(names)
+        for result in run_concurrent(LoadElement, unknown, max_workers):
+            typeof = _element_href.match(result.item).group(1)
+            if result.exception is None:
+                names[result.item] = (typeof, result.result.get('name'))
+            else:
+                names[result.item] = None
+
+        for element in batch:
+            data = {k: v for k, v in element.data.items()
+                    if k not in SERVER_FIELDS}
+            data = _walk(data, lambda value: _reference(names, value))
+            fp.write(json.dumps({'type': element.typeof,
+                                 'name': element.name,
+                                 'data': data}, sort_keys=True))
+            fp.write('\n')
+            count += 1
+    return count
+
+
+def _reference(names, value):
+    """
+    Reference to store in place of an element href. Hrefs of elements that
+    could not be retrieved are marked unresolved.
+    """
+    if names.get(value):
+        return {'$ref': list(names[value])}
+    if value in names:
+        return {'$unresolved': value}
+    return value
+
+
+def _listing(typeof):
+    """
+    Listing of the elements of a type. A type that is not available on
+    the SMC has no elements, any other failure is raised.
+    """
+    try:
+        result = session.connection.send_request(
+            SMCAPIConnection.GET, SMCRequest(href=fetch_entry_point(typeof)))
+    except UnsupportedEntryPoint:
+        return []
+    except SMCOperationFailure as e:
+        if e.code == 404:
+            return []
+        raise FetchElementFailed('Listing {} failed: {}'.format(
+            typeof, e.smcresult.msg))
+    return result.json or []
+
+
+def _existing(types, max_workers):
+    """
+    Names and hrefs of existing elements of the given types, using one
+    listing per type.
+
+    :raises FetchElementFailed: a listing failed
+    """
+    existing = {}
+    for result in run_concurrent(_listing, types, max_workers):
+        if result.exception is not None:
+            raise result.exception
+        for item in result.result:
+            existing[(result.item, item.get('name'))] = item.get('href')
+    return existing
+
+
+def _create(typeof, data):
+    result = SMCRequest(
+        href=fetch_entry_point(typeof), json=data).create()
+    if result.msg:
+        raise CreateElementFailed(result.msg)
+    return result.href
+
+
+def load_elements(fp, max_workers=10, dry_run=False):
+    """
+    Create the elements from a file written by :func:`dump_elements`.
+    Existing elements, found by type and name, are skipped. Elements are
+    created in waves, where each wave only contains elements whose
+    references already exist. Elements are not attempted if a referenced
+    element could not be found or created, or was not resolved when the
+    dump was written.
+
+    :param fp: file object, or iterable of lines
+    :param int max_workers: maximum concurrent requests
+    :param bool dry_run: only determine which elements would be created
+    :raises FetchElementFailed: existing elements could not be listed
+    :return: created, existing and failed elements
+    :rtype: LoadResult
+    """
+    records = OrderedDict()
+    for line in fp:
+        if line.strip():
+            record = json.loads(line)
+            records[(record['type'], record['name'])] = record['data']
+
+    depends = {key: _references(data) - set([key])
+               for key, data in records.items()}
+    types = set(key[0] for key in records)
+    for refs in depends.values():
+        types.update(ref[0] for ref in refs)
+    refs = _existing(types, max_workers)
+
+    existing = [key for key in records if key in refs]
+    failed = {}
+    pending = {}
+    for key, deps in depends.items():
+        if key in refs:
+            continue
+        unresolved = _unresolved(records[key])
+        missing = [ref for ref in deps if ref not in refs and
+                   ref not in records]
+        if unresolved:
+            failed[key] = 'Reference not resolved when dumped: {}'.format(
+                ', '.join(sorted(unresolved)))
+        elif missing:
+            failed[key] = 'Reference not found: {}'.format(
+                ', '.join('{}/{}'.format(*ref) for ref in missing))
+        else:
+            pending[key] = set(ref for ref in deps if ref not in refs)
+
+    created = []
+    while pending:
+        # Anything referencing an element that failed is not attempted
+        for key, deps in list(pending.items()):
+            blocked = [ref for ref in deps if ref in failed]
+            if blocked:
+                failed[key] = 'Reference failed: {}'.format(
+                    ', '.join('{}/{}'.format(*ref) for ref in blocked))
+                del pending[key]
+        wave = [key for key, deps in pending.items() if not deps]
+        if not wave:
+            for key in pending:
+                failed[key] = 'Circular reference'
+            break
+        if dry_run:
+            results = [(key, None, None) for key in wave]
+        else:
+            results = [(r.item, r.result, r.exception) for r in run_concurrent(
+                lambda key: _create(key[0], _substitute(records[key], refs)),
+                wave, max_workers)]
+        for key, href, exception in results:
+            if exception is not None:
+                failed[key] = exception
+            else:
+                refs[key] = href
+                created.append(key)
+            del pending[key]
+        for deps in pending.values():
+            deps.difference_update(wave)
+
+    return LoadResult(created, existing, [(key, failed[key])
+                                          for key in records
+                                          if key in failed])
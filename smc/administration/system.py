@@ -19,7 +19,7 @@ To load the configuration for system, do::
 
 """
 import smc.actions.search as search
-from smc.elements.other import prepare_blacklist
+from smc.elements.other import prepare_blacklist, send_blacklist
 from smc.base.model import SubElement
 from smc.administration.updates import EngineUpgrade, UpdatePackage
 from smc.administration.license import Licenses
@@ -137,6 +137,21 @@ class System(SubElement):
             resource='blacklist',
             json=prepare_blacklist(src, dst, duration, **kw))
 
+    def blacklist_bulk(self, blacklist, batch_size=500, limiter=None):
+        """
+        Add multiple global blacklist entries. Entries are sent in as few
+        requests as the SMC version allows.
+
+        :param Blacklist blacklist: :class:`smc.elements.other.Blacklist`
+            entries
+        :param int batch_size: maximum entries per request
+        :param RateLimiter limiter: optional rate limiter shared between
+            requests
+        :raises ActionCommandFailed: blacklist apply failed with reason
+        :return: None
+        """
+        send_blacklist(self, blacklist, batch_size, limiter)
+
     @property
     def licenses(self):
         """
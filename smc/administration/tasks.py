@@ -15,16 +15,41 @@ An example of using a task poller when uploading an engine policy
         print("Task Progress {}%".format(poller.task.progress))
     print(poller.message())
 
+Pollers waiting for a task to finish do not run their own thread, all
+running tasks are tracked by a single shared :class:`TaskMonitor`.
+Completed pollers are resolved and their done callbacks run on a small
+pool of completion threads, not the thread polling the tasks. A callback
+can start and wait on another task, but callbacks that block for a long
+time delay the callbacks of other tasks once all completion threads are
+busy.
+
+How often a task is polled and how long to wait for it is controlled by
+a polling strategy from :py:mod:`smc.base.polling`. For example, to poll
+based on the estimated time to completion and give up after 5 minutes::
+
+    poller = engine.refresh(
+        wait_for_finish=True, polling=ProgressEstimate(deadline=300))
+    poller.wait()
+    print(poller.stats.report(poller.task))
+
 """
 import re
+import logging
 import time
+import heapq
+import itertools
 import threading
+from concurrent.futures import ThreadPoolExecutor, Future,\
+    wait as futures_wait
 from smc.base.mixins import SMCCommand
 from smc.base.model import SimpleElement, Element
 from smc.api.exceptions import TaskRunFailed, ActionCommandFailed,\
     ResourceNotFound
 from smc.base.collection import Search
 from smc.base.util import millis_to_utc
+from smc.base.polling import PollStats, FixedInterval
+
+logger = logging.getLogger(__name__)
 
 
 clean_html = re.compile(r'<.*?>')
@@ -33,12 +58,89 @@ clean_html = re.compile(r'<.*?>')
 def TaskHistory():
     """
     Task history retrieves a list of tasks in an event queue.
+    Task details are retrieved concurrently, use :func:`task_history`
+    to filter tasks and iterate results as they are retrieved.
     
     :return: list of task events
     :rtype: Task
     """
+    return list(task_history())
+
+
+def _task_matches(task, state, typeof, since, until):
+    if state == 'running' and not task.in_progress:
+        return False
+    if state == 'success' and (task.in_progress or not task.success):
+        return False
+    if state == 'failed' and (task.in_progress or task.success):
+        return False
+    if typeof is not None and task.type != typeof:
+        return False
+    if since is not None or until is not None:
+        start_time = task.start_time
+        if start_time is None:
+            return False
+        if since is not None and start_time < since:
+            return False
+        if until is not None and start_time > until:
+            return False
+    return True
+
+
+def task_history(filter=None, state=None, typeof=None, since=None,  # @ReservedAssignment
+                 until=None, keep=None, max_workers=10, batch_size=50):
+    """
+    Iterate task history. Task events are listed in a single request,
+    optionally filtered on the SMC by name. Task details are then retrieved
+    concurrently, in batches, only for events that are kept and matching
+    tasks are yielded as each batch completes.
+    
+    Find running policy uploads for a specific engine::
+    
+        for task in task_history('myfirewall', state='running'):
+            print(task.last_message, task.progress)
+    
+    The ``state``, ``typeof``, ``since`` and ``until`` filters are applied
+    to task details, so one request is made per event that is not
+    excluded by ``filter`` or ``keep``. On a busy SMC, searching the full
+    history for running tasks costs one request per history event.
+    Narrow the events on their name first using ``filter``, or discard
+    events before any details are retrieved by providing ``keep``, a
+    callable taking the :class:`TaskProgress` event::
+    
+        task_history(state='running',
+                     keep=lambda event: 'Upload' in event.name)
+    
+    :param str filter: text to match on the SMC against the event name
+    :param str state: only tasks in state 'running', 'success' or 'failed'
+    :param str typeof: only tasks of this type
+    :param datetime since: only tasks started at or after this time (UTC)
+    :param datetime until: only tasks started at or before this time (UTC)
+    :param callable keep: only retrieve details for events where this
+        callable returns True
+    :param int max_workers: maximum concurrent requests
+    :param int batch_size: number of events retrieved per batch
+    :rtype: generator(Task)
+    """
+    if state not in (None, 'running', 'success', 'failed'):
+        raise ValueError(
+            'State is invalid. Valid options are: running, success, failed')
     events = Search.objects.entry_point('task_progress')
-    return [event.task for event in events]
+    if filter:
+        events = events.filter(filter)
+    if keep is not None:
+        events = (event for event in events if keep(event))
+    else:
+        events = iter(events)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            batch = list(itertools.islice(events, batch_size))
+            if not batch:
+                return
+            for task in executor.map(lambda event: event.task, batch):
+                if _task_matches(task, state, typeof, since, until):
+                    yield task
         
 
 class TaskProgress(Element):
@@ -195,74 +297,213 @@ class Task(SMCCommand):
             self.__class__.__name__, self.type)
 
 
-class TaskOperationPoller(object):
+class TaskMonitor(object):
     """
-    Task Operation Poller provides a way to poll the SMC
-    for the status of the task operation.
+    Task monitor tracks all running tasks that are waiting for completion
+    using a single scheduler thread. Tasks that are due for a status update
+    are polled in batches using a small bounded pool of workers, so the
+    number of threads does not grow with the number of tasks.
+
+    The interval between polls of each task is decided by the polling
+    strategy of the poller, see :py:mod:`smc.base.polling`.
+
+    Pollers that finish are completed, and their done callbacks run, on a
+    separate pool of completion workers so a slow callback does not stop
+    the polling of other tasks.
+
+    A shared monitor is used by :class:`TaskOperationPoller`. It is not
+    typically required to interact with the monitor directly.
+
+    :param int max_workers: maximum concurrent status requests
+    :param int completion_workers: maximum concurrent poller completions
+        and done callbacks
     """
-    def __init__(self, task, timeout=5, max_tries=36,
-                 wait_for_finish=False):
-        self._task = Task(task)
+    def __init__(self, max_workers=10, completion_workers=4):
+        self.max_workers = max_workers
+        self.completion_workers = completion_workers
+        self._queue = []  # heap of (next poll time, seq, poller)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
         self._thread = None
-        self._done = None
-        self._exception = None
-        self.callbacks = [] # Call after operation completes
-        if wait_for_finish:
-            self._max_tries = max_tries
-            self._timeout = timeout
-            self._done = threading.Event()
-            self._thread = threading.Thread(
-                target=self._start)
-            self._thread.daemon = True
-            self._thread.start()
-
-    def _start(self):
-        while not self.finished():
-            try:
-                time.sleep(self._timeout)
-                self._task = self._task.update_status()
-                self._max_tries -= 1
-            except Exception as e:
-                self._exception = e
-                break
-
-        self._done.set()
-        for call in self.callbacks:
-            call(self.task)
+        self._executor = None
+        self._completer = ThreadPoolExecutor(max_workers=completion_workers)
 
-    def finished(self):
-        return self._done.is_set() or not self._task.in_progress or \
-            self._max_tries == 0
+    def __len__(self):
+        with self._cond:
+            return len(self._queue)
 
-    def add_done_callback(self, callback):
+    def register(self, poller):
         """
-        Add a callback to run after the task completes.
-        The callable must take 1 argument which will be
-        the completed Task.
+        Track the task of the given poller until it completes.
 
-        :param callable callback
+        :param TaskOperationPoller poller: poller to track
+        :return: None
+        """
+        with self._cond:
+            poller._polling.schedule(poller.stats)
+            self._schedule(poller)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _schedule(self, poller):
+        heapq.heappush(self._queue, (
+            time.time() + poller.stats.interval, next(self._seq), poller))
+        self._cond.notify()
+
+    def _due(self):
+        """
+        Block until at least one task is due and return all due tasks
+        """
+        with self._cond:
+            while True:
+                now = time.time()
+                if self._queue and self._queue[0][0] <= now:
+                    due = []
+                    while self._queue and self._queue[0][0] <= now:
+                        due.append(heapq.heappop(self._queue)[2])
+                    return due
+                timeout = self._queue[0][0] - now if self._queue else None
+                self._cond.wait(timeout)
+
+    def _run(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        while True:
+            due = []
+            for poller in self._due():
+                if poller.finished():
+                    self._completer.submit(poller._complete)
+                else:
+                    due.append(poller)
+            for poller, finished in zip(
+                    due, self._executor.map(self._poll, due)):
+                if finished:
+                    self._completer.submit(poller._complete)
+                else:
+                    with self._cond:
+                        self._schedule(poller)
+
+    def _poll(self, poller):
+        """
+        Update the task status. Return True if the poller is finished.
         """
-        if self._done is None or self._done.is_set():
-            raise ValueError('Task has already finished')
-        if callable(callback):
-            self.callbacks.append(callback)
+        try:
+            poller._task = poller._task.update_status()
+        except Exception as e:
+            poller._error = e
+            return True
+        poller.stats.record(poller._task.progress)
+        if poller.finished():
+            return True
+        poller._polling.schedule(poller.stats)
+        return False
+
+    def remove(self, poller):
+        """
+        Stop tracking the task for the given poller
+
+        :param TaskOperationPoller poller: poller to remove
+        :return: None
+        """
+        with self._cond:
+            for i, entry in enumerate(self._queue):
+                if entry[2] is poller:
+                    self._queue.pop(i)
+                    heapq.heapify(self._queue)
+                    break
+
+
+#: Task monitor shared by all task pollers
+task_monitor = TaskMonitor()
+
+
+class TaskOperationPoller(Future):
+    """
+    Task Operation Poller provides a way to poll the SMC
+    for the status of the task operation. When ``wait_for_finish``
+    is set, the task is tracked by the shared :class:`TaskMonitor`
+    until it completes.
+
+    A poller is a :class:`concurrent.futures.Future` whose result is the
+    completed :class:`Task`, so many tasks can be orchestrated using
+    standard tooling without a thread per task::
+
+        pollers = [engine.refresh(wait_for_finish=True) for engine in engines]
+        for poller in concurrent.futures.as_completed(pollers):
+            print(poller.result().last_message)
+
+    Or from asyncio::
+
+        task = await asyncio.wrap_future(engine.upload(wait_for_finish=True))
+
+    If ``wait_for_finish`` is False, the poller is already done and the
+    result is the task as returned when the operation was started.
+
+    Time spent polling is available from :attr:`stats`.
+
+    .. versionchanged:: 0.5.6
+        Callbacks added with :meth:`add_done_callback` receive the poller
+        (future) instead of the Task, obtain the task using ``result()``
+        or the ``task`` attribute. Callbacks run on a completion thread of
+        the :class:`TaskMonitor` shared by all pollers, avoid blocking in
+        callbacks for long periods.
+
+    :param dict task: task json returned from the operation
+    :param int timeout: seconds between status updates. Used by the default
+        polling strategy
+    :param int max_tries: maximum number of status updates before
+        no longer tracking the task. Used by the default polling strategy
+    :param bool wait_for_finish: track the task until it is complete
+    :param PollingStrategy polling: strategy from :py:mod:`smc.base.polling`
+        to use instead of the default
+    """
+    def __init__(self, task, timeout=5, max_tries=36,
+                 wait_for_finish=False, polling=None):
+        super(TaskOperationPoller, self).__init__()
+        self._task = Task(task)
+        self._error = None
+        self._polling = polling or FixedInterval(timeout, max_tries=max_tries)
+        self.stats = PollStats()
+        if wait_for_finish and not self.finished():
+            task_monitor.register(self)
+        else:
+            self._complete()
+
+    def _complete(self):
+        with self._condition:
+            if self.done():
+                return
+            self.stats.done()
+            if self._error is not None:
+                self.set_exception(self._error)
+            else:
+                self.set_result(self._task)
+
+    def finished(self):
+        return self.done() or not self._task.in_progress or \
+            self._error is not None or self._polling.expired(self.stats)
 
     def result(self, timeout=None):
         """
-        Return the current Task after waiting for timeout
+        Return the Task after waiting for timeout. Unlike a standard
+        future, the current Task is returned if the task has not
+        completed within the timeout.
 
+        :raises TaskRunFailed: failure obtaining task status
         :rtype: Task
         """
         self.wait(timeout)
+        if self.done():
+            return super(TaskOperationPoller, self).result(0)
         return self._task
 
     def wait(self, timeout=None):
         """
         Blocking wait for task status.
         """
-        if self._thread is None:
-            return
-        self._thread.join(timeout=timeout)
+        futures_wait([self], timeout)
 
     def last_message(self, timeout=5):
         """
@@ -271,17 +512,19 @@ class TaskOperationPoller(object):
 
         :rtype: str
         """
-        if self._thread is not None:
-            self._thread.join(timeout=timeout)
+        self.wait(timeout)
         return self._task.last_message
 
-    def done(self):
+    def cancel(self):
         """
-        Is the task done yet
+        Stop tracking the task. This does not abort the task on the SMC,
+        use ``task.abort()`` to abort the running task.
 
+        :return: True if the poller was cancelled
         :rtype: bool
         """
-        return self._thread is None or not self._thread.isAlive()
+        task_monitor.remove(self)
+        return super(TaskOperationPoller, self).cancel()
 
     @property
     def task(self):
@@ -294,33 +537,81 @@ class TaskOperationPoller(object):
 
     def stop(self):
         """
-        Stop the running task
+        Stop tracking the task and complete the poller with the
+        current task status
         """
-        if self._thread is not None and self._thread.isAlive():
-            self._done.set()
+        if not self.done():
+            task_monitor.remove(self)
+            self._complete()
+
+
+#: Executor used by download tasks to retrieve files once the task completes
+_download_executor = ThreadPoolExecutor(max_workers=4)
 
 
 class DownloadTask(TaskOperationPoller):
     """
     A download task handles tasks that have files assocaited, for example
     exporting an element to a specified file.
+
+    The file is downloaded in the background once the task completes, the
+    download task is done after the file has been retrieved::
+
+        task = engine.export(filename='export.zip')
+        task.wait()
+        print(task.filename)
+
+    .. versionchanged:: 0.5.6
+        Creating a download task no longer blocks until the download
+        completes. Use :meth:`download` or ``wait`` to block.
+
+    :param filename: name of file, or a file-like object opened for
+        writing in binary mode
+    :param dict task: task json returned from the operation
     """
     def __init__(self, filename, task, **kw):
-        super(DownloadTask, self).__init__(task, wait_for_finish=True, **kw)
         self.type = 'download_task'
         self.filename = filename
+        self._downloading = False
+        super(DownloadTask, self).__init__(task, wait_for_finish=True, **kw)
 
-        self.download(None)
-
-    def download(self, timeout):
-        self.wait(timeout)
+    def _complete(self):
+        with self._condition:
+            if self.done() or self._downloading:
+                return
+            if self._error is None and self._task.in_progress:
+                self._error = TaskRunFailed(
+                    'Task did not finish, file was not downloaded: {}'
+                    .format(self._task.last_message))
+            if self._error is not None:
+                return super(DownloadTask, self)._complete()
+            self._downloading = True
+        _download_executor.submit(self._download)
+
+    def _download(self):
         try:
             location = self.task._request(
                 ActionCommandFailed,
                 href=self.task.result_url,
                 filename=self.filename).read()
             self.filename = location.content
-    
         except IOError as io:
-            raise TaskRunFailed(
+            self._error = TaskRunFailed(
                 'Export task failed with message: {}'.format(io))
+        except Exception as e:
+            self._error = e
+        with self._condition:
+            self._downloading = False
+            super(DownloadTask, self)._complete()
+
+    def download(self, timeout=None):
+        """
+        Wait for the task to complete and the file to be downloaded.
+
+        :param int timeout: seconds to wait, or None to wait until done
+        :raises TaskRunFailed: export task failed, or stopped tracking the
+            task before it finished
+        :return: filename or file-like object written to
+        """
+        self.result(timeout)
+        return self.filename
@@ -14,7 +14,7 @@ class PackageMixin(object):
     """
 
     def download(self, timeout=5,
-                 wait_for_finish=False):
+                 wait_for_finish=False, **kw):
         """
         Download Package or Engine Update
 
@@ -28,7 +28,7 @@ class PackageMixin(object):
         
             return TaskOperationPoller(
                 task=task, timeout=timeout,
-                wait_for_finish=wait_for_finish)
+                wait_for_finish=wait_for_finish, **kw)
 
         except ResourceNotFound:
             raise ActionCommandFailed(
@@ -36,7 +36,7 @@ class PackageMixin(object):
                     self.state))
 
     def activate(self, resource=None, timeout=3,
-                 wait_for_finish=False):
+                 wait_for_finish=False, **kw):
         """
         Activate this package on the SMC
 
@@ -54,7 +54,7 @@ class PackageMixin(object):
 
             return TaskOperationPoller(
                 task=task, timeout=timeout,
-                wait_for_finish=wait_for_finish)
+                wait_for_finish=wait_for_finish, **kw)
 
         except ResourceNotFound:
             raise ActionCommandFailed(
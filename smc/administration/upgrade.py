@@ -0,0 +1,203 @@
+"""
+Upgrade manager distributes dynamic update packages and engine upgrades.
+The package is downloaded to the SMC once, then:
+
+* an :class:`~smc.administration.updates.UpdatePackage` is activated on the
+  SMC and optionally a policy refresh is rolled out to engines so they
+  receive the new package
+* an :class:`~smc.administration.updates.EngineUpgrade` is activated on
+  the nodes of each engine in waves using :class:`smc.core.rollout.Rollout`,
+  with health gates on each node after the upgrade
+
+All tasks are tracked by the shared task monitor, no thread is created per
+engine.
+
+Upgrade engines 5 at a time, starting with one canary engine, and require
+each node to be back online within 20 minutes::
+
+    upgrade = next(u for u in system.engine_upgrade()
+                   if u.version == '6.2.1')
+    manager = UpgradeManager(
+        upgrade, engines, concurrency=5, canary=1,
+        health_status='Online', health_timeout=1200)
+    report = manager.run()
+
+    print(report.duration, report.rollout.succeeded, report.rollout.failed)
+    for step in report.critical_path():
+        print(step)
+
+The critical path lists the steps that determined the total duration:
+downloading and activating the package, then the slowest engine of each
+wave, since each wave waits for it's slowest engine before the next wave
+starts.
+"""
+import time
+import logging
+from collections import namedtuple
+from smc.api.exceptions import TaskRunFailed
+from smc.base.polling import ExponentialBackoff
+from smc.administration.updates import EngineUpgrade
+from smc.core.rollout import Rollout
+
+logger = logging.getLogger(__name__)
+
+
+#: Step of the critical path
+Step = namedtuple('Step', 'phase name started duration')
+
+
+class UpgradeReport(object):
+    """
+    Report of an upgrade run.
+
+    :ivar dict phases: phase name -> (started, duration) for the download
+        and activation phases
+    :ivar RolloutReport rollout: engine rollout report, or None if no
+        engines were rolled out
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.finished = None
+        self.phases = {}
+        self.rollout = None
+
+    @property
+    def duration(self):
+        return (self.finished or time.time()) - self.started
+
+    def engine_durations(self):
+        """
+        Duration of each engine in the rollout
+
+        :return: list of (engine name, duration), slowest first
+        :rtype: list(tuple)
+        """
+        if self.rollout is None:
+            return []
+        durations = [(engine.name, engine.duration)
+                     for engine in self.rollout if engine.duration]
+        return sorted(durations, key=lambda d: d[1], reverse=True)
+
+    def critical_path(self):
+        """
+        Steps that determined the total duration of the upgrade, in order.
+        For each wave, the duration of the wave step is the time from the
+        first engine starting until the slowest engine completed, which
+        includes any time engines waited for a concurrency slot.
+
+        :rtype: list(Step)
+        """
+        path = [Step(phase, phase, started, duration)
+                for phase, (started, duration) in sorted(
+                    self.phases.items(), key=lambda p: p[1][0])]
+        if self.rollout is not None:
+            waves = {}
+            for engine in self.rollout:
+                if engine.started and engine.finished:
+                    waves.setdefault(engine.wave, []).append(engine)
+            for wave in sorted(waves):
+                engines = waves[wave]
+                started = min(engine.started for engine in engines)
+                slowest = max(engines, key=lambda engine: engine.finished)
+                path.append(Step(
+                    'wave {}'.format(wave), slowest.name, started,
+                    slowest.finished - started))
+        return path
+
+
+class UpgradeManager(object):
+    """
+    Download a package once, activate it and roll it out to engines.
+
+    :param package: package to distribute
+    :type package: UpdatePackage or EngineUpgrade
+    :param list engines: engines to upgrade. For an update package, the
+        policy on these engines is refreshed after activation. Optional
+        for an update package
+    :param int task_timeout: seconds to wait for the download and
+        activation tasks, and for each engine task
+    :param kw: keyword arguments for :class:`smc.core.rollout.Rollout`,
+        such as concurrency, canary, wave_size, failure_threshold,
+        health_status, configuration_status and callback
+    """
+    def __init__(self, package, engines=None, task_timeout=1800, **kw):
+        self.package = package
+        self.engines = list(engines or [])
+        self.task_timeout = task_timeout
+        self.rollout_options = kw
+        self.rollout = None
+
+    def _polling(self):
+        return ExponentialBackoff(
+            initial=1, max_interval=15, deadline=self.task_timeout)
+
+    def _wait(self, poller, phase):
+        task = poller.result()
+        if task.in_progress:
+            task.abort()
+            raise TaskRunFailed('{} timed out after {} seconds'.format(
+                phase, self.task_timeout))
+        if not task.success:
+            raise TaskRunFailed('{} failed: {}'.format(
+                phase, task.last_message))
+        return task
+
+    def download(self):
+        """
+        Download the package to the SMC. A package that was already
+        downloaded no longer provides a download link and is not
+        downloaded again.
+
+        :raises ActionCommandFailed: download could not be started
+        :raises TaskRunFailed: download failed
+        :return: None
+        """
+        if 'download' not in self.package.data.links:
+            logger.info('Skipping download of package %s, no download '
+                        'available, package state: %s',
+                        self.package.name, self.package.state)
+            return
+        self._wait(self.package.download(
+            wait_for_finish=True, polling=self._polling()), 'Download')
+
+    def activate(self):
+        """
+        Activate an update package on the SMC. Engine upgrades are
+        activated per engine during the rollout.
+
+        :raises TaskRunFailed: activation failed
+        :return: None
+        """
+        self._wait(self.package.activate(
+            wait_for_finish=True, polling=self._polling()), 'Activation')
+
+    def _upgrade(self, engine, **kw):
+        return self.package.activate(
+            resource=[node.href for node in engine.nodes], **kw)
+
+    def run(self):
+        """
+        Run the upgrade. This blocks until the rollout completes or
+        fails.
+
+        :raises TaskRunFailed: download or activation failed
+        :rtype: UpgradeReport
+        """
+        report = UpgradeReport()
+        phases = [('download', self.download)]
+        if not isinstance(self.package, EngineUpgrade):
+            phases.append(('activate', self.activate))
+        for phase, func in phases:
+            started = time.time()
+            func()
+            report.phases[phase] = (started, time.time() - started)
+
+        if self.engines:
+            options = dict(self.rollout_options,
+                           task_timeout=self.task_timeout)
+            if isinstance(self.package, EngineUpgrade):
+                options.update(operation=self._upgrade)
+            self.rollout = Rollout(self.engines, **options)
+            report.rollout = self.rollout.run()
+        report.finished = time.time()
+        return report
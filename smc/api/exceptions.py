@@ -316,3 +316,23 @@ class EngineCommandFailed(SMCException):
     thrown if the SMC API responds with any sort of error and wrap the response
     """
     pass
+
+
+class ChangesetFailed(SMCException):
+    """
+    One or more updates in a changeset failed when flushed to the SMC.
+    Updates that failed due to an ETag conflict (the element was modified
+    after it was read) are available in ``conflicts`` and all failures in
+    ``failed``.
+
+    :ivar list results: :class:`smc.base.changeset.ChangeResult` for every
+        update in the changeset
+    """
+    def __init__(self, results):
+        self.results = results
+        self.failed = [r for r in results if r.exception is not None]
+        self.conflicts = [r for r in self.failed if r.conflict]
+        super(ChangesetFailed, self).__init__(
+            '{} of {} updates failed ({} ETag conflicts): {}'.format(
+                len(self.failed), len(results), len(self.conflicts),
+                ', '.join(r.href for r in self.failed)))
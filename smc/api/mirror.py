@@ -0,0 +1,356 @@
+"""
+A mirror is a local SQLite copy of the SMC configuration. It stores the
+JSON of each element by href, together with it's ETag, and the element
+listings of each entry point. Mirrors are useful for read heavy jobs
+such as reporting or rule analysis, which otherwise download the same
+configuration on every run.
+
+Synchronize a mirror from a logged in session. Listings and elements are
+retrieved concurrently and elements that were mirrored before are
+revalidated using their ETag, so unchanged elements are not downloaded
+again::
+
+    from smc import session
+    from smc.api.mirror import Mirror
+
+    session.login(url='http://1.1.1.1:8082', api_key='xxxxx')
+    mirror = Mirror('/var/lib/smc/mirror.db')
+    result = mirror.sync(max_workers=10)
+    print(result.fetched, result.unchanged, result.removed)
+    session.logout()
+
+Only the given entry points can be synchronized::
+
+    mirror.sync(types=['host', 'network', 'fw_policy'])
+
+Resources that are not listed by an entry point, such as the rules of a
+policy, can be added by href::
+
+    mirror.fetch([policy.fw_ipv4_access_rules.href])
+
+The session can then serve read requests from the mirror without
+connecting to the SMC. Elements, collections and searches are used as
+they would be with a live session, but any modification raises
+:class:`~smc.api.exceptions.SMCConnectionError`::
+
+    session.use_mirror('/var/lib/smc/mirror.db')
+    for host in Host.objects.all():
+        print(host.name, host.address)
+
+    session.use_mirror(None)  # Restore the live connection
+
+Searches with a filter are matched against element names in the mirror,
+while the SMC also matches other fields of the element. Requests for
+resources that are not in the mirror raise the same exceptions as if the
+resource did not exist.
+"""
+import json
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+from smc import session
+from smc.api.web import SMCAPIConnection, SMCResult, counters
+from smc.api.common import SMCRequest
+from smc.api.exceptions import SMCOperationFailure, SMCConnectionError,\
+    UnsupportedEntryPoint
+from smc.base.concurrency import run_concurrent
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+
+#: Result of a mirror synchronization. Failed is a list of
+#: :class:`smc.base.concurrency.Result` for resources that could not be
+#: retrieved.
+SyncResult = namedtuple('SyncResult', 'fetched unchanged removed failed')
+
+
+def _key(href, params=None):
+    if params:
+        return '{}?{}'.format(href, urlencode(sorted(
+            (k, v) for k, v in params.items() if v is not None)))
+    return href
+
+
+def _not_found(href):
+    error = SMCOperationFailure()
+    error.code = error.smcresult.code = 404
+    error.smcresult.msg = 'Resource not found in mirror: {}'.format(href)
+    return error
+
+
+class Mirror(object):
+    """
+    Local store of element JSON and ETags, keyed by href.
+
+    :param str path: path of the SQLite database, created if it does not
+        exist
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS resources ('
+            ' key TEXT PRIMARY KEY, etag TEXT, json TEXT, parent TEXT,'
+            ' updated REAL);'
+            'CREATE INDEX IF NOT EXISTS resources_parent'
+            ' ON resources (parent);'
+            'CREATE TABLE IF NOT EXISTS meta ('
+            ' name TEXT PRIMARY KEY, value TEXT);')
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                'SELECT COUNT(*) FROM resources').fetchone()[0]
+
+    def __contains__(self, href):
+        return self.get(href) is not None
+
+    def close(self):
+        """
+        Close the database
+
+        :return: None
+        """
+        with self._lock:
+            self._db.close()
+
+    def get(self, href, params=None):
+        """
+        Stored resource for the href and query parameters
+
+        :param str href: href of the resource
+        :param dict params: query parameters of a listing
+        :return: tuple of (etag, json as str) or None if not stored
+        :rtype: tuple
+        """
+        with self._lock:
+            return self._db.execute(
+                'SELECT etag, json FROM resources WHERE key = ?',
+                (_key(href, params),)).fetchone()
+
+    def put(self, href, etag, data, parent=None):
+        """
+        Store a resource. The resource replaces any stored resource with
+        the same href.
+
+        :param str href: href of the resource, including query parameters
+        :param str etag: ETag of the resource
+        :param data: json of the resource
+        :param str parent: href of the listing that returned the resource
+        :return: None
+        """
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?)',
+                (href, etag, json.dumps(data), parent, time.time()))
+
+    def _set_meta(self, name, value):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                (name, json.dumps(value)))
+
+    def meta(self, name, default=None):
+        """
+        Stored session information such as url, api_version and
+        entry_points, saved during the last synchronization
+
+        :param str name: name of value
+        :rtype: str, list or None
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _read(self, href, parent=None):
+        """
+        Retrieve a resource from the SMC, revalidating a stored resource
+        with it's ETag. Return True if the resource was downloaded.
+        """
+        stored = self.get(href)
+        request = SMCRequest(href=href)
+        if stored and stored[0]:
+            request.headers.update({'if-none-match': stored[0]})
+        result = session.connection.send_request(
+            SMCAPIConnection.GET, request)
+        if result.code == 304 or (stored and result.etag and
+                                  result.etag == stored[0]):
+            return False
+        self.put(href, result.etag, result.json, parent)
+        return True
+
+    def _prune(self, parent, hrefs):
+        with self._lock:
+            stored = [row[0] for row in self._db.execute(
+                'SELECT key FROM resources WHERE parent = ?', (parent,))]
+            removed = [(key,) for key in stored if key not in hrefs]
+            self._db.executemany(
+                'DELETE FROM resources WHERE key = ?', removed)
+        return len(removed)
+
+    def sync(self, types=None, max_workers=10, rate=None):
+        """
+        Synchronize the mirror with the SMC using the current session.
+        The listing of each entry point is retrieved, then each listed
+        element is retrieved or revalidated. Elements that are no longer
+        listed are removed from the mirror.
+
+        :param list types: entry points to synchronize, for example
+            ['host', 'network']. All element entry points by default
+        :param int max_workers: maximum concurrent requests
+        :param float rate: optional maximum requests per second
+        :raises SMCConnectionError: the session is not logged in to the SMC
+        :rtype: SyncResult
+        """
+        if session.connection is None or \
+                isinstance(session.connection, MirrorConnection):
+            raise SMCConnectionError(
+                'A logged in session is required to synchronize a mirror')
+        self._set_meta('url', session.url)
+        self._set_meta('api_version', session.api_version)
+        self._set_meta('entry_points', session.entry_points.entries)
+
+        if types is None:
+            elements = '{}/{}/elements'.format(session.url,
+                                               session.api_version)
+            types = [entry.rel for entry in session.entry_points
+                     if entry.href.startswith(elements + '/')]
+        hrefs = [session.entry_points.get(typeof) for typeof in types]
+
+        failed, listings = [], []
+        for result in run_concurrent(
+                lambda href: session.connection.send_request(
+                    SMCAPIConnection.GET, SMCRequest(href=href)),
+                hrefs, max_workers, rate):
+            if result.exception is not None:
+                failed.append(result)
+                continue
+            listing = result.result.json or []
+            self.put(result.item, result.result.etag, listing)
+            listings.append((result.item, [item.get('href')
+                                           for item in listing]))
+
+        work = [(href, parent) for parent, items in listings
+                for href in items]
+        results = run_concurrent(
+            lambda item: self._read(*item), work, max_workers, rate)
+        removed = sum(self._prune(parent, set(items))
+                      for parent, items in listings)
+        with self._lock:
+            self._db.commit()
+        result = self._result(results, removed)
+        return result._replace(failed=failed + result.failed)
+
+    @staticmethod
+    def _result(results, removed=0):
+        fetched = sum(1 for result in results if result.result)
+        failed = [result for result in results
+                  if result.exception is not None]
+        return SyncResult(fetched, len(results) - fetched - len(failed),
+                          removed, failed)
+
+    def fetch(self, hrefs, max_workers=10, rate=None):
+        """
+        Add or revalidate resources that are not listed by an entry point,
+        for example the rules of a policy. Added resources are revalidated
+        by :meth:`fetch` only.
+
+        :param list hrefs: hrefs of resources to mirror
+        :param int max_workers: maximum concurrent requests
+        :param float rate: optional maximum requests per second
+        :rtype: SyncResult
+        """
+        results = run_concurrent(self._read, hrefs, max_workers, rate)
+        with self._lock:
+            self._db.commit()
+        return self._result(results)
+
+
+class MirrorConnection(object):
+    """
+    Read only connection serving GET requests from a :class:`Mirror`.
+    Stored resources are kept in memory after their first use.
+    Use :meth:`smc.api.session.Session.use_mirror` to enable.
+
+    :param Mirror mirror: mirror to serve requests from
+    """
+    def __init__(self, mirror):
+        self.mirror = mirror
+        self._cache = {}
+        self._elements = None
+        entry_points = mirror.meta('entry_points') or []
+        for entry in entry_points:
+            if entry.get('rel') == 'elements':
+                self._elements = entry.get('href')
+
+    @property
+    def session(self):
+        return None
+
+    def _lookup(self, key, href, params):
+        if key not in self._cache:
+            self._cache[key] = self.mirror.get(href, params)
+        return self._cache[key]
+
+    def _listing(self, href, params):
+        """
+        Listings with a filter context are served from the listing of the
+        entry point, and search filters are matched against names.
+        """
+        params = dict(params or {})
+        context = params.pop('filter_context', None)
+        search = params.pop('filter', None)
+        exact = params.pop('exact_match', False)
+        limit = params.pop('limit', None)
+        if context and href == self._elements and not params:
+            try:
+                href = session.entry_points.get(context)
+            except UnsupportedEntryPoint:
+                return None
+        elif context or params:
+            return None
+        stored = self._lookup(href, href, None)
+        if stored is None:
+            return None
+        listing = json.loads(stored[1])
+        if search:
+            search = str(search)
+            listing = [item for item in listing
+                       if (item.get('name') == search if exact else
+                           search.lower() in item.get('name', '').lower())]
+        return stored[0], listing[:int(limit)] if limit else listing
+
+    def send_request(self, method, request):
+        """
+        Serve a request from the mirror
+
+        :raises SMCOperationFailure: resource is not in the mirror
+        :raises SMCConnectionError: request is not a read request
+        :rtype: SMCResult
+        """
+        method = method.upper() if method else ''
+        if method != SMCAPIConnection.GET or request.filename:
+            raise SMCConnectionError(
+                'Session is using a read only mirror, {} {} is not '
+                'permitted'.format(method, request.href))
+        key = _key(request.href, request.params)
+        stored = self._lookup(key, request.href, request.params)
+        if stored is None:
+            result = self._listing(request.href, request.params)
+            if result is None:
+                raise _not_found(request.href)
+            etag, data = result
+        else:
+            etag, data = stored[0], json.loads(stored[1])
+        counters.update(cache=1)
+        result = SMCResult()
+        result.code = 200
+        result.etag = etag
+        result.json = data
+        return result
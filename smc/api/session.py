@@ -51,6 +51,9 @@ EntryPoint = collections.namedtuple('EntryPoint', 'href rel')
 class Session(object):
 
     AUTOCOMMIT = False
+    #: Delete elements without an ETag precondition, avoiding a request
+    #: to retrieve the ETag of elements that are not cached
+    UNCONDITIONAL_DELETE = False
     _MODS_LOADED = False
 
     def __init__(self):
@@ -63,6 +66,7 @@ class Session(object):
         self._timeout = 10
         self._domain = 'Shared Domain'
         self._extra_args = {}
+        self._live = None  # Connection state while using a mirror
 
     @property
     def entry_points(self):
@@ -119,6 +123,24 @@ class Session(object):
         """ Logged in domain """
         return self._domain
 
+    def changeset(self, max_workers=10, rate=None):
+        """
+        Open a changeset to record element updates and send them
+        concurrently when the changeset exits. See
+        :py:mod:`smc.base.changeset` for details.
+        ::
+
+            with session.changeset():
+                for host in Host.objects.all():
+                    host.modify_attribute(comment='audited')
+
+        :param int max_workers: maximum concurrent update requests
+        :param float rate: optional maximum update requests per second
+        :rtype: Changeset
+        """
+        from smc.base.changeset import Changeset
+        return Changeset(max_workers, rate)
+
     def login(self, url=None, api_key=None, api_version=None,
               timeout=None, verify=True, alt_filepath=None,
               domain=None, **kwargs):
@@ -212,11 +234,15 @@ class Session(object):
                 'Login succeeded and session retrieved: %s', self.session_id)
 
             self._connection = smc.api.web.SMCAPIConnection(self)
+            self._live = None
         else:
             raise SMCConnectionError(
                 'Login failed, HTTP status code: %s and reason: %s' % (
                     r.status_code, r.reason))
 
+        self._load_modules()
+
+    def _load_modules(self):
         if not self._MODS_LOADED:
             logger.debug('Registering class mappings.')
             # Load the modules to register needed classes
@@ -226,6 +252,41 @@ class Session(object):
 
             self._MODS_LOADED = True
 
+    def use_mirror(self, path):
+        """
+        Serve read requests from a local mirror of the SMC configuration
+        instead of the SMC. A login is not required, and any modification
+        raises SMCConnectionError while the mirror is in use. See
+        :py:mod:`smc.api.mirror` for creating a mirror.
+        ::
+
+            session.use_mirror('/var/lib/smc/mirror.db')
+            print(list(Host.objects.all()))
+
+        :param path: path to the mirror database, a
+            :class:`~smc.api.mirror.Mirror`, or None to restore the
+            previous connection
+        :return: the mirror in use, or None
+        :rtype: Mirror
+        """
+        from smc.api.mirror import Mirror, MirrorConnection
+        if path is None:
+            if self._live is not None:
+                self._connection, self._entry_points, self._url, \
+                    self._api_version = self._live
+                self._live = None
+            return None
+        mirror = path if isinstance(path, Mirror) else Mirror(path)
+        if self._live is None:
+            self._live = (self._connection, self._entry_points, self._url,
+                          self._api_version)
+        self._connection = MirrorConnection(mirror)
+        self._entry_points = _EntryPoint(mirror.meta('entry_points', []))
+        self._url = mirror.meta('url')
+        self._api_version = mirror.meta('api_version')
+        self._load_modules()
+        return mirror
+
     def logout(self):
         """ Logout session from SMC """
         if self.session:
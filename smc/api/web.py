@@ -102,10 +102,13 @@ class SMCAPIConnection(object):
 
                     counters.update(delete=1)
 
-                    # Conflict (409) if ETag is not current
+                    # Conflict (409) if ETag is not current. Use the
+                    # current ETag if returned, otherwise retrieve it
                     if response.status_code in (409,):
-                        req = self.session.get(request.href)
-                        etag = req.headers.get('ETag')
+                        etag = response.headers.get('ETag')
+                        if etag is None:
+                            etag = self.session.get(
+                                request.href).headers.get('ETag')
                         response = self.session.delete(
                             request.href,
                             headers={'if-match': etag})
@@ -136,36 +139,50 @@ class SMCAPIConnection(object):
 
     def file_download(self, request):
         """
-        Called when GET request specifies a filename to retrieve.
+        Called when GET request specifies a filename to retrieve. The
+        filename can also be a file-like object with a ``write`` method,
+        in which case the content is streamed to it and the caller is
+        responsible for closing it.
         """
         logger.debug(vars(request))
         response = self.session.get(
             request.href,
             params=request.params,
             headers=request.headers,
+            timeout=getattr(request, 'timeout', None),
             stream=True)
 
         if response.status_code == 200:
             logger.debug("Streaming to file... Content length: {}"
-                         .format(len(response.content)))
+                         .format(response.headers.get('content-length')))
             try:
-                path = os.path.abspath(request.filename)
-                logger.debug("Operation: {}, saving to file: {}"
-                             .format(request.href, path))
-                with open(path, "wb") as handle:
-                    for chunk in response.iter_content(chunk_size=1024):
-                        if chunk:
-                            handle.write(chunk)
-                            handle.flush()
+                if hasattr(request.filename, 'write'):
+                    path = request.filename
+                    self._stream_to(response, path)
+                else:
+                    path = os.path.abspath(request.filename)
+                    logger.debug("Operation: {}, saving to file: {}"
+                                 .format(request.href, path))
+                    with open(path, "wb") as handle:
+                        self._stream_to(response, handle)
             except IOError as e:
                 raise IOError('Error attempting to save to file: {}'.format(e))
 
-            result = SMCResult(response)
+            # Body is consumed by streaming, only keep the headers
+            result = SMCResult()
+            result.code = response.status_code
+            result.etag = response.headers.get('ETag')
             result.content = path
             return result
         else:
             raise SMCOperationFailure(response)
 
+    @staticmethod
+    def _stream_to(response, handle):
+        for chunk in response.iter_content(chunk_size=65536):
+            if chunk:
+                handle.write(chunk)
+
     def file_upload(self, request):
         """
         Perform a file upload PUT/POST to SMC. Request should have the
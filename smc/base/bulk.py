@@ -0,0 +1,254 @@
+"""
+Bulk operations on many elements.
+
+Delete many elements in dependency order. References to each element are
+retrieved concurrently and elements are deleted in waves, where each wave
+only contains elements that are no longer referenced by another element
+being deleted::
+
+    >>> from smc.base.bulk import bulk_delete
+    >>> result = bulk_delete(Search.objects.unused())
+    >>> len(result.deleted)
+    152
+    >>> for residual in result.residual:
+    ...   print(residual.element, residual.reason)
+    ...
+    Host(name=dns) Referenced by: FirewallPolicy(name=Standard Policy)
+
+Elements that are referenced by an element outside of the set being
+deleted are not attempted, and neither are the elements they reference.
+
+Elements that reference each other in a cycle cannot be ordered. Each
+cycle is attempted as a single wave once nothing outside the cycle
+references it, and the elements of each cycle are returned in
+``result.cycles``.
+
+Create or update many elements of one type. Existing elements are found
+with a single listing instead of a search per record, then only records
+that do not exist or differ from the existing element are sent, using
+concurrent requests. With web1 already existing with address 10.0.0.1::
+
+    >>> records = [{'name': 'web1', 'address': '10.0.0.1'},
+    ...            {'name': 'web2', 'address': '10.0.0.2'}]
+    >>> result = Host.bulk_upsert(records)
+    >>> len(result.created), len(result.updated), len(result.unchanged)
+    (1, 0, 1)
+"""
+import copy
+import itertools
+from collections import namedtuple
+from smc.base.concurrency import run_concurrent
+from smc.base.collection import hydrate
+from smc.base.util import merge_dicts
+
+
+#: Result of a bulk delete. cycles is a list of lists of elements that
+#: referenced each other and were deleted as a group
+DeleteResult = namedtuple('DeleteResult', 'deleted residual cycles')
+
+#: Element that could not be deleted, and why
+Residual = namedtuple('Residual', 'element reason')
+
+#: Result of a bulk upsert. created, updated and unchanged are lists of
+#: elements, failed is a list of (record, exception)
+UpsertResult = namedtuple('UpsertResult', 'created updated unchanged failed')
+
+
+def _strongly_connected(graph):
+    """
+    Strongly connected components of a graph, using an iterative version
+    of Tarjan's algorithm. The graph is a dict of node -> successors,
+    successors that are not in the graph are ignored.
+
+    :rtype: list(set)
+    """
+    index, lowlink = {}, {}
+    stack, on_stack = [], set()
+    counter = itertools.count()
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = next(counter)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in graph:
+                    continue
+                if successor not in index:
+                    index[successor] = lowlink[successor] = next(counter)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(graph[successor])))
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def bulk_delete(elements, max_workers=10, unconditional=None):
+    """
+    Delete elements in dependency order using concurrent waves.
+
+    :param list elements: elements to delete
+    :param int max_workers: maximum concurrent requests
+    :param bool unconditional: delete without an ETag precondition, see
+        :meth:`smc.base.model.ElementBase.delete`
+    :return: deleted elements, residual elements that could not be
+        removed with the reason, and elements that were in cycles
+    :rtype: DeleteResult
+    """
+    targets, order = {}, {}
+    for element in elements:
+        targets.setdefault(element.href, element)
+        order.setdefault(element.href, len(order))
+
+    referrers = {}  # href -> set of hrefs referencing it
+    residual = {}   # href -> Residual
+    for result in run_concurrent(
+            lambda element: element.referenced_by, list(targets.values()),
+            max_workers):
+        href = result.item.href
+        if result.exception is not None:
+            residual[href] = Residual(result.item, result.exception)
+        else:
+            referrers[href] = result.result
+
+    # Elements referenced from outside the set cannot be removed
+    for href, refs in referrers.items():
+        external = [ref for ref in refs if ref.href not in targets]
+        if external:
+            residual[href] = Residual(targets[href], 'Referenced by: {}'
+                                      .format(', '.join(map(str, external))))
+    pending = {href: set(ref.href for ref in refs if ref.href != href)
+               for href, refs in referrers.items() if href not in residual}
+
+    deleted, cycles = [], []
+    while pending:
+        # Anything referenced by an element that cannot be deleted stays
+        for href, refs in list(pending.items()):
+            blocked = [ref for ref in refs if ref in residual]
+            if blocked:
+                residual[href] = Residual(
+                    targets[href], 'Referenced by: {}'.format(', '.join(
+                        str(targets[ref]) for ref in blocked)))
+                del pending[href]
+        wave = [href for href, refs in pending.items() if not refs]
+        if not wave:
+            # Circular references. Attempt each cycle that is only
+            # referenced from within the cycle, the remaining elements
+            # keep waiting for their referrers to be deleted.
+            for component in _strongly_connected(pending):
+                if all(pending[href] <= component for href in component):
+                    component = sorted(component, key=order.get)
+                    cycles.append([targets[href] for href in component])
+                    wave.extend(component)
+        for result in run_concurrent(
+                lambda href: targets[href].delete(unconditional=unconditional),
+                wave, max_workers):
+            href = result.item
+            if result.exception is not None:
+                residual[href] = Residual(targets[href], result.exception)
+            else:
+                deleted.append(targets[href])
+            del pending[href]
+        removed = [href for href in wave if href not in residual]
+        for refs in pending.values():
+            refs.difference_update(removed)
+
+    return DeleteResult(deleted, [residual[href] for href in targets
+                                  if href in residual], cycles)
+
+
+def bulk_upsert(cls, records, key='name', max_workers=10, rate=None):
+    """
+    Create or update elements of the given class from records. Each
+    record is a dict of keyword arguments for the class ``create``
+    method, which are also used to update an existing element, as with
+    :meth:`~smc.base.model.Element.update_or_create`.
+
+    Existing elements are listed once and matched to records by the key
+    attribute. The data of matched elements is retrieved concurrently and
+    compared to the record, and only elements that differ are updated.
+    Each key can only be used by one record.
+
+    :param cls: element class, for example Host
+    :param records: iterable of dicts
+    :param str key: attribute used to match a record to an existing
+        element (default: name)
+    :param int max_workers: maximum concurrent requests
+    :param float rate: optional maximum requests per second
+    :raises ValueError: more than one record has the same key
+    :return: created, updated and unchanged elements and failed records
+    :rtype: UpsertResult
+    """
+    records = [{k: v() if callable(v) else v for k, v in record.items()}
+               for record in records]
+    seen, duplicates = set(), []
+    for record in records:
+        if key in record:
+            if record[key] in seen and record[key] not in duplicates:
+                duplicates.append(record[key])
+            seen.add(record[key])
+    if duplicates:
+        raise ValueError('Records with duplicate {}: {}'.format(
+            key, ', '.join(map(str, duplicates))))
+    elements = list(cls.objects.all())
+    if key != 'name':
+        hydrate(elements, max_workers, rate)
+    existing = {}
+    for element in elements:
+        value = element.name if key == 'name' else element.data.get(key)
+        existing.setdefault(value, element)
+
+    failed, create, matched = [], [], []
+    for record in records:
+        if key not in record:
+            failed.append((record, KeyError(key)))
+        elif record[key] in existing:
+            matched.append((existing[record[key]], record))
+        else:
+            create.append(record)
+
+    hydrate([element for element, _ in matched], max_workers, rate)
+    update, unchanged = [], []
+    for element, record in matched:
+        data = copy.deepcopy(dict(element.data))
+        merge_dicts(data, copy.deepcopy(record))
+        if data != element.data:
+            update.append((element, record))
+        else:
+            unchanged.append(element)
+
+    created, updated = [], []
+    for result in run_concurrent(
+            lambda record: cls.create(**record), create, max_workers, rate):
+        if result.exception is not None:
+            failed.append((result.item, result.exception))
+        else:
+            created.append(result.result)
+    for result in run_concurrent(
+            lambda item: item[0].update(**item[1]), update, max_workers,
+            rate):
+        if result.exception is not None:
+            failed.append((result.item[1], result.exception))
+        else:
+            updated.append(result.item[0])
+    return UpsertResult(created, updated, unchanged, failed)
@@ -0,0 +1,169 @@
+"""
+A changeset records element modifications made with
+:meth:`~smc.base.model.ElementBase.update` and
+:meth:`~smc.base.model.ElementBase.modify_attribute` instead of sending
+them immediately. Repeated modifications to the same element are merged
+into a single update, and all updates are sent concurrently when the
+changeset is flushed.
+
+Use the session to open a changeset as a context manager, updates are
+flushed when the block exits without an exception::
+
+    from smc import session
+
+    with session.changeset(max_workers=10) as changes:
+        for host in Host.objects.filter('10.0.0'):
+            host.modify_attribute(comment='migrated')
+            host.update(secondary=['10.1.1.1'])  # merged with the comment
+
+    for result in changes.results:
+        print(result.href, result.exception)
+
+If any update fails, :class:`smc.api.exceptions.ChangesetFailed` is raised
+after all updates have been attempted. Updates that failed because the
+element was modified by someone else after it was read are reported as
+ETag conflicts::
+
+    try:
+        with session.changeset() as changes:
+            ...
+    except ChangesetFailed as e:
+        for result in e.conflicts:
+            print('Modified concurrently: %s' % result.href)
+
+While a changeset is open, elements modified in the changeset return the
+pending modifications when their attributes are read. Changesets are
+specific to the thread that opened them.
+"""
+import threading
+from collections import namedtuple, OrderedDict
+from smc import session
+from smc.api.web import SMCAPIConnection
+from smc.api.exceptions import SMCOperationFailure, ChangesetFailed
+from smc.base.concurrency import run_concurrent
+
+
+_local = threading.local()
+
+
+#: Result of flushing a single update. Conflict is True if the update
+#: failed because the ETag did not match.
+ChangeResult = namedtuple('ChangeResult', 'href element exception conflict')
+
+
+def current_changeset():
+    """
+    The changeset open in the current thread, if any
+
+    :rtype: Changeset or None
+    """
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+class Changeset(object):
+    """
+    Records pending element updates and flushes them concurrently.
+
+    :param int max_workers: maximum concurrent update requests on flush
+    :param float rate: optional maximum update requests per second
+    """
+    def __init__(self, max_workers=10, rate=None):
+        self.max_workers = max_workers
+        self.rate = rate
+        self.results = []
+        self._pending = OrderedDict()  # href -> (element, request)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, href):
+        return href in self._pending
+
+    def get(self, href, default=None):
+        """
+        Pending json for the element href, or default if the element has
+        not been modified in this changeset
+
+        :param str href: href of element
+        :rtype: SimpleElement
+        """
+        if href in self._pending:
+            return self._pending[href][1].json
+        return default
+
+    def add(self, element, request):
+        """
+        Record an update request. A pending update for the same href is
+        replaced, the json of the request should include the previous
+        pending modifications.
+
+        :param ElementBase element: element being modified
+        :param SMCRequest request: prepared update request
+        :return: None
+        """
+        entry = self._pending.pop(request.href, None)
+        if entry is not None and entry[1].etag and \
+                request.etag != entry[1].etag:
+            request.etag = entry[1].etag  # Keep the etag of the first read
+        self._pending[request.href] = (element, request)
+
+    def discard(self):
+        """
+        Discard all pending updates
+
+        :return: None
+        """
+        self._pending.clear()
+
+    def _send(self, entry):
+        element, request = entry
+        try:
+            result = session.connection.send_request(
+                SMCAPIConnection.PUT, request)
+        except SMCOperationFailure as e:
+            element.__dict__.pop('data', None)
+            conflict = e.code in (409, 412)
+            return ChangeResult(request.href, element, request.exception(
+                e.smcresult.msg), conflict)
+        except Exception as e:
+            element.__dict__.pop('data', None)
+            return ChangeResult(request.href, element, e, False)
+        if element.__dict__.get('data') is request.json and \
+                hasattr(request.json, 'mark_clean'):
+            request.json.mark_clean(result.etag)
+        else:
+            element.__dict__.pop('data', None)
+        return ChangeResult(request.href, element, None, False)
+
+    def flush(self):
+        """
+        Send all pending updates concurrently. Elements that were updated
+        keep the submitted json as their cached data, the cache of elements
+        that failed is cleared so it is re-read on next access.
+
+        :raises ChangesetFailed: one or more updates failed
+        :return: result of each update
+        :rtype: list(ChangeResult)
+        """
+        entries = list(self._pending.values())
+        self._pending.clear()
+        results = [result.result for result in run_concurrent(
+            self._send, entries, self.max_workers, self.rate)]
+        self.results.extend(results)
+        if any(result.exception is not None for result in results):
+            raise ChangesetFailed(results)
+        return results
+
+    def __enter__(self):
+        if not hasattr(_local, 'stack'):
+            _local.stack = []
+        _local.stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.stack.remove(self)
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
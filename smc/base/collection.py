@@ -10,10 +10,44 @@ import copy
 from itertools import islice
 from smc import session
 import smc.base.model
+from smc.base.concurrency import run_concurrent
 from smc.base.decorators import cached_property, classproperty
 from smc.api.exceptions import FetchElementFailed, InvalidSearchFilter
 
 
+def hydrate(elements, concurrency=10, rate=None):
+    """
+    Load the full data of many elements concurrently. Elements returned
+    from a collection only have meta data (name, href and type) and load
+    the remaining data with a separate request the first time an attribute
+    is accessed. Hydrating elements loads the data in parallel so that
+    later attribute access does not make any requests::
+    
+        >>> from smc.base.collection import hydrate
+        >>> hosts = hydrate(Host.objects.all(), concurrency=20)
+        >>> [host.address for host in hosts]
+        ['1.1.1.1', '2.2.2.2', ...]
+    
+    Elements that already have data loaded are not fetched again. If an
+    element fails to load, it's data is not cached and the error is raised
+    when the element is accessed.
+    
+    :param elements: iterable of elements
+    :param int concurrency: maximum concurrent requests
+    :param float rate: optional maximum requests per second
+    :return: the elements, in the order provided
+    :rtype: list
+    """
+    elements = list(elements)
+    pending, seen = [], set()
+    for element in elements:
+        if 'data' not in vars(element) and id(element) not in seen:
+            seen.add(id(element))
+            pending.append(element)
+    run_concurrent(lambda element: element.data, pending, concurrency, rate)
+    return elements
+
+
 class SubElementCollection(object):
     """
     Collection class providing an interface to iterate sub
@@ -284,6 +318,35 @@ class ElementCollection(object):
                 return
             yield chunk
                 
+    def hydrate(self, concurrency=10, rate=None):
+        """
+        Return the elements of the collection with their full data loaded
+        concurrently. See :func:`hydrate`.
+        ::
+        
+            >>> for host in Host.objects.filter('10.10').hydrate(concurrency=20):
+            ...   print(host.name, host.address)
+        
+        Keyword filters are applied after the data is loaded, which
+        avoids loading each element sequentially while iterating.
+        
+        :param int concurrency: maximum concurrent requests
+        :param float rate: optional maximum requests per second
+        :return: list of elements
+        :rtype: list
+        """
+        limit = self._params.get('limit')
+        elements = [smc.base.model.Element.from_meta(**item)
+                    for item in self._list]
+        if not self._iexact:
+            return hydrate(elements[:limit] if limit else elements,
+                           concurrency, rate)
+        hydrate(elements, concurrency, rate)
+        elements = [element for element in elements
+                    if all(element.data.get(k) == v
+                           for k, v in self._iexact.items())]
+        return elements[:limit] if limit else elements
+
     def first(self):
         """
         Returns the first object matched or None if there is no
@@ -396,6 +459,10 @@ class CollectionManager(object):
         return self.iterator().batch(num)
     batch.__doc__ = ElementCollection.batch.__doc__
     
+    def hydrate(self, concurrency=10, rate=None):
+        return self.iterator().hydrate(concurrency, rate)
+    hydrate.__doc__ = ElementCollection.hydrate.__doc__
+
     def limit(self, count):
         return self.iterator(limit=count)
     limit.__doc__ = ElementCollection.limit.__doc__
@@ -0,0 +1,101 @@
+"""
+Helpers for running SMC API operations concurrently. All requests share
+the session connection so authentication is done once and the underlying
+HTTP connections are re-used across threads.
+
+Run a function concurrently over a set of items with a bounded number of
+workers and an optional rate limit (calls per second)::
+
+    results = run_concurrent(
+        lambda engine: engine.nodes, engines, max_workers=10, rate=20)
+    for result in results:
+        if result.exception:
+            print(result.item, result.exception)
+
+Results are returned in the same order as the input items.
+
+.. note:: Python 2.7 requires the ``futures`` backport package.
+"""
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+#: Result of a concurrent call. Exactly one of result or exception is set.
+Result = namedtuple('Result', 'item result exception')
+
+
+class RateLimiter(object):
+    """
+    Token bucket rate limiter that is safe to share between threads.
+
+    A limiter can also bound bandwidth by acquiring the number of bytes
+    transferred, with rate and burst specified in bytes per second.
+
+    :param float rate: maximum number of calls per second
+    :param int burst: number of calls allowed back to back before
+        limiting (default: 1)
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Block until a call is permitted. Acquiring more tokens than the
+        burst size is permitted once the bucket is full, delaying
+        subsequent calls until the tokens are replenished.
+
+        :param int tokens: number of tokens to acquire (default: 1)
+        :return: None
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                required = min(tokens, self.burst)
+                if self._tokens >= required:
+                    self._tokens -= tokens
+                    return
+                delay = (required - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+def _call(func, item, limiter):
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        return Result(item, func(item), None)
+    except Exception as e:
+        return Result(item, None, e)
+
+
+def run_concurrent(func, items, max_workers=10, rate=None):
+    """
+    Call func for each item using a bounded pool of threads. Exceptions
+    raised by func are captured in the result instead of being raised.
+
+    :param callable func: callable taking a single item
+    :param items: iterable of items
+    :param int max_workers: maximum concurrent calls (default: 10)
+    :param float rate: optional maximum calls per second, or a
+        :class:`RateLimiter` to share a limit between calls
+    :return: results in the order of the provided items
+    :rtype: list(Result)
+    """
+    items = list(items)
+    if not items:
+        return []
+    limiter = rate
+    if rate is not None and not isinstance(rate, RateLimiter):
+        limiter = RateLimiter(rate)
+    with ThreadPoolExecutor(max_workers=max(1, min(
+            max_workers, len(items)))) as executor:
+        return list(executor.map(
+            lambda item: _call(func, item, limiter), items))
@@ -49,9 +49,14 @@ Element class relationship (abbreviated)::
 Classes that do not require state on retrieved json or provide basic
 container functionality may inherit from object.
 """
+import sys
+import json as jsonlib
+import hashlib
+import threading
 from collections import namedtuple
 import smc.base.collection
 from smc.base.decorators import cached_property, classproperty, exception
+from smc import session
 from smc.api.common import SMCRequest, fetch_href_by_name, fetch_entry_point
 from smc.api.exceptions import ElementNotFound, \
     CreateElementFailed, ModificationFailed, ResourceNotFound,\
@@ -60,6 +65,7 @@ from smc.base.resource import with_metaclass, Registry
 from .util import bytes_to_unicode, unicode_to_bytes, merge_dicts,\
     find_type_from_self
 from .mixins import UnicodeMixin, SMCCommand
+from .changeset import current_changeset
 
 
 @exception
@@ -132,11 +138,45 @@ class SimpleElement(dict):
     """
     Basic container for retrieved element. Can be inserted
     where a cached copy is needed. Also provides methods to
-    retrieve element links and json by link name
+    retrieve element links and json by link name.
+
+    A digest of the content is kept once the content is marked clean, so
+    later modifications can be detected using :attr:`changed`. The digest
+    is not computed when the container is created, as most containers are
+    only read.
     """
+    __slots__ = ('_etag', '_digest')
+
     def __init__(self,*arg,**kw):
         self._etag = kw.pop('etag', None)
         super(SimpleElement, self).__init__(*arg, **kw)
+        self._digest = None
+
+    def _hash(self):
+        return hashlib.sha1(jsonlib.dumps(
+            self, sort_keys=True, default=str).encode('utf-8')).digest()
+
+    @property
+    def changed(self):
+        """
+        Has the content been modified since it was last marked clean.
+        Content that was never marked clean is reported as changed since
+        there is nothing to compare it with.
+
+        :rtype: bool
+        """
+        return self._digest is None or self._hash() != self._digest
+
+    def mark_clean(self, etag=None):
+        """
+        Mark the current content as the server state, for example after
+        it has been successfully submitted.
+
+        :param str etag: new etag, if known
+        :return: None
+        """
+        self._etag = etag
+        self._digest = self._hash()
 
     def etag(self, href):
         """
@@ -245,23 +285,36 @@ class ElementBase(UnicodeMixin, SMCCommand):
         raise AttributeError("%r object has no attribute %r"
                 % (self.__class__, key))
 
-    def delete(self):
+    def delete(self, unconditional=None):
         """
-        Delete the element
+        Delete the element.
+
+        By default the delete is conditional on the ETag of the element,
+        which requires retrieving the element if it is not already cached.
+        An unconditional delete sends only the delete request. Set
+        ``session.UNCONDITIONAL_DELETE = True`` to make this the default.
 
+        :param bool unconditional: delete without an ETag precondition
+            (default: session.UNCONDITIONAL_DELETE)
         :raises DeleteElementFailed: possible dependencies, record locked, etc
         :return: None
         """
-        self.del_cmd(
-            DeleteElementFailed,
-            href=self.href,
-            headers={'if-match': self.etag})
+        if unconditional is None:
+            unconditional = session.UNCONDITIONAL_DELETE
+        if unconditional:
+            self.del_cmd(DeleteElementFailed, href=self.href)
+        else:
+            self.del_cmd(
+                DeleteElementFailed,
+                href=self.href,
+                headers={'if-match': self.etag})
         
     def update(self, *exception, **kwargs):
         """
-        Update the existing element and clear the instance cache.
-        Removing the cache will ensure subsequent calls requiring element
-        attributes will force a new fetch to obtain the latest copy.
+        Update the existing element. After a successful update, the
+        submitted json is kept as the instance cache along with the new
+        ETag returned by the SMC, and no update is sent again until it is
+        modified.
 
         If attributes are set via kwargs and instance attributes are also
         set, instance attributes are updated first, then kwargs. Typically
@@ -300,8 +353,12 @@ class ElementBase(UnicodeMixin, SMCCommand):
 
         name = kwargs.get('name', None)
 
+        changeset = current_changeset()
+
         json = self.data    # Get element data
         del self.data       # Delete the cache before processing attributes
+        if changeset is not None:   # Include pending modifications
+            json = changeset.get(params['href'], json)
 
         instance_attr = {k: v() if callable(v) else v
                          for k, v in vars(self).items()
@@ -323,13 +380,31 @@ class ElementBase(UnicodeMixin, SMCCommand):
             for attr in instance_attr.keys():
                 delattr(self, attr)
 
+        own_href = params['href'] == self.href
+        if own_href and not getattr(json, 'changed', True):   # Nothing to update
+            self.data = json
+            return params['href']
+
         request = SMCRequest(**params) 
         request.exception = exception
+
+        if changeset is not None:
+            changeset.add(self, request)
+            if own_href:
+                self.data = json
+            if name:
+                self._name = name
+            return params['href']
+
         result = request.update()
         
         if name: # Reset instance name
             self._name = name
 
+        if own_href and isinstance(json, SimpleElement):
+            json.mark_clean(result.etag)    # Submitted json is now current
+            self.data = json
+
         return result.href
 
     def modify_attribute(self, **kwargs):
@@ -354,14 +429,33 @@ class ElementBase(UnicodeMixin, SMCCommand):
             'href': self.href,
             'etag': self.etag
         }
+        changeset = current_changeset()
+        if changeset is not None:   # Include pending modifications
+            self.data = changeset.get(params['href'], self.data)
+
         append_lists = kwargs.pop('append_lists', False)
         merge_dicts(self.data, kwargs, append_lists)
+        if not getattr(self.data, 'changed', True):   # Nothing to update
+            return params['href']
         params.update(json=self.data)
-        del self.data
 
         request = SMCRequest(**params) 
         request.exception = UpdateElementFailed
-        return request.update().href
+
+        if changeset is not None:
+            changeset.add(self, request)
+            return params['href']
+
+        try:
+            result = request.update()
+        except Exception:
+            self.__dict__.pop('data', None)  # Merged changes were not applied
+            raise
+        if isinstance(self.data, SimpleElement):
+            self.data.mark_clean(result.etag)
+        else:
+            del self.data
+        return result.href
 
 
 class Element(ElementBase):
@@ -498,6 +592,34 @@ class Element(ElementBase):
 
         return element
 
+    @classmethod
+    def bulk_upsert(cls, records, key='name', max_workers=10, rate=None):
+        """
+        Create or update many elements of this type. Existing elements are
+        found with a single listing, and only records that are new or
+        differ from the existing element are sent, concurrently. With web1
+        already existing with address 10.0.0.5::
+
+            >>> result = Host.bulk_upsert(
+            ...     [{'name': 'web1', 'address': '10.0.0.1'},
+            ...      {'name': 'web2', 'address': '10.0.0.2'}])
+            >>> len(result.created), len(result.updated), len(result.unchanged)
+            (1, 1, 0)
+
+        See :func:`smc.base.bulk.bulk_upsert` for details.
+
+        :param records: iterable of dicts of keyword arguments for the
+            elements ``create`` method
+        :param str key: attribute used to match a record to an existing
+            element (default: name)
+        :param int max_workers: maximum concurrent requests
+        :param float rate: optional maximum requests per second
+        :raises ValueError: more than one record has the same key
+        :rtype: UpsertResult
+        """
+        from smc.base.bulk import bulk_upsert
+        return bulk_upsert(cls, records, key, max_workers, rate)
+
     @property
     def name(self):
         """
@@ -645,19 +767,60 @@ class SubElement(ElementBase):
         return str(self)
 
 
+_dynamic_classes = {}
+_dynamic_lock = threading.Lock()
+
+
 def lookup_class(typeof, default=Element):
+    """
+    Return the class registered for the element type. If the type does
+    not have a class, a dynamic class deriving from default is created.
+    Dynamic classes are created once per type and base class so elements
+    of the same type share a class.
+
+    :param str typeof: element type
+    :param default: base class for a dynamic class
+    :rtype: class
+    """
     cls = Registry._registry.get(typeof, None)
-    if cls is None: # Create a dynamic class from meta type field
-        attrs = {'typeof': typeof}
-        # There are multiple entry points for specific aliases
-        # that should derive from the smc.elements.network.Alias
-        # class so it has access to Alias class methods like ``resolve``.
-        if 'alias' in typeof:
-            default = Registry._registry.get('alias')
-        cls_name = '{0}Dynamic'.format(typeof.title())
-        return type(cls_name.replace('_',''), (default,), attrs)
-        
-    return Registry._registry.get(typeof, default)
+    if cls is not None:
+        return cls
+    key = (typeof, default)
+    cls = _dynamic_classes.get(key)
+    if cls is None:
+        with _dynamic_lock:
+            cls = _dynamic_classes.get(key)
+            if cls is None: # Create a dynamic class from meta type field
+                base = default
+                # There are multiple entry points for specific aliases
+                # that should derive from the smc.elements.network.Alias
+                # class so it has access to Alias class methods like ``resolve``.
+                if 'alias' in typeof:
+                    base = Registry._registry.get('alias', default)
+                cls_name = '{0}Dynamic'.format(typeof.title())
+                # Set typeof after creation so the class is not registered
+                cls = type(cls_name.replace('_',''), (base,), {})
+                cls.typeof = typeof
+                _dynamic_classes[key] = cls
+    return cls
+
+
+try:
+    _intern_str = sys.intern
+except AttributeError:  # Python 2.7
+    _intern_str = intern  # @UndefinedVariable
+
+
+def _intern(value):
+    """
+    Return a shared instance of the string. Used for values repeated
+    across many elements, such as the element type. Interned strings are
+    released once no longer referenced. Unicode values on Python 2 cannot
+    be interned and are returned as is.
+    """
+    if type(value) is str:
+        return _intern_str(value)
+    return value
 
 
 class Meta(namedtuple('Meta', 'name href type')):
@@ -668,5 +831,7 @@ class Meta(namedtuple('Meta', 'name href type')):
     Meta has the same data structure returned from
     :py:func:`smc.actions.search.element_info_as_json`
     """
+    __slots__ = ()
+
     def __new__(cls, href, name=None, type=None):  # @ReservedAssignment
-        return super(Meta, cls).__new__(cls, name, href, type)
+        return super(Meta, cls).__new__(cls, name, href, _intern(type))
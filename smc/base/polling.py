@@ -0,0 +1,241 @@
+"""
+Polling strategies control how often asynchronous operations are polled
+for status, and when to stop waiting. They are used by task pollers
+(:class:`smc.administration.tasks.TaskOperationPoller`) and node waiters
+(:py:mod:`smc.core.waiters`).
+
+Strategies are stateless and can be shared between pollers. The state of
+each poller is kept in a :class:`PollStats` instance, which also reports
+how much time was spent waiting compared to the duration of the
+operation itself.
+
+Available strategies:
+
+* :class:`FixedInterval`: poll at a fixed interval
+* :class:`ExponentialBackoff`: start polling quickly and back off up to
+  a maximum interval
+* :class:`ProgressEstimate`: schedule the next poll based on the estimated
+  time to completion derived from task progress
+
+Each strategy accepts a ``deadline`` in seconds and optional ``max_tries``.
+The poller stops waiting once either limit is reached.
+
+Upload a policy, polling quickly at first and waiting at most 10 minutes::
+
+    poller = engine.upload(
+        'mypolicy', wait_for_finish=True,
+        polling=ExponentialBackoff(initial=0.5, max_interval=10, deadline=600))
+    poller.wait()
+    print(poller.stats.report(poller.task))
+"""
+import time
+
+
+class PollStats(object):
+    """
+    State of a single poller.
+
+    :ivar float started: time polling started
+    :ivar float finished: time polling finished, or None
+    :ivar int polls: number of status requests made
+    :ivar float interval: current interval in seconds
+    :ivar float waited: total seconds spent sleeping between polls
+    :ivar list progress: list of (time, progress) samples
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.finished = None
+        self.polls = 0
+        self.interval = None
+        self.waited = 0.0
+        self.progress = []
+
+    @property
+    def elapsed(self):
+        """
+        Seconds since polling started, or total duration once finished
+
+        :rtype: float
+        """
+        return (self.finished or time.time()) - self.started
+
+    def record(self, progress=None):
+        """
+        Record a completed poll.
+
+        :param int progress: progress percentage if available
+        :return: None
+        """
+        self.polls += 1
+        if self.interval:
+            self.waited += self.interval
+        if progress is not None:
+            self.progress.append((time.time(), progress))
+
+    def progress_changed(self):
+        """
+        Did the progress change between the last two polls
+
+        :rtype: bool
+        """
+        if len(self.progress) < 2:
+            return bool(self.progress)
+        return self.progress[-1][1] != self.progress[-2][1]
+
+    def done(self):
+        if self.finished is None:
+            self.finished = time.time()
+
+    def report(self, task=None):
+        """
+        Report on time spent polling. If a task is provided that has start
+        and end times, the task duration and polling overhead (time between
+        the task completing and the poller noticing) are included.
+
+        :param Task task: completed task
+        :rtype: dict
+        """
+        report = {
+            'polls': self.polls,
+            'elapsed': self.elapsed,
+            'waited': self.waited}
+        if task is not None and task.start_time and task.end_time:
+            duration = (task.end_time - task.start_time).total_seconds()
+            report.update(
+                task_duration=duration,
+                overhead=max(0.0, self.elapsed - duration))
+        return report
+
+
+class PollingStrategy(object):
+    """
+    Base polling strategy. Subclasses implement :meth:`next_interval`.
+
+    :param float deadline: maximum seconds to wait before giving up
+    :param int max_tries: maximum number of polls before giving up
+    """
+    def __init__(self, deadline=None, max_tries=None):
+        self.deadline = deadline
+        self.max_tries = max_tries
+
+    def next_interval(self, stats):
+        """
+        Return seconds to wait before the next poll.
+
+        :param PollStats stats: state of the poller
+        :rtype: float
+        """
+        raise NotImplementedError
+
+    def schedule(self, stats):
+        """
+        Compute and store the next interval, limited by the deadline.
+
+        :param PollStats stats: state of the poller
+        :rtype: float
+        """
+        interval = self.next_interval(stats)
+        if self.deadline is not None:
+            interval = max(0, min(interval, self.deadline - stats.elapsed))
+        stats.interval = interval
+        return interval
+
+    def expired(self, stats):
+        """
+        Has the deadline or the maximum number of polls been reached
+
+        :param PollStats stats: state of the poller
+        :rtype: bool
+        """
+        if self.max_tries is not None and stats.polls >= self.max_tries:
+            return True
+        if self.deadline is not None and stats.elapsed >= self.deadline:
+            return True
+        return False
+
+
+class FixedInterval(PollingStrategy):
+    """
+    Poll at a fixed interval.
+
+    :param float interval: seconds between polls
+    """
+    def __init__(self, interval=5, **kw):
+        super(FixedInterval, self).__init__(**kw)
+        self.interval = interval
+
+    def next_interval(self, stats):
+        return self.interval
+
+
+class ExponentialBackoff(PollingStrategy):
+    """
+    Start with a short interval and multiply it by ``factor`` after each
+    poll, up to ``max_interval``. If ``reset_on_progress`` is set, the
+    interval is reset to ``initial`` whenever the progress changes.
+
+    :param float initial: first interval in seconds
+    :param float factor: multiplier applied after each poll
+    :param float max_interval: maximum interval in seconds
+    :param bool reset_on_progress: reset interval when progress changes
+    """
+    def __init__(self, initial=0.5, factor=2, max_interval=30,
+                 reset_on_progress=False, **kw):
+        super(ExponentialBackoff, self).__init__(**kw)
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+        self.reset_on_progress = reset_on_progress
+
+    def next_interval(self, stats):
+        if stats.interval is None or (
+                self.reset_on_progress and stats.progress_changed()):
+            return self.initial
+        return min(stats.interval * self.factor, self.max_interval)
+
+
+class ProgressEstimate(PollingStrategy):
+    """
+    Estimate the remaining time from the rate of progress and schedule the
+    next poll at a fraction of the estimate. Until progress is reported,
+    the interval backs off exponentially from ``min_interval``.
+
+    :param float min_interval: minimum interval in seconds
+    :param float max_interval: maximum interval in seconds
+    :param float fraction: fraction of the estimated remaining time to
+        wait before polling again (default: 0.5)
+    """
+    def __init__(self, min_interval=0.5, max_interval=30, fraction=0.5,
+                 **kw):
+        super(ProgressEstimate, self).__init__(**kw)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.fraction = fraction
+
+    def estimate(self, stats):
+        """
+        Estimated seconds until completion, or None if unknown
+
+        :param PollStats stats: state of the poller
+        :rtype: float
+        """
+        samples = [s for s in stats.progress if s[1]]
+        if not samples:
+            return None
+        first_time, first = stats.started, 0
+        last_time, last = samples[-1]
+        if len(samples) > 1 and samples[0][1] < last:
+            first_time, first = samples[0]
+        if last <= first or last >= 100:
+            return 0 if last >= 100 else None
+        rate = (last - first) / float(last_time - first_time or 1e-3)
+        return (100 - last) / rate
+
+    def next_interval(self, stats):
+        eta = self.estimate(stats)
+        if eta is None:
+            interval = self.min_interval if stats.interval is None \
+                else stats.interval * 2
+        else:
+            interval = eta * self.fraction
+        return max(self.min_interval, min(interval, self.max_interval))
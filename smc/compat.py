@@ -1,11 +1,34 @@
 """
 Compatibility for py2 / py3
 """
+import os
 import sys
 import smc
 
 PY3 = sys.version_info > (3,)
 
+if PY3:
+    string_types = (str,)
+else:
+    string_types = (basestring,)  # @UndefinedVariable
+
+
+if PY3:
+    replace_file = os.replace
+else:
+    def replace_file(src, dst):
+        """
+        Rename src to dst, replacing dst if it exists. The rename is
+        atomic on POSIX, on Windows dst is removed first.
+        """
+        try:
+            os.rename(src, dst)
+        except OSError:
+            if not os.path.exists(dst):
+                raise
+            os.remove(dst)
+            os.rename(src, dst)
+
 
 def min_smc_version(version):
     """
@@ -11,7 +11,7 @@ from smc.core.resource import Snapshot, PendingChanges, L2FWSettings
 from smc.core.interfaces import PhysicalInterface, \
     VirtualPhysicalInterface, TunnelInterface, Interface
 from smc.administration.tasks import TaskOperationPoller
-from smc.elements.other import prepare_blacklist
+from smc.elements.other import prepare_blacklist, send_blacklist
 from smc.elements.network import Alias
 from smc.vpn.elements import VPNSite
 from smc.core.route import Antispoofing, Routing, Routes
@@ -307,6 +307,31 @@ class Engine(AddOn, Element):
             resource='blacklist',
             json=prepare_blacklist(src, dst, duration, **kw))
 
+    def blacklist_bulk(self, blacklist, batch_size=500, limiter=None):
+        """
+        Add multiple blacklist entries to this engine. Entries are sent in
+        as few requests as the SMC version allows.
+        ::
+
+            blacklist = Blacklist()
+            blacklist.add_entry('1.1.1.1/32', 'any')
+            blacklist.add_entry('2.2.2.2/32', 'any', duration=600)
+            engine.blacklist_bulk(blacklist)
+
+        :param Blacklist blacklist: :class:`smc.elements.other.Blacklist`
+            entries
+        :param int batch_size: maximum entries per request
+        :param RateLimiter limiter: optional rate limiter shared between
+            requests
+        :raises EngineCommandFailed: blacklist failed during apply
+        :return: None
+
+        .. seealso:: :py:func:`smc.elements.other.bulk_blacklist` to apply
+            entries to many engines concurrently.
+        """
+        send_blacklist(self, blacklist, batch_size, limiter,
+                       exception=EngineCommandFailed)
+
     def blacklist_flush(self):
         """
         Flush entire blacklist for engine
@@ -0,0 +1,134 @@
+"""
+Fleet status collects the node status of many engines concurrently.
+
+Obtaining the status of a single node requires resolving the engine, the
+engine nodes and then the node status, each a separate request. For a
+fleet of engines these requests are made using a bounded pool of workers
+and the engine nodes are cached so subsequent checks only retrieve the
+node status::
+
+    >>> from smc.core.fleet import fleet_status
+    >>> for row in fleet_status(['fw1', 'fw2', 'cluster1']):
+    ...   print(row.engine, row.node, row.status, row.state, row.installed_policy)
+    ...
+    fw1 fw1 node 1 Online READY Standard Firewall Policy
+    fw2 fw2 node 1 No Policy Installed READY None
+    cluster1 cluster1 node 1 Online READY Cluster Policy
+    cluster1 cluster1 node 2 Offline READY Cluster Policy
+
+Engines that could not be resolved and nodes that failed to return a
+status are returned as rows with the ``error`` field set. Engines without
+nodes are returned as a single row with ``node`` set to None.
+
+Engines can be provided by name or as :class:`smc.core.engine.Engine`
+instances.
+"""
+import threading
+from collections import namedtuple
+from smc.base.concurrency import run_concurrent
+from smc.core.engine import Engine
+
+
+#: Node status row returned by :func:`fleet_status`
+FleetStatus = namedtuple('FleetStatus', (
+    'engine node status state configuration_status installed_policy '
+    'version dyn_up platform error'))
+
+
+class NodeCache(object):
+    """
+    Cache of engine nodes keyed by engine href. Nodes rarely change so
+    they are retained until the cache is cleared.
+    """
+    def __init__(self):
+        self._nodes = {}
+        self._lock = threading.Lock()
+
+    def nodes(self, engine):
+        """
+        Return the nodes for the engine, retrieving them if not cached
+
+        :param Engine engine: engine
+        :rtype: list(Node)
+        """
+        href = engine.href
+        with self._lock:
+            nodes = self._nodes.get(href)
+        if nodes is None:
+            nodes = engine.nodes
+            with self._lock:
+                self._nodes[href] = nodes
+        return nodes
+
+    def clear(self, engine=None):
+        """
+        Clear the cache, or only the cached nodes for the given engine
+
+        :param engine: engine href or Engine
+        :return: None
+        """
+        with self._lock:
+            if engine is None:
+                self._nodes.clear()
+            else:
+                self._nodes.pop(getattr(engine, 'href', engine), None)
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+#: Node cache shared by calls to :func:`fleet_status`
+node_cache = NodeCache()
+
+
+def _row(engine, node=None, status=None, error=None):
+    return FleetStatus(
+        engine=engine,
+        node=node.name if node is not None else None,
+        status=getattr(status, 'status', None),
+        state=getattr(status, 'state', None),
+        configuration_status=getattr(status, 'configuration_status', None),
+        installed_policy=getattr(status, 'installed_policy', None),
+        version=getattr(status, 'version', None),
+        dyn_up=getattr(status, 'dyn_up', None),
+        platform=getattr(status, 'platform', None),
+        error=str(error) if error is not None else None)
+
+
+def fleet_status(engines, max_workers=10, rate=None, cache=node_cache):
+    """
+    Return the status of all nodes of the given engines. Engines and nodes
+    are resolved concurrently, then node status is retrieved concurrently.
+
+    :param list engines: engine names or Engine instances
+    :param int max_workers: maximum concurrent requests
+    :param float rate: optional maximum requests per second
+    :param NodeCache cache: node cache, or None to always retrieve the
+        engine nodes
+    :return: one row per node, or a single row for an engine without
+        nodes, in order of the provided engines
+    :rtype: list(FleetStatus)
+    """
+    engines = [engine if isinstance(engine, Engine) else Engine(engine)
+               for engine in engines]
+
+    def get_nodes(engine):
+        return cache.nodes(engine) if cache is not None else engine.nodes
+
+    rows = {}  # engine index -> list of rows or nodes
+    targets = []
+    for index, result in enumerate(run_concurrent(
+            get_nodes, engines, max_workers, rate)):
+        if result.exception is not None:
+            rows[index] = [_row(result.item.name, error=result.exception)]
+        elif not result.result:
+            rows[index] = [_row(result.item.name)]
+        else:
+            targets.extend((index, node) for node in result.result)
+
+    for (index, node), result in zip(targets, run_concurrent(
+            lambda target: target[1].status(), targets, max_workers, rate)):
+        rows.setdefault(index, []).append(_row(
+            engines[index].name, node, result.result, result.exception))
+
+    return [row for index in sorted(rows) for row in rows[index]]
@@ -411,16 +411,23 @@ class Node(SubElement):
 
     def sginfo(self, include_core_files=False,
                include_slapcat_output=False,
-               filename='sginfo.gz'):
+               filename='sginfo.gz', timeout=None):
         """
         Get the SG Info of the specified node. Optionally provide
         a filename, otherwise default to 'sginfo.gz'. Once you run
         gzip -d <filename>, the inner contents will be in .tar format.
 
+        To collect sginfo from many nodes concurrently, see
+        :py:mod:`smc.core.sginfo`.
+
         :param include_core_files: flag to include or not core files
         :param include_slapcat_output: flag to include or not slapcat output
+        :param filename: name of file, or file-like object opened for
+            writing in binary mode
+        :param int timeout: seconds to wait for the SMC to respond or
+            send more data (default: no timeout)
         :raises NodeCommandFailed: failed getting sginfo with reason
-        :return: string path of download location
+        :return: string path of download location, or file-like object
         :rtype: str
         """
         params = {
@@ -431,6 +438,7 @@ class Node(SubElement):
             NodeCommandFailed,
             resource='sginfo',
             filename=filename,
+            timeout=timeout,
             params=params).read()
         
         return result.content
@@ -0,0 +1,457 @@
+"""
+Rollout orchestrates a policy push (or any other task based operation)
+across many engines. Engines are processed in waves, starting with a
+canary wave. Within a wave, at most ``concurrency`` tasks run on the SMC
+at a time, and completed tasks are tracked by the shared task monitor so
+no thread is needed per engine.
+
+A rollout aborts automatically when a canary engine fails or the ratio of
+failed engines exceeds the failure threshold. Running tasks are aborted on
+the SMC using :meth:`smc.administration.tasks.Task.abort` and engines that
+were not started are skipped.
+
+Push a policy to all engines, 10 at a time, with 2 canary engines and
+requiring each node to be online after the push::
+
+    rollout = Rollout(
+        engines, policy='Standard Firewall Policy', canary=2,
+        concurrency=10, health_status='Online')
+    report = rollout.run()
+
+    print(report.succeeded, report.failed)
+    for engine in report:
+        print(engine.name, engine.state, engine.duration, engine.message)
+
+The rollout can be paused or aborted from another thread (or a progress
+callback) using :meth:`Rollout.pause`, :meth:`Rollout.resume` and
+:meth:`Rollout.abort`. A paused rollout starts no new tasks until it is
+resumed.
+
+Operations other than a policy push can be rolled out by providing a
+callable that takes the engine and returns a
+:class:`~smc.administration.tasks.TaskOperationPoller`::
+
+    rollout = Rollout(engines, operation=lambda engine, **kw: engine.refresh(**kw))
+"""
+import time
+import logging
+import threading
+from concurrent.futures import wait as futures_wait, FIRST_COMPLETED
+from smc.base.polling import ExponentialBackoff
+from smc.core.waiters import NodeStatusWaiter, ConfigurationStatusWaiter
+
+logger = logging.getLogger(__name__)
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+HEALTH_CHECK = 'health_check'
+SUCCESS = 'success'
+FAILED = 'failed'
+ABORTED = 'aborted'
+SKIPPED = 'skipped'
+
+
+class EngineReport(object):
+    """
+    Timing and progress for a single engine in a rollout.
+
+    :ivar Engine engine: engine
+    :ivar str state: pending, running, health_check, success, failed,
+        aborted or skipped
+    :ivar int wave: wave number, 0 is the canary wave
+    :ivar float started: time the task was started
+    :ivar float task_finished: time the task completed
+    :ivar float finished: time the engine completed, including health checks
+    :ivar str message: last task message or failure reason
+    :ivar TaskOperationPoller poller: poller for the task
+    """
+    def __init__(self, engine, wave):
+        self.engine = engine
+        self.wave = wave
+        self.state = PENDING
+        self.started = None
+        self.task_finished = None
+        self.finished = None
+        self.message = None
+        self.poller = None
+        self._waiters = []
+
+    @property
+    def name(self):
+        return self.engine.name
+
+    @property
+    def progress(self):
+        """
+        Task progress percentage
+
+        :rtype: int
+        """
+        if self.poller is not None:
+            return self.poller.task.progress
+        return 0
+
+    @property
+    def task_duration(self):
+        """
+        Seconds from starting the task until it completed
+
+        :rtype: float
+        """
+        if self.started and self.task_finished:
+            return self.task_finished - self.started
+
+    @property
+    def duration(self):
+        """
+        Seconds from starting the task until the engine completed,
+        including health checks
+
+        :rtype: float
+        """
+        if self.started and self.finished:
+            return self.finished - self.started
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'wave': self.wave,
+            'state': self.state,
+            'progress': self.progress,
+            'task_duration': self.task_duration,
+            'duration': self.duration,
+            'message': self.message}
+
+    def __repr__(self):
+        return 'EngineReport(name={}, state={})'.format(self.name, self.state)
+
+
+class RolloutReport(object):
+    """
+    Report of a rollout. Iterate to obtain the :class:`EngineReport`
+    for each engine.
+    """
+    def __init__(self, engines):
+        self.engines = engines
+        self.started = None
+        self.finished = None
+        self.aborted = False
+
+    def __iter__(self):
+        return iter(self.engines)
+
+    def __len__(self):
+        return len(self.engines)
+
+    def _count(self, state):
+        return len([e for e in self.engines if e.state == state])
+
+    @property
+    def succeeded(self):
+        return self._count(SUCCESS)
+
+    @property
+    def failed(self):
+        return self._count(FAILED)
+
+    @property
+    def skipped(self):
+        return self._count(SKIPPED) + self._count(ABORTED)
+
+    @property
+    def duration(self):
+        if self.started:
+            return (self.finished or time.time()) - self.started
+
+    def as_list(self):
+        """
+        Report for all engines as a list of dict
+
+        :rtype: list(dict)
+        """
+        return [engine.as_dict() for engine in self.engines]
+
+
+class Rollout(object):
+    """
+    Roll out a policy or task based operation to engines in waves.
+
+    :param list engines: engines to roll out to
+    :param str policy: policy to upload. If None, the current policy is
+        refreshed
+    :param callable operation: callable taking the engine and keyword
+        arguments ``wait_for_finish`` and ``polling`` that starts the task
+        and returns a TaskOperationPoller. Overrides policy
+    :param int concurrency: maximum tasks running at once
+    :param int canary: number of engines in the canary wave. Any failure
+        in the canary wave aborts the rollout
+    :param int wave_size: number of engines per wave after the canary wave
+        (default: all remaining engines in one wave)
+    :param float failure_threshold: abort when the ratio of failed engines
+        to all engines in the waves started so far exceeds this value
+    :param bool pause_on_failure: pause instead of aborting when the
+        failure threshold is exceeded. Running tasks are left to complete
+        and no new tasks are started. Use :meth:`resume` or :meth:`abort`
+        to continue. After resuming, the rollout pauses again only on new
+        failures. A canary failure always aborts
+    :param str health_status: node status each node must reach after
+        the task completes, i.e. 'Online'
+    :param str configuration_status: node configuration status each node
+        must reach after the task completes, i.e. 'Installed'
+    :param int task_timeout: seconds to wait for each task
+    :param int health_timeout: seconds to wait for health checks
+    :param callable callback: called with the :class:`EngineReport` each
+        time an engine changes state
+    """
+    def __init__(self, engines, policy=None, operation=None, concurrency=10,
+                 canary=1, wave_size=None, failure_threshold=0.1,
+                 pause_on_failure=False, health_status=None,
+                 configuration_status=None, task_timeout=900,
+                 health_timeout=300, callback=None):
+        self.engines = list(engines)
+        self.policy = policy
+        self.operation = operation
+        self.concurrency = max(1, concurrency)
+        self.canary = canary
+        self.wave_size = wave_size
+        self.failure_threshold = failure_threshold
+        self.pause_on_failure = pause_on_failure
+        self.health_status = health_status
+        self.configuration_status = configuration_status
+        self.task_timeout = task_timeout
+        self.health_timeout = health_timeout
+        self.callback = callback
+        self._running = threading.Event()
+        self._running.set()
+        self._abort = threading.Event()
+        self._failures = 0
+        self._acknowledged = 0  # failures seen when last resumed
+
+    @property
+    def waves(self):
+        """
+        Engines grouped by wave
+
+        :rtype: list(list(Engine))
+        """
+        engines = self.engines
+        waves = []
+        if self.canary:
+            waves.append(engines[:self.canary])
+            engines = engines[self.canary:]
+        size = self.wave_size or len(engines)
+        for i in range(0, len(engines), size or 1):
+            waves.append(engines[i:i + size])
+        return waves
+
+    def pause(self):
+        """
+        Pause the rollout. No new tasks are started until the rollout is
+        resumed, tasks already running complete normally.
+        """
+        self._running.clear()
+
+    def resume(self):
+        """
+        Resume a paused rollout. Failures up to now are acknowledged, the
+        rollout only pauses on failure again if new engines fail.
+        """
+        self._acknowledged = self._failures
+        self._running.set()
+
+    def abort(self):
+        """
+        Abort the rollout. Running tasks are aborted and remaining engines
+        are skipped.
+        """
+        self._abort.set()
+        self._running.set()
+
+    def _start(self, report):
+        polling = ExponentialBackoff(
+            initial=1, max_interval=15, deadline=self.task_timeout)
+        report.state = RUNNING
+        report.started = time.time()
+        if self.operation is not None:
+            return self.operation(
+                report.engine, wait_for_finish=True, polling=polling)
+        if self.policy is not None:
+            return report.engine.upload(
+                self.policy, wait_for_finish=True, polling=polling)
+        return report.engine.refresh(wait_for_finish=True, polling=polling)
+
+    def _health_waiters(self, report):
+        polling = ExponentialBackoff(
+            initial=1, max_interval=10, deadline=self.health_timeout)
+        waiters = []
+        for node in report.engine.nodes:
+            if self.health_status:
+                waiters.append(NodeStatusWaiter(
+                    node, self.health_status, polling=polling))
+            if self.configuration_status:
+                waiters.append(ConfigurationStatusWaiter(
+                    node, self.configuration_status, polling=polling))
+        return waiters
+
+    def _changed(self, report, state, message=None):
+        report.state = state
+        if message is not None:
+            report.message = message
+        if state == FAILED:
+            self._failures += 1
+        if state in (SUCCESS, FAILED, ABORTED):
+            report.finished = time.time()
+        logger.info('Rollout %s: %s %s', report.name, state,
+                    report.message or '')
+        if self.callback is not None:
+            self.callback(report)
+
+    def _task_done(self, report):
+        """
+        Task completed, return health waiters to wait for if the task
+        succeeded
+        """
+        poller = report.poller
+        report.task_finished = time.time()
+        try:
+            task = poller.result(0)
+        except Exception as e:
+            self._changed(report, FAILED, str(e))
+            return []
+        if task.in_progress:
+            task.abort()
+            self._changed(report, FAILED, 'Task timed out after {} seconds'
+                          .format(self.task_timeout))
+            return []
+        if not task.success:
+            self._changed(report, FAILED, task.last_message)
+            return []
+        report.message = task.last_message
+        try:
+            waiters = self._health_waiters(report)
+        except Exception as e:
+            self._changed(report, FAILED, str(e))
+            return []
+        if not waiters:
+            self._changed(report, SUCCESS)
+        else:
+            report._waiters = waiters
+            self._changed(report, HEALTH_CHECK)
+        return waiters
+
+    def _health_done(self, report):
+        if any(not waiter.done() for waiter in report._waiters):
+            return
+        for waiter in report._waiters:
+            try:
+                status = waiter.result(0)
+            except Exception as e:
+                self._changed(report, FAILED, str(e))
+                return
+            if status != waiter._desired_status:
+                self._changed(report, FAILED, 'Health check failed, '
+                              'status: {}'.format(status))
+                return
+        self._changed(report, SUCCESS)
+
+    def _threshold_exceeded(self, reports):
+        """
+        Ratio of failed engines to all engines in the completed and
+        current waves. Engines still pending or running count as not
+        failed, so early failures in a wave do not abort the rollout on
+        their own.
+        """
+        failed = len([r for r in reports if r.state == FAILED])
+        if not failed:
+            return False
+        return float(failed) / len(reports) > self.failure_threshold
+
+    def _abort_running(self, reports):
+        for report in reports:
+            if report.state == RUNNING:
+                report.poller.cancel()
+                report.poller.task.abort()
+                self._changed(report, ABORTED, 'Aborted')
+            elif report.state == HEALTH_CHECK:
+                for waiter in report._waiters:
+                    waiter.stop()
+                self._changed(report, ABORTED, 'Aborted')
+
+    def _run_wave(self, wave, reports, canary):
+        pending = list(wave)
+        inflight = {}  # future -> EngineReport
+        while pending or inflight:
+            if self._abort.is_set():
+                self._abort_running(wave)
+                return False
+            running = len([r for r in inflight.values()
+                           if r.state == RUNNING])
+            if pending and not inflight and not self._running.is_set():
+                self._running.wait()    # Paused, or woken by abort
+                continue
+            while pending and running < self.concurrency and \
+                    self._running.is_set():
+                report = pending.pop(0)
+                try:
+                    report.poller = self._start(report)
+                except Exception as e:
+                    self._changed(report, FAILED, str(e))
+                    continue
+                self._changed(report, RUNNING)
+                inflight[report.poller] = report
+                running += 1
+
+            if inflight:
+                done, _ = futures_wait(
+                    list(inflight), timeout=1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report = inflight.pop(future)
+                    if future is report.poller:
+                        for waiter in self._task_done(report):
+                            inflight[waiter] = report
+                    else:
+                        self._health_done(report)
+
+            if canary and any(r.state == FAILED for r in wave):
+                logger.error('Rollout canary failed, aborting.')
+                self._abort.set()
+            elif self._running.is_set() and \
+                    self._threshold_exceeded(reports):
+                if self.pause_on_failure:
+                    if self._failures > self._acknowledged:
+                        logger.error('Rollout failure threshold exceeded, '
+                                     'pausing.')
+                        self.pause()
+                else:
+                    logger.error('Rollout failure threshold exceeded, '
+                                 'aborting.')
+                    self._abort.set()
+        return True
+
+    def run(self):
+        """
+        Run the rollout. This blocks until all waves have completed or the
+        rollout is aborted.
+
+        :rtype: RolloutReport
+        """
+        waves = [[EngineReport(engine, number) for engine in wave]
+                 for number, wave in enumerate(self.waves)]
+        result = RolloutReport([report for wave in waves for report in wave])
+        result.started = time.time()
+        done = []
+        for number, wave in enumerate(waves):
+            self._running.wait()
+            canary = number == 0 and bool(self.canary)
+            if self._abort.is_set() or not self._run_wave(
+                    wave, done + wave, canary):
+                break
+            done.extend(wave)
+
+        result.aborted = self._abort.is_set()
+        for report in result:
+            if report.state == PENDING:
+                self._changed(report, SKIPPED)
+        result.finished = time.time()
+        return result
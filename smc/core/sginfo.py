@@ -0,0 +1,278 @@
+"""
+Collect sginfo from many engine nodes concurrently. Each sginfo is
+streamed directly to a file in the target directory as it is received,
+using a bounded pool of workers. Each node has a time limit for the
+complete download and progress (bytes received) is tracked per node.
+
+Once complete, an ``index.json`` is written to the directory describing
+what was collected from each node, including failures::
+
+    collector = SginfoCollector(
+        '/tmp/outage', engines=[Engine('cluster1'), Engine('cluster2')],
+        timeout=600)
+    collector.run()
+    for entry in collector:
+        print(entry.engine, entry.node, entry.state, entry.size, entry.filename)
+
+Progress can be checked from another thread, or by providing a callback
+that is called with the :class:`SginfoEntry` whenever a download starts,
+receives data or completes::
+
+    def progress(entry):
+        print(entry.node, entry.state, entry.size)
+
+    collect_sginfo('/tmp/outage', engines, callback=progress)
+"""
+import os
+import re
+import json
+import time
+import threading
+from smc.base.concurrency import run_concurrent
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETE = 'complete'
+FAILED = 'failed'
+
+
+class SginfoEntry(object):
+    """
+    Collection state for a single node
+
+    :ivar str engine: engine name
+    :ivar str node: node name
+    :ivar str state: pending, running, complete or failed
+    :ivar str filename: path of collected file
+    :ivar int size: bytes received
+    :ivar float started: time the download started
+    :ivar float finished: time the download completed
+    :ivar str error: failure reason
+    """
+    def __init__(self, engine, node, filename):
+        self.engine = engine
+        self.node = node
+        self.filename = filename
+        self.state = PENDING
+        self.size = 0
+        self.started = None
+        self.finished = None
+        self.error = None
+
+    @property
+    def duration(self):
+        if self.started:
+            return (self.finished or time.time()) - self.started
+
+    def as_dict(self):
+        return {
+            'engine': self.engine,
+            'node': self.node,
+            'state': self.state,
+            'filename': self.filename,
+            'size': self.size,
+            'duration': self.duration,
+            'error': self.error}
+
+    def __repr__(self):
+        return 'SginfoEntry(node={}, state={})'.format(self.node, self.state)
+
+
+class _ProgressWriter(object):
+    """
+    File writer tracking bytes received and enforcing an overall
+    deadline for the download.
+    """
+    def __init__(self, handle, entry, deadline, callback):
+        self.handle = handle
+        self.entry = entry
+        self.deadline = deadline
+        self.callback = callback
+
+    def write(self, data):
+        if self.deadline and time.time() > self.deadline:
+            raise IOError('Timed out collecting sginfo')
+        self.handle.write(data)
+        self.entry.size += len(data)
+        if self.callback is not None:
+            self.callback(self.entry)
+
+
+def _safe_name(name):
+    return re.sub(r'[^\w.-]+', '_', name)
+
+
+class SginfoCollector(object):
+    """
+    Collect sginfo from engine nodes concurrently.
+
+    :param str directory: directory to store collected files, created if
+        it does not exist
+    :param list engines: engines to collect sginfo from all nodes
+    :param list nodes: nodes to collect sginfo from, in addition to nodes
+        of the provided engines
+    :param int max_workers: maximum concurrent downloads
+    :param int timeout: maximum seconds for each node
+    :param bool include_core_files: include core files in sginfo
+    :param bool include_slapcat_output: include slapcat output in sginfo
+    :param callable callback: called with the :class:`SginfoEntry` when
+        it's progress changes
+    """
+    def __init__(self, directory, engines=None, nodes=None, max_workers=10,
+                 timeout=900, include_core_files=False,
+                 include_slapcat_output=False, callback=None):
+        self.directory = os.path.abspath(directory)
+        self.engines = engines or []
+        self.nodes = nodes or []
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.include_core_files = include_core_files
+        self.include_slapcat_output = include_slapcat_output
+        self.callback = callback
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def progress(self):
+        """
+        Number of nodes in each state and total bytes received
+
+        :rtype: dict
+        """
+        with self._lock:
+            entries = list(self.entries)
+        progress = dict.fromkeys((PENDING, RUNNING, COMPLETE, FAILED), 0)
+        for entry in entries:
+            progress[entry.state] += 1
+        progress.update(size=sum(entry.size for entry in entries))
+        return progress
+
+    def _targets(self):
+        """
+        Resolve the nodes of each engine. Return a tuple of failed entries
+        for engines that could not be resolved and a list of
+        (engine name, node).
+        """
+        failed, targets = [], []
+        for result in run_concurrent(
+                lambda engine: engine.nodes, self.engines, self.max_workers):
+            if result.exception is not None:
+                entry = SginfoEntry(result.item.name, None, None)
+                entry.state = FAILED
+                entry.error = str(result.exception)
+                failed.append(entry)
+            else:
+                targets.extend(
+                    (result.item.name, node) for node in result.result)
+        targets.extend((None, node) for node in self.nodes)
+        return failed, targets
+
+    def _filename(self, engine, node, stamp, used):
+        """
+        Unique filename for the node. The engine name is included as nodes
+        of different engines can have the same name.
+        """
+        name = _safe_name(node.name)
+        if engine:
+            name = '{}_{}'.format(_safe_name(engine), name)
+        filename = '{}_{}.gz'.format(name, stamp)
+        count = 1
+        while filename in used:
+            count += 1
+            filename = '{}_{}_{}.gz'.format(name, stamp, count)
+        used.add(filename)
+        return os.path.join(self.directory, filename)
+
+    def _changed(self, entry, state=None):
+        if state is not None:
+            entry.state = state
+        if self.callback is not None:
+            self.callback(entry)
+
+    def _collect(self, target):
+        entry, node = target
+        deadline = time.time() + self.timeout if self.timeout else None
+        partial = entry.filename + '.part'
+        entry.started = time.time()
+        self._changed(entry, RUNNING)
+        try:
+            with open(partial, 'wb') as handle:
+                node.sginfo(
+                    include_core_files=self.include_core_files,
+                    include_slapcat_output=self.include_slapcat_output,
+                    filename=_ProgressWriter(
+                        handle, entry, deadline, self.callback),
+                    timeout=self.timeout)
+            os.rename(partial, entry.filename)
+        except Exception as e:
+            entry.error = str(e)
+            entry.finished = time.time()
+            if os.path.exists(partial):
+                os.remove(partial)
+            self._changed(entry, FAILED)
+        else:
+            entry.finished = time.time()
+            self._changed(entry, COMPLETE)
+        return entry
+
+    def run(self):
+        """
+        Collect sginfo from all nodes and write the index. This blocks
+        until all nodes have completed or timed out.
+
+        :return: entries for all nodes
+        :rtype: list(SginfoEntry)
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        stamp = time.strftime('%Y%m%d%H%M%S')
+        failed, targets = self._targets()
+        used = set()
+        work = [(SginfoEntry(engine, node.name, self._filename(
+            engine, node, stamp, used)), node) for engine, node in targets]
+        with self._lock:
+            self.entries = failed + [entry for entry, _ in work]
+
+        entries = list(failed)
+        for result in run_concurrent(self._collect, work, self.max_workers):
+            entry = result.item[0]
+            if result.exception is not None:  # Raised by the callback
+                entry.state = FAILED
+                entry.error = str(result.exception)
+                entry.finished = entry.finished or time.time()
+            entries.append(entry)
+        with self._lock:
+            self.entries = entries
+        self.write_index()
+        return entries
+
+    def write_index(self):
+        """
+        Write ``index.json`` to the collection directory
+
+        :return: path to the index file
+        :rtype: str
+        """
+        path = os.path.join(self.directory, 'index.json')
+        with self._lock:
+            entries = list(self.entries)
+        with open(path, 'w') as f:
+            json.dump([entry.as_dict() for entry in entries], f, indent=1)
+        return path
+
+
+def collect_sginfo(directory, engines=None, nodes=None, **kw):
+    """
+    Collect sginfo from all nodes of the given engines and/or nodes
+    concurrently. See :class:`SginfoCollector` for keyword arguments.
+
+    :param str directory: directory to store collected files
+    :param list engines: engines to collect sginfo from all nodes
+    :param list nodes: individual nodes to collect sginfo from
+    :return: entries for all nodes
+    :rtype: list(SginfoEntry)
+    """
+    return SginfoCollector(directory, engines, nodes, **kw).run()
@@ -1,11 +1,11 @@
 """
-Waiters are convenience classes that use blocking or non-blocking threads to
-monitor for a particular state of an engine node.
+Waiters are convenience classes that monitor for a particular state of an
+engine node, either blocking or non-blocking.
 
 A waiter can have a callback added that will be executed after either
 the state has matched, a number of iterations exceeded or an exception is
 caught while monitoring. The callback should be a callable that takes a single
-argument.
+argument, the waiter itself.
 
 They provide the ability to perform logical actions such as "wait for the engine to
 have status 'Configured', then fire a policy upload task".
@@ -16,8 +16,8 @@ Example of waiting for an engine to be ready, then send policy::
         def __init__(self, container):
             self.engine = engine
 
-        def __call__(self, status):
-            if status == 'Configured':
+        def __call__(self, waiter):
+            if waiter.result() == 'Configured':
                 self.engine.upload(policy='MyPolicy')
 
     engine = Engine('myengine')
@@ -33,9 +33,30 @@ to block input while waiting for the engine to reach a specific status::
     while not waiter.done():
         print("Status after 5 sec wait: %s" % waiter.result(5))
 
+The interval between status checks can be controlled using a polling
+strategy from :py:mod:`smc.base.polling`, for example to check quickly at
+first and wait at most 10 minutes::
+
+    waiter = NodeStatusWaiter(
+        node, 'Online',
+        polling=ExponentialBackoff(initial=1, max_interval=15, deadline=600))
+
+Waiters on the same node share a single status read. When node status is
+available from another source, such as a monitoring feed, push it to the
+waiters to complete them immediately::
+
+    status_monitor.notify(node.href, {'status': 'Online'})
+
 """
 import time
+import heapq
+import itertools
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future,\
+    wait as futures_wait
+from smc.base.polling import PollStats, FixedInterval
+from smc.core.node import NodeStatus
 
 CFG_STATUS = frozenset(['Initial', 'Declared', 'Configured', 'Installed'])
 
@@ -48,89 +69,252 @@ STATE = frozenset(['INITIAL', 'READY', 'ERROR', 'SERVER_ERROR', 'NO_STATUS',
                    'TIMEOUT', 'DELETED', 'DUMMY'])
 
 
-class NodeWaiter(threading.Thread):
+class StatusMonitor(object):
+    """
+    Status monitor tracks all running node waiters using a single scheduler
+    thread. When several waiters are due for a status check on the same
+    node, the node status is read once and shared by all waiters on that
+    node. Status reads for different nodes are run concurrently using a
+    small bounded pool of workers.
+
+    Node status can also be pushed to waiters using :meth:`notify`, for
+    example from a monitoring feed, so waiters react without waiting for
+    the next poll.
+
+    Waiters that finish from a status check are completed, and their done
+    callbacks run, on a separate pool of completion workers so a slow
+    callback does not stop the status checks of other waiters.
+
+    A shared monitor is used by :class:`NodeWaiter`. It is not typically
+    required to interact with the monitor directly.
+
+    :param int max_workers: maximum concurrent status requests
+    :param int completion_workers: maximum concurrent waiter completions
+        and done callbacks
+    """
+    def __init__(self, max_workers=10, completion_workers=4):
+        self.max_workers = max_workers
+        self.completion_workers = completion_workers
+        self._queue = []  # heap of (next poll time, seq, waiter)
+        self._seq = itertools.count()
+        self._waiters = {}  # node href -> list(NodeWaiter)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._completer = ThreadPoolExecutor(max_workers=completion_workers)
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+    def register(self, waiter):
+        """
+        Track the given waiter until it is done.
+
+        :param NodeWaiter waiter: waiter to track
+        :return: None
+        """
+        with self._cond:
+            self._waiters.setdefault(waiter._href, []).append(waiter)
+            self._schedule(waiter)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def remove(self, waiter):
+        """
+        Stop tracking the given waiter
+
+        :param NodeWaiter waiter: waiter to remove
+        :return: None
+        """
+        with self._cond:
+            waiters = self._waiters.get(waiter._href, [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                self._waiters.pop(waiter._href, None)
+
+    def _schedule(self, waiter):
+        interval = waiter._polling.schedule(waiter.stats)
+        heapq.heappush(self._queue, (
+            time.time() + interval, next(self._seq), waiter))
+        self._cond.notify()
+
+    def _due(self):
+        """
+        Block until at least one waiter is due and return all due waiters
+        grouped by node href
+        """
+        with self._cond:
+            while True:
+                now = time.time()
+                due = OrderedDict()
+                while self._queue and self._queue[0][0] <= now:
+                    waiter = heapq.heappop(self._queue)[2]
+                    if not waiter.done():
+                        due.setdefault(waiter._href, []).append(waiter)
+                if due:
+                    return due
+                timeout = self._queue[0][0] - now if self._queue else None
+                self._cond.wait(timeout)
+
+    def _read(self, waiter):
+        try:
+            return waiter._resource.status(), None
+        except Exception as e:
+            return None, e
+
+    def _run(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        while True:
+            due = self._due()
+            reads = self._executor.map(
+                self._read, [waiters[0] for waiters in due.values()])
+            for (href, waiters), (status, error) in zip(due.items(), reads):
+                for waiter in waiters:
+                    waiter.stats.record()
+                self._dispatch(href, status, error, self._completer.submit)
+                with self._cond:
+                    tracked = self._waiters.get(href, [])
+                    for waiter in waiters:
+                        if waiter in tracked:
+                            self._schedule(waiter)
+
+    def _dispatch(self, href, status, error=None, run=None):
+        """
+        Update waiters on the node and complete finished waiters using
+        run, or on the calling thread if run is None
+        """
+        with self._cond:
+            waiters = list(self._waiters.get(href, []))
+        for waiter in waiters:
+            if error is not None:
+                waiter._error = error
+            else:
+                value = getattr(status, waiter.value, None)
+                if value is not None:   # Keep last status if field missing
+                    waiter._status = value
+            if waiter.finished():
+                self.remove(waiter)
+                if run is not None:
+                    run(waiter._complete)
+                else:
+                    waiter._complete()
+
+    def notify(self, node_href, status):
+        """
+        Push a node status to all waiters on the node. Waiters that reach
+        the desired status complete immediately on the calling thread.
+        Fields missing from the status leave the last status of waiters on
+        those fields unchanged.
+
+        :param str node_href: href of the node
+        :param status: node status
+        :type status: NodeStatus or dict
+        :return: None
+        """
+        if isinstance(status, dict):
+            status = NodeStatus(**status)
+        self._dispatch(node_href, status)
+
+
+#: Status monitor shared by all node waiters
+status_monitor = StatusMonitor()
+
+
+class NodeWaiter(Future):
     """
-    Node Waiter provides a common threaded interface to monitoring
-    a nodes status and wait for a specific response.
+    Node Waiter provides a common interface to monitoring a nodes status
+    and wait for a specific response. Waiters do not run their own thread,
+    all waiters are tracked by the shared :class:`StatusMonitor` which
+    reads the status of each node once for all waiters on that node.
+
+    A waiter is a :class:`concurrent.futures.Future` whose result is
+    the last status retrieved. It can be used with
+    ``concurrent.futures.wait``, ``as_completed`` or ``asyncio.wrap_future``.
+
+    .. versionchanged:: 0.5.6
+        Callbacks added with :meth:`add_done_callback` receive the
+        waiter (future), obtain the status using ``result()``. Callbacks
+        run on a completion thread of the :class:`StatusMonitor` shared by
+        all waiters, or the thread calling :meth:`StatusMonitor.notify`,
+        avoid blocking in callbacks for long periods.
+
+    :param int timeout: seconds between status checks when no polling
+        strategy is provided
+    :param int max_wait: maximum number of status checks when no polling
+        strategy is provided
+    :param PollingStrategy polling: strategy from :py:mod:`smc.base.polling`
     """
     def __init__(self, resource, status, timeout=5,
-                 max_wait=36, **kw):
-        threading.Thread.__init__(self)
+                 max_wait=36, polling=None, **kw):
+        super(NodeWaiter, self).__init__()
         self._desired_status = status
         self._resource = resource #node resource
+        self._href = resource.href
         self._status = None
-        self._max_wait = max_wait
-        self._timeout = timeout
-        self.callbacks = []
-        self._done = threading.Event()
-        self.daemon = True
-        self.start()
-
-    def run(self):
-        while not self.finished():
-            time.sleep(self._timeout)
-            try:
-                self._status = self._get_status()
-                self._max_wait -= 1
-            except Exception as e:
-                self._status = e
-                break
-
-        self._done.set()
-        for call in self.callbacks:
-            call(self._status)
-
-    def _get_status(self):
-        # Raises NodeCommandFailed
-        latest = getattr(self._resource.status(), self.value)
-        return latest
+        self._error = None
+        self._stopped = False
+        self._polling = polling or FixedInterval(timeout, max_tries=max_wait)
+        self.stats = PollStats()
+        status_monitor.register(self)
+
+    def _complete(self):
+        with self._condition:
+            if self.done():
+                return
+            self.stats.done()
+            if self._error is not None:
+                self.set_exception(self._error)
+            else:
+                self.set_result(self._status)
 
     def finished(self):
-        return self._done.is_set() or \
+        return self._stopped or self._error is not None or \
             self._status == self._desired_status or \
-            self._max_wait == 0
+            self._polling.expired(self.stats)
 
-    def add_done_callback(self, callback):
+    def result(self, timeout=None):
         """
-        Add a callback to run after the task completes.
-        The callable must take 1 argument which will be
-        the completed Task.
+        Get current status result after waiting timeout. If the waiter
+        is not done within the timeout, the last retrieved status is
+        returned.
 
-        :param callable callback
+        :raises NodeCommandFailed: failure obtaining status
         """
-        if self._done.is_set():
-            raise ValueError(
-                'Thread has already terminated, cannot add callback.')
-        if callable(callback):
-            self.callbacks.append(callback)
+        self.wait(timeout)
+        if self.done():
+            return super(NodeWaiter, self).result(0)
+        return self._status
 
-    def done(self):
+    def wait(self, timeout=None):
         """
-        Is the task still running or considered complete
-
-        :rtype: bool
+        Blocking method to wait for the desired status
         """
-        return self._done.is_set() or not self.isAlive()
+        futures_wait([self], timeout)
 
-    def result(self, timeout=None):
+    def cancel(self):
         """
-        Get current status result after waiting timeout
-        """
-        self.wait(timeout)
-        return self._status
+        Stop tracking the node status without completing the waiter with
+        a status.
 
-    def wait(self, timeout=None):
-        """
-        Blocking method to wait for thread
+        :return: True if the waiter was cancelled
+        :rtype: bool
         """
-        self.join(timeout)
+        status_monitor.remove(self)
+        return super(NodeWaiter, self).cancel()
 
     def stop(self):
         """
-        Stop thread if it's still running
+        Stop waiting if still running
         """
-        if self.isAlive():
-            self._done.set()
+        if not self.done():
+            self._stopped = True
+            status_monitor.remove(self)
+            self._complete()
 
 
 class ConfigurationStatusWaiter(NodeWaiter):
@@ -142,8 +326,8 @@ class ConfigurationStatusWaiter(NodeWaiter):
     :param str status: used defined status to wait for.
     :raises NodeCommandFailed: Failure to obtain a status back
         from the engine. This can be thrown when getting initial
-        status. If thrown after the thread has started, it is caught
-        and returned in the ``result`` after ending the thread.
+        status. If thrown after the waiter has started, it is caught
+        and raised from ``result`` after the waiter is done.
     """
     value = 'configuration_status'
 
@@ -163,8 +347,8 @@ class NodeStatusWaiter(NodeWaiter):
     :param str status: used defined status to wait for.
     :raises NodeCommandFailed: Failure to obtain a status back
         from the engine. This can be thrown when getting initial
-        status. If thrown after the thread has started, it is caught
-        and returned in the ``result`` after ending the thread.
+        status. If thrown after the waiter has started, it is caught
+        and raised from ``result`` after the waiter is done.
     """
     value = 'status'
 
@@ -184,8 +368,8 @@ class NodeStateWaiter(NodeWaiter):
     :param str status: used defined status to wait for.
     :raises NodeCommandFailed: Failure to obtain a status back
         from the engine. This can be thrown when getting initial
-        status. If thrown after the thread has started, it is caught
-        and returned in the ``result`` after ending the thread.
+        status. If thrown after the waiter has started, it is caught
+        and raised from ``result`` after the waiter is done.
     """
     value = 'state'
 
@@ -434,3 +434,115 @@ def prepare_blacklist(src, dst, duration=3600, src_port1=None,
     json.update(end_point1=end_point1)
     json.update(end_point2=end_point2)
     return json
+
+
+class Blacklist(object):
+    """
+    Blacklist provides a container for multiple blacklist entries that can
+    be submitted to one or more engines (or the system) in bulk. Entries
+    use the same arguments as :py:func:`~prepare_blacklist`::
+
+        blacklist = Blacklist()
+        for address in addresses:
+            blacklist.add_entry(address, 'any', duration=600)
+
+        engine.blacklist_bulk(blacklist)
+
+    Push the entries to many engines concurrently::
+
+        results = bulk_blacklist(blacklist, engines, max_workers=10, rate=20)
+        failed = [r.item for r in results if r.exception]
+
+    :ivar list entries: list of prepared blacklist entries
+    """
+    def __init__(self, entries=None):
+        self.entries = list(entries) if entries else []
+
+    def add_entry(self, src, dst, duration=3600, **kw):
+        """
+        Add a blacklist entry. See :py:func:`~prepare_blacklist` for
+        valid arguments.
+
+        :return: None
+        """
+        self.entries.append(prepare_blacklist(src, dst, duration, **kw))
+
+    def batches(self, size=None):
+        """
+        Return the entries in batches of the json format expected by the
+        SMC bulk blacklist resource.
+
+        :param int size: entries per batch. If None, all entries are
+            returned in a single batch.
+        :rtype: generator(dict)
+        """
+        size = size or len(self.entries) or 1
+        for i in range(0, len(self.entries), size):
+            yield {'entries': self.entries[i:i + size]}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+
+def send_blacklist(element, blacklist, batch_size=500, limiter=None,
+                   exception=None):
+    """
+    Send blacklist entries to the element ``blacklist`` resource. When the
+    SMC supports bulk blacklisting (SMC >= 6.4), entries are aggregated up
+    to ``batch_size`` per request, otherwise one request is made per entry.
+    This is called from ``blacklist_bulk`` on the engine or system.
+
+    :param element: element providing the blacklist resource link
+    :param Blacklist blacklist: entries to send
+    :param int batch_size: maximum entries per request
+    :param RateLimiter limiter: optional limiter acquired before
+        each request
+    :param exception: exception to raise on failure
+    :return: None
+    """
+    from smc.compat import min_smc_version
+    if min_smc_version(6.4):
+        payloads = blacklist.batches(batch_size)
+    else:
+        payloads = iter(blacklist)
+    
+    for json in payloads:
+        if limiter is not None:
+            limiter.acquire()
+        if exception is not None:
+            element.send_cmd(exception, resource='blacklist', json=json)
+        else:
+            element.send_cmd(resource='blacklist', json=json)
+
+
+def bulk_blacklist(blacklist, engines, max_workers=10, rate=None,
+                   batch_size=500):
+    """
+    Push blacklist entries to multiple engines concurrently. Requests share
+    the session connection and can be rate limited to avoid overloading the
+    SMC. A failure on one engine does not affect the others.
+
+    :param Blacklist blacklist: blacklist entries. An iterable of entries
+        from :py:func:`~prepare_blacklist` is also accepted.
+    :param engines: engines to apply the blacklist to. Any object that
+        provides ``blacklist_bulk``, i.e. :class:`smc.core.engine.Engine`
+        or :class:`smc.administration.system.System`.
+    :param int max_workers: maximum engines to push to concurrently
+    :param float rate: optional maximum requests per second
+    :param int batch_size: maximum entries per request
+    :return: result per engine in the order provided
+    :rtype: list(smc.base.concurrency.Result)
+    """
+    from smc.base.concurrency import run_concurrent, RateLimiter
+    if not isinstance(blacklist, Blacklist):
+        blacklist = Blacklist(blacklist)
+    limiter = RateLimiter(rate) if rate else None
+
+    def push(engine):
+        engine.blacklist_bulk(
+            blacklist, batch_size=batch_size, limiter=limiter)
+
+    return run_concurrent(push, engines, max_workers=max_workers)
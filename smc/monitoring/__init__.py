@@ -4,6 +4,7 @@ import logging
 import websocket
 from websocket._exceptions import WebSocketTimeoutException
 from smc import session
+from smc.monitoring.fields import field_cache
 from pprint import pformat
 
 logger = logging.getLogger(__name__)
@@ -40,6 +41,7 @@ def websocket_query(query, timeout=60, sock_sleep=5):
             raise FetchFailed(fetch['failure'])
         
         if 'fields' in fetch:
+            field_cache.add(fetch['fields'])
             yield {'fields' : fetch['fields']}
             
         logger.debug('%s: Waiting for web socket results.', fetch['success'])
@@ -0,0 +1,394 @@
+"""
+Filter compiler turns the JSON representation of a query filter from
+:py:mod:`smc.monitoring.filters` into a python predicate that can be
+evaluated locally against log records. This makes it possible to open a
+single broad monitoring query and fan the results out to many consumers,
+each with their own filter, instead of opening one query per consumer.
+
+IP values are compiled into sorted integer intervals (single addresses,
+networks and ranges), constant, string and service values are compiled
+into sets. Field values are resolved to the record key based on the
+field format of the query, using the session
+:py:data:`smc.monitoring.fields.field_cache` when IDs need to be mapped to
+names.
+
+Compile a filter and evaluate records::
+
+    filt = InFilter(FieldValue(LogField.SRC), [IPValue('192.168.4.0/24')])
+    match = filt.compile(field_format='pretty')
+    for record in records:
+        if match(record):
+            ...
+
+Fan out a single real time stream to multiple subscribers::
+
+    query = LogQuery(fetch_type='current')
+    dispatcher = Dispatcher(field_format='pretty')
+    dispatcher.subscribe(
+        InFilter(FieldValue(LogField.SRC), [IPValue('10.0.0.0/8')]),
+        callback=print)
+    dispatcher.subscribe(
+        InFilter(FieldValue(LogField.ACTION), [StringValue('Discard')]),
+        callback=alert)
+    dispatcher.run(query)
+
+.. note:: Element values reference SMC elements by href and cannot be
+    evaluated locally. Constant values can only be evaluated against
+    records using the 'id' field format. Compiling a filter that uses
+    them otherwise, or a filter type that has no local representation,
+    raises ``ValueError``.
+"""
+import re
+import bisect
+import threading
+import ipaddress
+from smc.base.util import bytes_to_unicode
+from smc.monitoring.fields import field_cache
+
+
+def _ip_interval(value):
+    """
+    Return the integer interval (version, start, end) for an IP address,
+    network in cidr format or range in 'start-end' format.
+    """
+    value = bytes_to_unicode(str(value)).strip()
+    if '-' in value:
+        start, end = value.split('-', 1)
+        start = ipaddress.ip_address(start.strip())
+        end = ipaddress.ip_address(end.strip())
+        return start.version, int(start), int(end)
+    network = ipaddress.ip_network(value, strict=False)
+    return (network.version, int(network.network_address),
+            int(network.broadcast_address))
+
+
+def _parse_ip(value):
+    try:
+        addr = ipaddress.ip_address(bytes_to_unicode(str(value)).strip())
+    except ValueError:
+        return None
+    return addr.version, int(addr)
+
+
+class IPIntervals(object):
+    """
+    Sorted, merged integer intervals used to check membership of an IP
+    address with a binary search.
+
+    :param list values: IP addresses, networks or ranges
+    """
+    def __init__(self, values):
+        intervals = {}
+        for version, start, end in sorted(_ip_interval(v) for v in values):
+            merged = intervals.setdefault(version, [])
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self._starts = {version: [i[0] for i in merged]
+                        for version, merged in intervals.items()}
+        self._ends = {version: [i[1] for i in merged]
+                      for version, merged in intervals.items()}
+
+    def __contains__(self, value):
+        parsed = _parse_ip(value)
+        if parsed is None:
+            return False
+        version, ip = parsed
+        starts = self._starts.get(version)
+        if not starts:
+            return False
+        idx = bisect.bisect_right(starts, ip) - 1
+        return idx >= 0 and ip <= self._ends[version][idx]
+
+
+class _Matcher(object):
+    """
+    Matches a single record value against a set of literal values. IP
+    literals use interval checks, all other literals use set membership.
+
+    Constant values are numeric IDs, which are only present in records
+    using the 'id' field format. Records in 'name' or 'pretty' format
+    contain the display name of the value instead, which is not known
+    locally, so constants raise ``ValueError`` for these formats.
+    """
+    def __init__(self, literals, field_format='pretty'):
+        self.ips = None
+        self.values = set()
+        ips = []
+        for literal in literals:
+            if literal['type'] == 'ip':
+                ips.append(literal['value'])
+            elif literal['type'] == 'constant' and field_format != 'id':
+                raise ValueError(
+                    'Constant value %r cannot be evaluated locally for '
+                    'field format %r. Use field format \'id\', or a '
+                    'StringValue with the displayed value.' % (
+                        literal['value'], field_format))
+            elif literal['type'] in ('service', 'string', 'constant'):
+                self.values.add(_normalize(literal['value']))
+            else:
+                raise ValueError(
+                    'Value type %r cannot be evaluated locally.' %
+                    literal['type'])
+        if ips:
+            self.ips = IPIntervals(ips)
+
+    def __call__(self, value):
+        if value is None:
+            return False
+        if _normalize(value) in self.values:
+            return True
+        return self.ips is not None and value in self.ips
+
+
+def _normalize(value):
+    return bytes_to_unicode(str(value)).lower()
+
+
+def _field_getter(value, field_format):
+    """
+    Return a callable that extracts the field value from a record.
+    """
+    if 'id' in value:
+        if field_format == 'id':
+            keys = (str(value['id']), value['id'])
+        else:
+            name = field_cache.name_of(value['id'], field_format)
+            if name is None:
+                raise ValueError(
+                    'Unable to resolve log field ID: %s' % value['id'])
+            keys = (name,)
+    else:
+        name = value['name']
+        if field_format == 'name':
+            keys = (name,)
+        else:
+            field = field_cache.by_name(name)
+            if field is None:
+                raise ValueError(
+                    'Unable to resolve log field name: %s. Call '
+                    'field_cache.preload() first.' % name)
+            keys = (str(field['id']), field['id']) if field_format == 'id'\
+                else (field.get(field_format),)
+
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda record: record.get(key)
+
+    def getter(record):
+        for key in keys:
+            if key in record:
+                return record[key]
+    return getter
+
+
+def _compile_in(filt, field_format):
+    left, right = filt['left'], filt['right']
+    fields = [v for v in right if v['type'] == 'field']
+    if left['type'] == 'field':
+        getter = _field_getter(left, field_format)
+        matcher = _Matcher([v for v in right if v['type'] != 'field'],
+                           field_format)
+        getters = [_field_getter(v, field_format) for v in fields]
+        if not getters:
+            return lambda record: matcher(getter(record))
+
+        def in_with_fields(record):
+            value = getter(record)
+            if matcher(value):
+                return True
+            if value is None:
+                return False
+            value = _normalize(value)
+            for g in getters:
+                other = g(record)
+                if other is not None and value == _normalize(other):
+                    return True
+            return False
+        return in_with_fields
+
+    # Literal on the left, match if any of the right fields match
+    matcher = _Matcher([left], field_format)
+    getters = [_field_getter(v, field_format) for v in fields]
+    return lambda record: any(matcher(g(record)) for g in getters)
+
+
+def _compile_defined(filt, field_format):
+    getter = _field_getter(filt['value'], field_format)
+    return lambda record: getter(record) not in (None, '')
+
+
+_translated_field = r'\$(?P<field>\w+)'
+_translated_union = re.compile(
+    _translated_field + r'\s+IN\s+union\((?P<values>.*)\)$')
+_translated_range = re.compile(
+    _translated_field + r'\s+IN\s+range\((?P<values>.*)\)$')
+_translated_equal = re.compile(
+    _translated_field + r'\s*==\s*ipv4\("(?P<value>[^"]+)"\)$')
+_translated_value = re.compile(r'ipv4(?:_net)?\("([^"]+)"\)')
+
+
+def _compile_translated(filt, field_format):
+    """
+    Translated filters are free form SMC expressions. Only the
+    expressions generated by :class:`smc.monitoring.filters.TranslatedFilter`
+    helper methods are supported.
+    """
+    expression = filt.get('value', '').strip()
+    match = _translated_union.match(expression)
+    if match:
+        values = _translated_value.findall(match.group('values'))
+    else:
+        match = _translated_range.match(expression)
+        if match:
+            values = ['-'.join(_translated_value.findall(
+                match.group('values')))]
+        else:
+            match = _translated_equal.match(expression)
+            if not match:
+                raise ValueError(
+                    'Translated filter expression cannot be evaluated '
+                    'locally: %s' % expression)
+            values = [match.group('value')]
+
+    return _compile_in({
+        'left': {'type': 'field', 'name': match.group('field')},
+        'right': [{'type': 'ip', 'value': value} for value in values]},
+        field_format)
+
+
+def compile_filter(filt, field_format='pretty'):
+    """
+    Compile the JSON representation of a filter into a predicate that
+    takes a single record (dict) and returns True if the record matches.
+
+    :param dict filt: filter, i.e. the ``filter`` attribute of a
+        :class:`smc.monitoring.filters.QueryFilter`
+    :param str field_format: field format used for the records being
+        evaluated, 'id', 'name' or 'pretty'. (default: pretty)
+    :raises ValueError: filter cannot be evaluated locally
+    :rtype: callable
+    """
+    filter_type = filt.get('type')
+    if filter_type == 'in':
+        return _compile_in(filt, field_format)
+    elif filter_type == 'and':
+        predicates = [compile_filter(f, field_format) for f in filt['values']]
+        return lambda record: all(p(record) for p in predicates)
+    elif filter_type == 'or':
+        predicates = [compile_filter(f, field_format) for f in filt['values']]
+        return lambda record: any(p(record) for p in predicates)
+    elif filter_type == 'not':
+        predicate = compile_filter(filt['value'], field_format)
+        return lambda record: not predicate(record)
+    elif filter_type == 'defined':
+        return _compile_defined(filt, field_format)
+    elif filter_type == 'translated':
+        return _compile_translated(filt, field_format)
+    raise ValueError(
+        'Filter type %r cannot be evaluated locally.' % filter_type)
+
+
+class Subscription(object):
+    """
+    A subscription returned from :meth:`Dispatcher.subscribe`. Matching
+    records are passed to the callback if provided, otherwise they are
+    buffered in ``records`` until retrieved using :meth:`drain`.
+    """
+    def __init__(self, predicate, callback=None):
+        self.predicate = predicate
+        self.callback = callback
+        self.records = []
+        self.matched = 0
+
+    def _deliver(self, record):
+        self.matched += 1
+        if self.callback is not None:
+            self.callback(record)
+        else:
+            self.records.append(record)
+
+    def drain(self):
+        """
+        Return and clear the buffered records
+
+        :rtype: list(dict)
+        """
+        records, self.records = self.records, []
+        return records
+
+
+class Dispatcher(object):
+    """
+    Dispatcher fans out records from a single monitoring query to many
+    subscribers, each with it's own compiled filter. The query should be
+    broad enough to return all records any subscriber is interested in.
+
+    :param str field_format: field format of records being dispatched.
+        This should match the ``field_format`` of the query format.
+    """
+    def __init__(self, field_format='pretty'):
+        self.field_format = field_format
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, filt=None, callback=None):
+        """
+        Subscribe to records matching the filter. If no filter is
+        provided, all records are delivered.
+
+        :param QueryFilter filt: filter from :py:mod:`smc.monitoring.filters`
+        :param callable callback: optional callable that takes a single
+            record. If not provided, records are buffered on the
+            subscription.
+        :raises ValueError: filter cannot be evaluated locally
+        :rtype: Subscription
+        """
+        if filt is None:
+            predicate = lambda record: True
+        else:
+            predicate = filt.compile(self.field_format)
+        subscription = Subscription(predicate, callback)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscription
+
+        :param Subscription subscription: subscription to remove
+        :return: None
+        """
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def dispatch(self, records):
+        """
+        Evaluate each record against all subscriptions and deliver
+        the matches.
+
+        :param list(dict) records: records from a query result
+        :return: None
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for record in records:
+            for subscription in subscriptions:
+                if subscription.predicate(record):
+                    subscription._deliver(record)
+
+    def run(self, query, **kw):
+        """
+        Execute the query and dispatch all returned records until the
+        query completes or is interrupted.
+
+        :param Query query: query to execute
+        :param kw: keyword arguments passed to ``query.execute``
+        :return: None
+        """
+        for result in query.execute(**kw):
+            if 'records' in result:
+                self.dispatch(result['records'])
@@ -0,0 +1,147 @@
+"""
+Snapshot differencing for session monitoring queries such as
+:class:`smc.monitoring.queries.ConnectionQuery`,
+:class:`smc.monitoring.queries.BlacklistQuery`,
+:class:`smc.monitoring.queries.RoutingQuery` and
+:class:`smc.monitoring.queries.UserQuery`.
+
+Session queries return the full table on every execution. A
+:class:`SnapshotDiff` keeps the previous snapshot and returns only the rows
+that were added, removed or changed since the last poll. Only a digest of
+each row is retained between polls so memory is bounded by the number of
+rows in the table.
+
+Poll the connection table and ship only the differences::
+
+    diff = SnapshotDiff(
+        ConnectionQuery('sg_vm'),
+        key=['Src Addr', 'Src Port', 'Dst Addr', 'Dst Port', 'IP Protocol'])
+
+    while True:
+        changes = diff.poll()
+        if changes:
+            publish(changes.added, changes.removed, changes.changed)
+        time.sleep(5)
+
+The first poll returns every row as added. Removed rows are returned as
+their identity key only, since the row itself is no longer retained.
+
+A poll that fails raises the query exception, and a poll that times out
+before the snapshot is complete returns None. In both cases the retained
+snapshot is not modified, so rows are not reported as removed because a
+poll was incomplete.
+"""
+import json
+import hashlib
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+
+class Changes(namedtuple('Changes', 'added removed changed')):
+    """
+    Changes between two snapshots.
+
+    :ivar list added: new rows
+    :ivar list removed: identity keys of rows that no longer exist
+    :ivar list changed: rows that exist in both snapshots with different
+        values (the new row is returned)
+    """
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+    __nonzero__ = __bool__
+
+
+def _digest(record):
+    return hashlib.sha1(json.dumps(
+        record, sort_keys=True, default=str).encode('utf-8')).digest()
+
+
+class SnapshotDiff(object):
+    """
+    Stateful wrapper around a session monitoring query that keeps the last
+    snapshot and computes the differences on each poll.
+
+    :param Query query: session monitoring query
+    :param key: record identity. Either a list of field names whose values
+        identify a row, or a callable that takes a record and returns a
+        hashable identity.
+    :type key: list(str) or callable
+    :raises ValueError: no key was provided
+    """
+    def __init__(self, query, key):
+        self.query = query
+        if not key:
+            raise ValueError('A key is required to identify rows.')
+        if callable(key):
+            self._key = key
+        else:
+            fields = tuple(key)
+            self._key = lambda record: tuple(
+                record.get(field) for field in fields)
+        self._snapshot = {}  # identity -> digest
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def reset(self):
+        """
+        Clear the retained snapshot. The next poll will return every row
+        as added.
+
+        :return: None
+        """
+        self._snapshot = {}
+
+    def update(self, records):
+        """
+        Compute changes against the retained snapshot from a new full set
+        of records and retain the new snapshot.
+
+        :param list(dict) records: all rows of the current snapshot
+        :rtype: Changes
+        """
+        snapshot = {}
+        added, changed = [], []
+        for record in records:
+            identity = self._key(record)
+            digest = _digest(record)
+            snapshot[identity] = digest
+            previous = self._snapshot.get(identity)
+            if previous is None:
+                added.append(record)
+            elif previous != digest:
+                changed.append(record)
+        removed = [identity for identity in self._snapshot
+                   if identity not in snapshot]
+        self._snapshot = snapshot
+        return Changes(added, removed, changed)
+
+    def poll(self, **kw):
+        """
+        Execute the query and return the changes since the last poll. If
+        the query ends before the snapshot is received, for example on a
+        timeout, None is returned and the retained snapshot is kept.
+
+        :param kw: keyword arguments passed to ``query.execute``, for
+            example ``pool`` to run on a shared monitoring socket
+        :raises FetchFailed: the query failed
+        :return: changes, or None if the poll was incomplete
+        :rtype: Changes
+        """
+        results = self.query.execute(**kw)
+        records, received = [], False
+        for result in results:
+            if 'records' in result:
+                received = True
+                records.extend(result['records'])
+        # Pooled fetches report completion, otherwise a snapshot is
+        # complete once a records payload is received
+        if not getattr(results, 'complete', received):
+            logger.warning('Snapshot of %s is incomplete, skipping diff.',
+                           type(self.query).__name__)
+            return None
+        return self.update(records)
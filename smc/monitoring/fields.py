@@ -0,0 +1,267 @@
+"""
+Field cache provides a local catalog of log field definitions so that log
+field IDs can be mapped to their internal names and pretty names without
+opening a new monitoring query each time.
+
+The catalog is kept per SMC API version and is populated lazily. Fields
+that have not been seen yet are requested from the SMC in a single query,
+and any query using a :class:`smc.monitoring.formats.DetailedFormat` will
+also feed the field definitions returned in it's first payload into the
+cache.
+
+Resolve field IDs using the session cache::
+
+    >>> from smc.monitoring.fields import field_cache
+    >>> from smc.monitoring.constants import LogField
+    >>> field_cache.name_of(LogField.SRC)
+    'Src'
+    >>> field_cache.name_of(LogField.SRC, field_format='pretty')
+    'Src Addr'
+
+The catalog can be persisted to disk and loaded on the next run to avoid
+the initial query entirely::
+
+    field_cache.preload()
+    field_cache.save('/tmp/smc_fields.json')
+    ...
+    field_cache.load('/tmp/smc_fields.json')
+
+Records retrieved using ``field_format='id'`` can be decoded locally::
+
+    query = LogQuery(fetch_size=50)
+    query.format.field_format('id')
+    for result in query.execute():
+        for record in field_cache.decode(result.get('records', [])):
+            print(record)
+
+"""
+import json
+import threading
+from smc import session
+from smc.monitoring.constants import LogField
+
+
+def _catalog_ids():
+    """
+    All known log field IDs from the LogField constants.
+
+    :rtype: list(int)
+    """
+    return sorted(set(
+        value for attr, value in vars(LogField).items()
+        if not attr.startswith('_') and isinstance(value, int)))
+
+
+def query_field_ids(ids):
+    """
+    Make a monitoring query for the given log field IDs. A detailed format
+    query is used with a fetch size of 0 which returns only the field
+    definitions and aborts the query.
+
+    :param list ids: list of log field IDs
+    :return: raw dict representation of log fields
+    :rtype: list(dict)
+    """
+    from smc.monitoring.queries import LogQuery
+    request = {
+        'fetch': {'quantity': 0},
+        'format': {
+            'type': 'detailed',
+            'field_ids': list(ids)},
+        'query': {}
+    }
+    query = LogQuery()
+    query.request = request
+    for fields in query.execute():
+        if 'fields' in fields:
+            return fields['fields']
+    return []
+
+
+class FieldCache(object):
+    """
+    Cache of log field definitions keyed by SMC API version. Each field
+    definition is the raw dict returned by the SMC when using a detailed
+    format, which includes the field ``id``, ``name`` and ``pretty`` name.
+
+    The cache is thread safe and intended to be shared for the duration of
+    the session. Use the module level ``field_cache`` instance.
+
+    :param str path: optional path to a file previously saved using
+        :meth:`save`. If the file exists it is loaded immediately.
+    """
+    def __init__(self, path=None):
+        self._catalog = {}  # version -> {id: field}
+        self._misses = {}   # version -> set of unknown ids
+        self._lock = threading.Lock()
+        if path is not None:
+            try:
+                self.load(path)
+            except IOError:
+                pass
+
+    @property
+    def version(self):
+        """
+        Version key for the current session
+
+        :rtype: str
+        """
+        return str(session.api_version)
+
+    def _fields(self, version=None):
+        return self._catalog.setdefault(
+            version if version is not None else self.version, {})
+
+    def add(self, fields, version=None):
+        """
+        Add field definitions to the cache. This is called automatically
+        when a detailed format query returns the field map.
+
+        :param list(dict) fields: raw field definitions from the SMC
+        :return: None
+        """
+        with self._lock:
+            cached = self._fields(version)
+            misses = self._misses.get(
+                version if version is not None else self.version, set())
+            for field in fields:
+                if 'id' in field:
+                    cached[int(field['id'])] = field
+                    misses.discard(int(field['id']))
+
+    def resolve(self, ids):
+        """
+        Return the field definitions for the given IDs. Any IDs that are
+        not cached are fetched from the SMC in a single query. IDs that
+        the SMC does not return are remembered as unknown and are not
+        requested again until the cache is cleared.
+
+        :param list ids: list of log field IDs. Use LogField constants
+            to simplify search.
+        :return: raw dict representation of log fields
+        :rtype: list(dict)
+        """
+        ids = [int(_id) for _id in ids]
+        cached = self._fields()
+        with self._lock:
+            misses = self._misses.setdefault(self.version, set())
+        missing = [_id for _id in ids
+                   if _id not in cached and _id not in misses]
+        if missing:
+            self.add(query_field_ids(missing))
+            with self._lock:
+                misses.update(_id for _id in missing if _id not in cached)
+        return [cached[_id] for _id in ids if _id in cached]
+
+    def preload(self):
+        """
+        Fetch the full field catalog defined in
+        :class:`smc.monitoring.constants.LogField` in a single query.
+
+        :return: None
+        """
+        self.resolve(_catalog_ids())
+
+    def get(self, field_id):
+        """
+        Return the field definition for a single field ID.
+
+        :param int field_id: log field ID
+        :rtype: dict or None
+        """
+        fields = self.resolve([field_id])
+        return fields[0] if fields else None
+
+    def name_of(self, field_id, field_format='name'):
+        """
+        Map a field ID to it's representation in the given field format.
+
+        :param int field_id: log field ID
+        :param str field_format: 'name' or 'pretty'
+        :return: field name or None if the field is unknown
+        :rtype: str
+        """
+        field = self.get(field_id)
+        if field is not None:
+            return field.get(field_format)
+
+    def by_name(self, name):
+        """
+        Return the cached field definition by it's internal SMC name.
+        Only cached fields are searched, call :meth:`preload` first if
+        the full catalog is required.
+
+        :param str name: internal name of the field, i.e. 'Src'
+        :rtype: dict or None
+        """
+        for field in list(self._fields().values()):
+            if field.get('name') == name:
+                return field
+
+    def decode(self, records, field_format='pretty'):
+        """
+        Decode records retrieved using ``field_format='id'`` so that
+        record keys use the field name or pretty name. Unknown fields
+        are fetched once for the whole record set.
+
+        :param list(dict) records: records keyed by field ID
+        :param str field_format: 'name' or 'pretty'
+        :return: generator of decoded records
+        :rtype: dict
+        """
+        records = list(records)
+        ids = set()
+        for record in records:
+            ids.update(key for key in record if str(key).isdigit())
+        names = {}
+        for field in self.resolve(ids):
+            names[str(field['id'])] = field.get(field_format, field['id'])
+        for record in records:
+            yield {names.get(str(key), key): value
+                   for key, value in record.items()}
+
+    def clear(self):
+        """
+        Clear all cached field definitions
+
+        :return: None
+        """
+        with self._lock:
+            self._catalog.clear()
+            self._misses.clear()
+
+    def load(self, path):
+        """
+        Load a field catalog previously saved with :meth:`save`.
+        Cached versions are merged with existing entries.
+
+        :param str path: path to file
+        :raises IOError: problem reading from file
+        :return: None
+        """
+        with open(path) as f:
+            catalog = json.load(f)
+        for version, fields in catalog.items():
+            self.add(fields, version=version)
+
+    def save(self, path):
+        """
+        Save the field catalog for all cached versions to file.
+
+        :param str path: path to file
+        :raises IOError: problem writing to file
+        :return: None
+        """
+        with self._lock:
+            catalog = {version: list(fields.values())
+                       for version, fields in self._catalog.items()}
+        with open(path, 'w') as f:
+            json.dump(catalog, f)
+
+    def __len__(self):
+        return len(self._fields())
+
+
+#: Field cache for the current session
+field_cache = FieldCache()
@@ -46,6 +46,9 @@ For example, calling add_XX_filter methods multiple times to refine filter resul
     
 """
 
+from smc.monitoring.compiler import compile_filter
+
+
 class QueryFilter(object):
     def __init__(self, filter_type):
         self.filter = {
@@ -53,6 +56,20 @@ class QueryFilter(object):
     
     def update_filter(self, value):
         self.filter.update(value=value)
+    
+    def compile(self, field_format='pretty'):
+        """
+        Compile this filter into a predicate that can be evaluated
+        locally against query records.
+        
+        :param str field_format: field format of the records the filter
+            will be evaluated against, 'id', 'name' or 'pretty'
+        :raises ValueError: filter cannot be evaluated locally
+        :return: callable taking a record and returning bool
+        
+        .. seealso:: :py:mod:`smc.monitoring.compiler`
+        """
+        return compile_filter(self.filter, field_format)
         
 
 class InFilter(QueryFilter):
@@ -0,0 +1,332 @@
+"""
+Monitoring pool keeps a small number of authenticated monitoring web sockets
+open and multiplexes several queries (fetches) over each socket. Replies
+are routed to the originating query by the ``fetch`` id assigned by the
+SMC when the query is started.
+
+When monitoring many engines, this avoids a TLS handshake and new socket
+for every query::
+
+    pool = MonitoringPool(max_sockets=2, max_fetches=25)
+    for engine in engines:
+        for result in ConnectionQuery(engine.name).execute(pool=pool):
+            ...
+    pool.close()
+
+Queries can also be started and consumed concurrently, each from it's own
+thread, while sharing the underlying sockets::
+
+    fetches = [pool.execute(BlacklistQuery(name)) for name in names]
+    for fetch in fetches:
+        for result in fetch:
+            ...
+
+Queries are started one at a time per socket since the SMC acknowledges
+a query before the fetch id is known. Once acknowledged, any number of
+queries can be streaming over the same socket, up to ``max_fetches``.
+"""
+import json
+import logging
+import threading
+import websocket
+from websocket._exceptions import WebSocketTimeoutException,\
+    WebSocketConnectionClosedException
+from smc import session
+from smc.monitoring import FetchFailed
+from smc.monitoring.fields import field_cache
+
+try:
+    import queue
+except ImportError:  # Python 2.7
+    import Queue as queue
+
+logger = logging.getLogger(__name__)
+
+
+SESSION_LOCATION = '/monitoring/session/socket'
+
+_CLOSED = object()  # Sentinel put on fetch queues when socket closes
+
+
+class Fetch(object):
+    """
+    A single query running on a pooled socket. Iterate the fetch to
+    obtain results in the same format as :meth:`smc.monitoring.queries.Query.execute`.
+    The fetch is aborted on the SMC once iteration completes or
+    :meth:`abort` is called.
+    """
+    def __init__(self, socket, query, timeout):
+        self.socket = socket
+        self.query = query
+        self.timeout = timeout
+        self.fetch_id = None
+        self.fields = None
+        #: True once the SMC has sent all results of the fetch
+        self.complete = False
+        self._queue = queue.Queue()
+        self._finished = False
+
+    def _receive(self):
+        try:
+            message = self._queue.get(timeout=self.timeout)
+        except queue.Empty:
+            logger.error('Fetch %s timed out waiting for results.',
+                         self.fetch_id)
+            return None
+        if message is _CLOSED:
+            return None
+        return message
+
+    def __iter__(self):
+        try:
+            if self.fields is not None:
+                yield {'fields': self.fields}
+
+            if self.query.fetch_size == 0:
+                return
+
+            while not self._finished:
+                message = self._receive()
+                if message is None:
+                    break
+                if 'failure' in message:
+                    raise FetchFailed(message['failure'])
+                if 'status' in message:
+                    logger.info(message['status'])
+                if message.get('records'):
+                    yield message
+                if 'end' in message:
+                    self.complete = True
+                    break
+                if self.socket.location == SESSION_LOCATION and \
+                        'records' in message and 'status' not in message:
+                    self.complete = True
+                    break  # Session monitoring snapshot complete
+        finally:
+            self.abort()
+
+    def abort(self):
+        """
+        Abort the fetch and release it from the socket
+
+        :return: None
+        """
+        if not self._finished:
+            self._finished = True
+            self.socket._release(self)
+
+
+class MonitoringSocket(object):
+    """
+    Authenticated web socket to a monitoring location. A reader thread
+    receives all messages and routes them to the owning fetch.
+
+    :param str location: socket location, i.e. /monitoring/log/socket
+    :param int timeout: socket timeout in seconds
+    :param callable on_release: optional callable run when a fetch is
+        released from this socket
+    """
+    def __init__(self, location, timeout=60, on_release=None):
+        self.location = location
+        self.on_release = on_release
+        self.session_id = session.session_id
+        self._fetches = {}  # fetch id -> Fetch
+        self._released = set()  # fetch ids of released fetches
+        self._starting = None  # Fetch waiting for acknowledgement
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self.ws = websocket.create_connection(
+            session.web_socket_url + location,
+            header={'Cookie': self.session_id},
+            timeout=timeout)
+        self._reader = threading.Thread(target=self._read)
+        self._reader.daemon = True
+        self._reader.start()
+
+    @property
+    def connected(self):
+        return self.ws.connected and self.session_id == session.session_id
+
+    @property
+    def active(self):
+        """
+        Number of fetches running on this socket
+
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._fetches) + (1 if self._starting else 0)
+
+    def _send(self, data):
+        with self._send_lock:
+            self.ws.send(json.dumps(data))
+
+    def _read(self):
+        while self.ws.connected:
+            try:
+                message = json.loads(self.ws.recv())
+            except WebSocketTimeoutException:
+                continue
+            except (WebSocketConnectionClosedException, ValueError,
+                    IOError) as e:
+                logger.debug('Monitoring socket closed: %s', e)
+                break
+            self._route(message)
+
+        with self._lock:
+            fetches = list(self._fetches.values())
+            if self._starting:
+                fetches.append(self._starting)
+            self._fetches.clear()
+        for fetch in fetches:
+            fetch._queue.put(_CLOSED)
+
+    def _route(self, message):
+        """
+        Route a message to the fetch with the message fetch id. Late
+        replies for released fetches are dropped. The fetch waiting for
+        acknowledgement only receives a reply with a new fetch id, or a
+        failure without a fetch id.
+        """
+        fetch_id = message.get('fetch')
+        with self._lock:
+            fetch = self._fetches.get(fetch_id)
+            if fetch is None and fetch_id not in self._released:
+                if self._starting is not None:
+                    if fetch_id is not None or 'failure' in message:
+                        fetch = self._starting
+                elif fetch_id is None and len(self._fetches) == 1:
+                    fetch = next(iter(self._fetches.values()))
+        if fetch is not None:
+            fetch._queue.put(message)
+        else:
+            logger.debug('Discarding unrouted message: %s', message)
+
+    def start(self, query, timeout=60):
+        """
+        Start the query on this socket and wait for the SMC to
+        acknowledge with the fetch id.
+
+        :param Query query: query to start
+        :param int timeout: time to wait for a message before the fetch
+            is considered timed out
+        :raises FetchFailed: SMC refused the query
+        :rtype: Fetch
+        """
+        fetch = Fetch(self, query, timeout)
+        with self._start_lock:
+            with self._lock:
+                self._starting = fetch
+            try:
+                self._send(query.request)
+                ack = fetch._receive()
+            finally:
+                with self._lock:
+                    self._starting = None
+
+            if ack is None:
+                raise FetchFailed('No acknowledgement received for query.')
+            if 'failure' in ack:
+                raise FetchFailed(ack['failure'])
+
+            fetch.fetch_id = ack.get('fetch')
+            if 'fields' in ack:
+                field_cache.add(ack['fields'])
+                fetch.fields = ack['fields']
+            with self._lock:
+                self._fetches[fetch.fetch_id] = fetch
+        return fetch
+
+    def _release(self, fetch):
+        with self._lock:
+            registered = self._fetches.pop(fetch.fetch_id, None)
+            if fetch.fetch_id is not None:
+                self._released.add(fetch.fetch_id)
+        if registered is not None and self.ws.connected:
+            try:
+                self._send({'abort': fetch.fetch_id})
+            except (WebSocketConnectionClosedException, IOError):
+                pass
+        if self.on_release is not None:
+            self.on_release()
+
+    def close(self):
+        """
+        Close the socket, any running fetches will end.
+
+        :return: None
+        """
+        if self.ws.connected:
+            self.ws.close()
+
+
+class MonitoringPool(object):
+    """
+    Pool of monitoring web sockets. Sockets are created per monitoring
+    location on demand and re-used while the session is valid.
+
+    :param int max_sockets: maximum sockets per monitoring location
+    :param int max_fetches: maximum concurrent fetches per socket. Once
+        all sockets are at capacity, new queries wait for a free slot.
+    :param int timeout: socket timeout in seconds
+    """
+    def __init__(self, max_sockets=2, max_fetches=10, timeout=60):
+        self.max_sockets = max_sockets
+        self.max_fetches = max_fetches
+        self.timeout = timeout
+        self._sockets = {}  # location -> list(MonitoringSocket)
+        self._lock = threading.Condition()
+
+    def _acquire(self, location):
+        with self._lock:
+            while True:
+                sockets = [sock for sock in self._sockets.get(location, [])
+                           if sock.connected]
+                self._sockets[location] = sockets
+                available = [sock for sock in sockets
+                             if sock.active < self.max_fetches]
+                if available:
+                    return min(available, key=lambda sock: sock.active)
+                if len(sockets) < self.max_sockets:
+                    sock = MonitoringSocket(
+                        location, self.timeout, on_release=self._notify)
+                    sockets.append(sock)
+                    return sock
+                self._lock.wait(1)
+
+    def execute(self, query, timeout=None):
+        """
+        Start the query on a pooled socket.
+
+        :param Query query: query from :py:mod:`smc.monitoring.queries`
+        :param int timeout: how long to wait when not receiving updates
+            before ending the fetch (default: pool timeout)
+        :raises FetchFailed: SMC refused the query
+        :return: iterable fetch yielding query results
+        :rtype: Fetch
+        """
+        sock = self._acquire(query.location)
+        return sock.start(query, timeout or self.timeout)
+
+    def _notify(self):
+        with self._lock:
+            self._lock.notify_all()
+
+    def close(self):
+        """
+        Close all sockets in the pool
+
+        :return: None
+        """
+        with self._lock:
+            for sockets in self._sockets.values():
+                for sock in sockets:
+                    sock.close()
+            self._sockets.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
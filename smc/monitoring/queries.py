@@ -9,6 +9,7 @@ from smc.monitoring.filters import TranslatedFilter, InFilter, AndFilter,\
     OrFilter, NotFilter, DefinedFilter
 from smc.monitoring.formats import TextFormat
 from smc.monitoring.formatters import TimeFormat
+from smc.monitoring.fields import field_cache
 
 
 class Query(object):
@@ -65,12 +66,18 @@ class Query(object):
         :param int sock_timeout: specifies how long (in seconds) to sleep
             between recv calls when buffering data back to the client. For
             'current' queries, this value should be set to 1.
+        :param MonitoringPool pool: optional pool to run the query on a
+            shared web socket instead of opening a new socket. See
+            :py:mod:`smc.monitoring.pool`.
         :return: dict of list items. Returned dict key will either be 'fields'
             or 'records' with a list of dict as value/s. ``Fields`` will only
             be returned if detailed format is used and provides the field to
             name, ID mapping as the first payload reply.
         :rtype: dict(list)
         """
+        pool = kw.pop('pool', None)
+        if pool is not None:
+            return pool.execute(self, timeout)
         try:
             if 'current' in self.request['query']['type']:
                 sock_timeout = 1
@@ -83,26 +90,18 @@ def resolve_field_ids(ids):
     """
     Retrieve the log field details based on the LogField constant
     IDs. This provides a helper to view the fields representation
-    when using different field_formats.
+    when using different field_formats. Field details are cached
+    for the session, only fields not previously seen will require
+    a query to the SMC.
     
     :param list ids: list of log field IDs. Use LogField constants
         to simplify search.
     :return: raw dict representation of log fields 
     :rtype: list(dict)
+    
+    .. seealso:: :py:mod:`smc.monitoring.fields`
     """
-    request = {
-        'fetch': {'quantity': 0},
-        'format': {
-            'type': 'detailed',
-            'field_ids': ids},
-        'query': {}
-    }
-    query = LogQuery()
-    query.request = request
-    for fields in query.execute():
-        if 'fields' in fields:
-            return fields['fields']
-    return []
+    return field_cache.resolve(ids)
         
     
 class LogQuery(Query):
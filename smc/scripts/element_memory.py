@@ -0,0 +1,109 @@
+"""
+Measure the memory used by element references returned from searches,
+and the rate at which search results are converted to elements.
+
+By default synthetic search results are used, so no SMC connection is
+required::
+
+    python -m smc.scripts.element_memory --count 100000
+
+To measure against a live SMC, provide the url and api key; all elements
+returned from a search are measured::
+
+    python -m smc.scripts.element_memory --url http://1.1.1.1:8082 \\
+        --api-key xxxxxxxx
+
+Requires Python 3.4+ for tracemalloc.
+"""
+import gc
+import time
+import argparse
+import tracemalloc
+from smc import session
+from smc.base.model import Element
+from smc.base.collection import Search
+
+
+def synthetic(count):
+    """
+    Generate search results in the format returned by the SMC
+
+    :param int count: number of results
+    :rtype: list(dict)
+    """
+    types = ('host', 'network', 'address_range', 'tcp_service', 'group',
+             'unknown_type_a', 'unknown_type_b')
+    return [
+        {'name': 'element-{}'.format(i),
+         'href': 'http://1.1.1.1:8082/6.2/elements/{}/{}'.format(
+             types[i % len(types)], i),
+         'type': str(types[i % len(types)])}
+        for i in range(count)]
+
+
+def measure(results):
+    """
+    Bytes allocated to create element references from search results
+
+    :param list results: search results as dicts
+    :return: (elements, total bytes)
+    :rtype: tuple
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    elements = [Element.from_meta(**result) for result in results]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return elements, size
+
+
+def throughput(results, repeat=3):
+    """
+    Best rate of converting search results to element references
+
+    :param list results: search results as dicts
+    :param int repeat: number of runs
+    :return: elements per second
+    :rtype: float
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        for result in results:
+            Element.from_meta(**result)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(results) / best if best else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=100000,
+                        help='number of synthetic elements')
+    parser.add_argument('--url', help='SMC url, use a live SMC')
+    parser.add_argument('--api-key', help='SMC api key')
+    args = parser.parse_args()
+
+    if args.url:
+        session.login(url=args.url, api_key=args.api_key)
+        try:
+            results = [{'name': element.name, 'href': element.href,
+                        'type': element.typeof}
+                       for element in Search.objects.all()]
+        finally:
+            session.logout()
+    else:
+        results = synthetic(args.count)
+
+    elements, size = measure(results)
+    count = len(elements) or 1
+    print('Elements: {}'.format(len(elements)))
+    print('Total: {:.1f} MB'.format(size / 1024.0 ** 2))
+    print('Per element: {:.0f} bytes'.format(size / float(count)))
+    print('Throughput: {:.0f} elements/s'.format(throughput(results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.api.exceptions import ActionCommandFailed, TaskRunFailed
+from smc.administration.archive import Archive
+
+
+def element(name, content=None, error=None, success=True):
+    """
+    Element whose export writes content, or that does not support export
+    when content is None
+    """
+    element = mock.Mock(href='http://1.1.1.1/elements/host/' + name,
+                        typeof='host')
+    element.name = name
+
+    def export(filename):
+        if content is None:
+            return []
+        task = mock.Mock()
+        task.task.success = success
+        if error is not None:
+            task.download.side_effect = error
+        else:
+            task.download.side_effect = lambda: filename.write(content)
+        return task
+    element.export.side_effect = export
+    return element
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.archive = Archive(self.path, max_workers=2)
+
+    def files(self):
+        return sorted(os.listdir(self.path))
+
+    def test_identical_content_stored_once(self):
+        results = self.archive.archive_exports([
+            element('a', b'same'), element('b', b'same'),
+            element('c', b'other')])
+        self.assertTrue(all(r.exception is None for r in results))
+        self.assertEqual(self.archive.get(results[0].item.href)['sha256'],
+                         self.archive.get(results[1].item.href)['sha256'])
+        objects = [f for _, _, files in os.walk(
+            os.path.join(self.path, 'objects')) for f in files]
+        self.assertEqual(len(objects), 2)
+        with open(self.archive.path_of(results[2].item.href), 'rb') as f:
+            self.assertEqual(f.read(), b'other')
+
+    def test_archived_elements_are_skipped(self):
+        self.archive.archive_exports([element('a', b'data')])
+        reloaded = Archive(self.path)
+        self.assertEqual(len(reloaded), 1)
+        self.assertEqual(reloaded.archive_exports([element('a', b'new')]), [])
+
+    def test_unsupported_export_is_reported(self):
+        results = self.archive.archive_exports([
+            element('a'), element('b', b'data')])
+        self.assertIsInstance(results[0].exception, ActionCommandFailed)
+        self.assertIsNone(results[1].exception)
+        self.assertNotIn(results[0].item.href, self.archive)
+        self.assertEqual(self.files(), ['index.json', 'objects'])
+
+    def test_unfinished_or_failed_export_is_not_archived(self):
+        results = self.archive.archive_exports([
+            element('a', b'', error=TaskRunFailed('did not finish')),
+            element('b', b'', success=False)])
+        self.assertIsInstance(results[0].exception, TaskRunFailed)
+        self.assertIsInstance(results[1].exception, ActionCommandFailed)
+        self.assertEqual(len(self.archive), 0)
+        results = self.archive.archive_exports([
+            element('a', b'data'), element('b', b'data')])
+        self.assertTrue(all(r.exception is None for r in results))
+        self.assertEqual(len(self.archive), 2)
+
+    def test_failed_save_keeps_previous_index(self):
+        self.archive.archive_exports([element('a', b'data')])
+        with open(os.path.join(self.path, 'index.json')) as f:
+            saved = json.load(f)
+        self.archive.add('key', lambda writer: writer.write(b'more'))
+        with mock.patch('smc.administration.archive.replace_file',
+                        side_effect=OSError('failed')):
+            self.assertRaises(OSError, self.archive.save)
+        with open(os.path.join(self.path, 'index.json')) as f:
+            self.assertEqual(json.load(f), saved)
+        self.assertEqual(self.files(), ['index.json', 'objects'])
+        self.archive.save()
+        self.assertIn('key', Archive(self.path))
@@ -0,0 +1,52 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.elements.other import Blacklist, send_blacklist, bulk_blacklist
+
+
+def blacklist(count):
+    blacklist = Blacklist()
+    for i in range(count):
+        blacklist.add_entry('1.1.1.{}/32'.format(i), 'any', duration=60)
+    return blacklist
+
+
+class TestBlacklist(unittest.TestCase):
+
+    def test_batches(self):
+        batches = list(blacklist(5).batches(2))
+        self.assertEqual([len(b['entries']) for b in batches], [2, 2, 1])
+        self.assertEqual(len(list(blacklist(5).batches())), 1)
+        self.assertEqual(list(Blacklist().batches()), [])
+
+    @mock.patch('smc.compat.min_smc_version', return_value=True)
+    def test_send_in_batches(self, version):
+        element = mock.Mock()
+        limiter = mock.Mock()
+        send_blacklist(element, blacklist(3), batch_size=2, limiter=limiter)
+        self.assertEqual(element.send_cmd.call_count, 2)
+        self.assertEqual(limiter.acquire.call_count, 2)
+        json = element.send_cmd.call_args_list[0][1]['json']
+        self.assertEqual(len(json['entries']), 2)
+
+    @mock.patch('smc.compat.min_smc_version', return_value=False)
+    def test_send_per_entry_on_older_smc(self, version):
+        element = mock.Mock()
+        entries = blacklist(3)
+        send_blacklist(element, entries, exception=ValueError)
+        self.assertEqual(element.send_cmd.call_count, 3)
+        for call, entry in zip(element.send_cmd.call_args_list, entries):
+            self.assertEqual(call[0], (ValueError,))
+            self.assertEqual(call[1]['json'], entry)
+
+    def test_bulk_blacklist_isolates_failures(self):
+        ok, failing = mock.Mock(), mock.Mock()
+        failing.blacklist_bulk.side_effect = ValueError('failed')
+        results = bulk_blacklist(blacklist(1).entries, [ok, failing])
+        self.assertEqual([r.item for r in results], [ok, failing])
+        self.assertIsNone(results[0].exception)
+        self.assertIsInstance(results[1].exception, ValueError)
+        self.assertIsInstance(
+            ok.blacklist_bulk.call_args[0][0], Blacklist)
@@ -0,0 +1,137 @@
+import threading
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.base.bulk import bulk_delete, bulk_upsert, _strongly_connected
+
+
+class Deletable(object):
+    """
+    Element with references and a shared log of deletions
+    """
+    def __init__(self, name, log, lock):
+        self.name = name
+        self.href = 'http://1.1.1.1/elements/host/' + name
+        self.referenced_by = []
+        self.log = log
+        self.lock = lock
+        self.error = None
+
+    def delete(self, unconditional=None):
+        if self.error is not None:
+            raise self.error
+        with self.lock:
+            self.log.append(self.name)
+
+    def __str__(self):
+        return self.name
+
+
+class TestStronglyConnected(unittest.TestCase):
+
+    def test_components(self):
+        graph = {1: [2], 2: [3], 3: [1, 4], 4: [5], 5: [4], 6: [1, 7]}
+        components = sorted(sorted(c) for c in _strongly_connected(graph))
+        self.assertEqual(components, [[1, 2, 3], [4, 5], [6]])
+
+    def test_deep_chain(self):
+        graph = dict((i, [i + 1]) for i in range(5000))
+        graph[5000] = [0]
+        self.assertEqual(len(_strongly_connected(graph)), 1)
+
+
+class TestBulkDelete(unittest.TestCase):
+
+    def setUp(self):
+        self.log = []
+        self.lock = threading.Lock()
+
+    def elements(self, *names):
+        return [Deletable(name, self.log, self.lock) for name in names]
+
+    def test_referrers_deleted_first(self):
+        policy, group, host = self.elements('policy', 'group', 'host')
+        host.referenced_by = [group]
+        group.referenced_by = [policy]
+        result = bulk_delete([host, group, policy])
+        self.assertEqual(self.log, ['policy', 'group', 'host'])
+        self.assertEqual(result.deleted, [policy, group, host])
+        self.assertEqual(result.residual, [])
+        self.assertEqual(result.cycles, [])
+
+    def test_external_reference_blocks_dependencies(self):
+        outside, group, host = self.elements('outside', 'group', 'host')
+        group.referenced_by = [outside]
+        host.referenced_by = [group]
+        result = bulk_delete([host, group])
+        self.assertEqual(self.log, [])
+        self.assertEqual([(r.element, r.reason) for r in result.residual], [
+            (host, 'Referenced by: group'), (group, 'Referenced by: outside')])
+
+    def test_only_cycle_is_deleted_together(self):
+        policy, a, b, host = self.elements('policy', 'a', 'b', 'host')
+        a.referenced_by = [policy, b]
+        b.referenced_by = [a]
+        host.referenced_by = [a]
+        result = bulk_delete([host, a, b, policy])
+        self.assertEqual(self.log[0], 'policy')
+        self.assertEqual(sorted(self.log[1:3]), ['a', 'b'])
+        self.assertEqual(self.log[3], 'host')
+        self.assertEqual(result.cycles, [[a, b]])
+        self.assertEqual(len(result.deleted), 4)
+
+    def test_failed_delete_keeps_referenced_elements(self):
+        group, host = self.elements('group', 'host')
+        host.referenced_by = [group]
+        group.error = ValueError('locked')
+        result = bulk_delete([host, group])
+        self.assertEqual(self.log, [])
+        self.assertEqual([r.element for r in result.residual],
+                         [host, group])
+        self.assertIsInstance(result.residual[1].reason, ValueError)
+
+
+class Existing(object):
+
+    def __init__(self, name, **data):
+        self.name = name
+        self.data = dict(data, name=name)
+        self.update = mock.Mock()
+
+
+class TestBulkUpsert(unittest.TestCase):
+
+    def setUp(self):
+        self.web1 = Existing('web1', address='10.0.0.1')
+        self.db1 = Existing('db1', address='10.0.1.1')
+        self.cls = mock.Mock()
+        self.cls.objects.all.return_value = [self.web1, self.db1]
+        self.cls.create.side_effect = lambda **record: record['name']
+
+    def test_only_new_and_changed_records_are_sent(self):
+        result = bulk_upsert(self.cls, [
+            {'name': 'web1', 'address': '10.0.0.1'},
+            {'name': 'db1', 'address': '10.0.1.2'},
+            {'name': 'web2', 'address': '10.0.0.2'}])
+        self.assertEqual(result.created, ['web2'])
+        self.assertEqual(result.updated, [self.db1])
+        self.assertEqual(result.unchanged, [self.web1])
+        self.assertEqual(result.failed, [])
+        self.db1.update.assert_called_once_with(
+            name='db1', address='10.0.1.2')
+        self.assertFalse(self.web1.update.called)
+
+    def test_duplicate_keys_are_rejected(self):
+        with self.assertRaises(ValueError) as raised:
+            bulk_upsert(self.cls, [
+                {'name': 'web2', 'address': '10.0.0.2'},
+                {'name': 'web2', 'address': '10.0.0.3'}])
+        self.assertIn('web2', str(raised.exception))
+        self.assertFalse(self.cls.create.called)
+
+    def test_records_without_key_fail(self):
+        result = bulk_upsert(self.cls, [{'address': '10.0.0.9'}])
+        self.assertEqual(len(result.failed), 1)
+        self.assertIsInstance(result.failed[0][1], KeyError)
@@ -0,0 +1,95 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.api.common import SMCRequest
+from smc.api.exceptions import SMCOperationFailure, ChangesetFailed, \
+    UpdateElementFailed
+from smc.base.changeset import Changeset, current_changeset
+
+
+def failure(code, msg):
+    error = SMCOperationFailure()
+    error.code = code
+    error.smcresult.msg = msg
+    return error
+
+
+def request(href, etag=None, **json):
+    request = SMCRequest(href=href, etag=etag, json=json)
+    request.exception = UpdateElementFailed
+    return request
+
+
+class Element(object):
+
+    def __init__(self):
+        self.data = {'cached': True}
+
+
+@mock.patch('smc.base.changeset.session')
+class TestChangeset(unittest.TestCase):
+
+    def test_updates_to_same_href_are_merged(self, session):
+        changes = Changeset()
+        element = Element()
+        changes.add(element, request('http://1/host/1', 'etag1', a=1))
+        changes.add(element, request('http://1/host/1', 'etag2', a=1, b=2))
+        changes.add(Element(), request('http://1/host/2', 'etag3', c=3))
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(changes.get('http://1/host/1'), {'a': 1, 'b': 2})
+        self.assertIsNone(changes.get('http://1/host/3'))
+
+        changes.flush()
+        sent = [call[0][1] for call in
+                session.connection.send_request.call_args_list]
+        self.assertEqual(sorted((r.href, r.etag) for r in sent), [
+            ('http://1/host/1', 'etag1'), ('http://1/host/2', 'etag3')])
+        self.assertNotIn('data', element.__dict__)
+        self.assertEqual(len(changes), 0)
+
+    def test_all_updates_tried_before_failing(self, session):
+        def send(method, req):
+            if req.href.endswith('1'):
+                raise failure(409, 'modified')
+            if req.href.endswith('2'):
+                raise failure(400, 'invalid')
+        session.connection.send_request.side_effect = send
+        changes = Changeset()
+        for i in range(1, 4):
+            changes.add(Element(), request('http://1/host/{}'.format(i)))
+        with self.assertRaises(ChangesetFailed) as raised:
+            changes.flush()
+        error = raised.exception
+        self.assertEqual(len(error.results), 3)
+        self.assertEqual([r.href for r in error.failed],
+                         ['http://1/host/1', 'http://1/host/2'])
+        self.assertEqual([r.href for r in error.conflicts],
+                         ['http://1/host/1'])
+        self.assertIsInstance(error.failed[1].exception, UpdateElementFailed)
+
+    def test_context_flushes_on_exit(self, session):
+        with Changeset() as changes:
+            self.assertIs(current_changeset(), changes)
+            changes.add(Element(), request('http://1/host/1'))
+        self.assertIsNone(current_changeset())
+        self.assertEqual(session.connection.send_request.call_count, 1)
+        self.assertEqual(len(changes.results), 1)
+
+    def test_context_discards_on_exception(self, session):
+        try:
+            with Changeset() as changes:
+                changes.add(Element(), request('http://1/host/1'))
+                raise ValueError('failed')
+        except ValueError:
+            pass
+        self.assertFalse(session.connection.send_request.called)
+        self.assertEqual(len(changes), 0)
+        self.assertIsNone(current_changeset())
+
+    def test_nested_changesets(self, session):
+        with Changeset() as outer:
+            with Changeset() as inner:
+                self.assertIs(current_changeset(), inner)
+            self.assertIs(current_changeset(), outer)
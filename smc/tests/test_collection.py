@@ -0,0 +1,46 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.api.exceptions import FetchElementFailed
+from smc.base.collection import hydrate
+from smc.base.model import SimpleElement
+from smc.elements.network import Host
+
+
+def host(i):
+    return Host('host{}'.format(i), type='host',
+                href='http://1.1.1.1/elements/host/{}'.format(i))
+
+
+def load(href):
+    if href.endswith('/99'):
+        raise FetchElementFailed('not found')
+    return SimpleElement(etag='1', address='10.0.0.' + href.split('/')[-1])
+
+
+@mock.patch('smc.base.model.LoadElement', side_effect=load)
+class TestHydrate(unittest.TestCase):
+
+    def test_loads_data_once(self, loader):
+        hosts = [host(i) for i in range(5)]
+        self.assertEqual(hydrate(hosts + [hosts[0]], concurrency=3),
+                         hosts + [hosts[0]])
+        self.assertEqual(loader.call_count, 5)
+        self.assertEqual([h.address for h in hosts],
+                         ['10.0.0.{}'.format(i) for i in range(5)])
+        self.assertEqual(loader.call_count, 5)
+
+    def test_loaded_elements_are_skipped(self, loader):
+        loaded = host(1)
+        loaded.data = SimpleElement(address='cached')
+        hydrate([loaded, host(2)])
+        loader.assert_called_once_with('http://1.1.1.1/elements/host/2')
+        self.assertEqual(loaded.address, 'cached')
+
+    def test_failure_is_raised_on_access(self, loader):
+        missing = host(99)
+        hydrate([missing, host(1)])
+        self.assertNotIn('data', vars(missing))
+        self.assertRaises(FetchElementFailed, lambda: missing.data)
@@ -0,0 +1,147 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.monitoring.compiler import IPIntervals, Dispatcher, compile_filter
+from smc.monitoring.constants import LogField, Actions
+from smc.monitoring.filters import InFilter, AndFilter, OrFilter, \
+    NotFilter, DefinedFilter, TranslatedFilter
+from smc.monitoring.values import FieldValue, IPValue, StringValue, \
+    ConstantValue, ElementValue
+
+
+FIELDS = {
+    LogField.SRC: {'id': LogField.SRC, 'name': 'Src', 'pretty': 'Src Addr'},
+    LogField.DST: {'id': LogField.DST, 'name': 'Dst', 'pretty': 'Dst Addr'},
+    LogField.ACTION: {'id': LogField.ACTION, 'name': 'Action',
+                      'pretty': 'Action'}}
+
+
+class FakeFieldCache(object):
+    def name_of(self, field_id, field_format='name'):
+        field = FIELDS.get(field_id)
+        return field.get(field_format) if field else None
+
+    def by_name(self, name):
+        for field in FIELDS.values():
+            if field['name'] == name:
+                return field
+
+
+class TestIPIntervals(unittest.TestCase):
+
+    def test_membership(self):
+        ips = IPIntervals(['10.0.0.0/24', '10.0.1.0/24', '192.168.1.1',
+                           '172.16.0.1-172.16.0.10', '2001:db8::/64'])
+        for ip in ('10.0.0.1', '10.0.1.255', '192.168.1.1', '172.16.0.10',
+                   '2001:db8::1'):
+            self.assertIn(ip, ips)
+        for ip in ('10.0.2.0', '192.168.1.2', '172.16.0.11', 'not an ip',
+                   '2001:db9::1'):
+            self.assertNotIn(ip, ips)
+
+
+@mock.patch('smc.monitoring.compiler.field_cache', FakeFieldCache())
+class TestCompileFilter(unittest.TestCase):
+
+    def test_in_ip_pretty(self):
+        match = InFilter(FieldValue(LogField.SRC),
+                         [IPValue('192.168.4.0/24')]).compile('pretty')
+        self.assertTrue(match({'Src Addr': '192.168.4.84'}))
+        self.assertFalse(match({'Src Addr': '192.168.5.1'}))
+        self.assertFalse(match({}))
+
+    def test_in_ip_id_format(self):
+        match = InFilter(FieldValue(LogField.SRC),
+                         [IPValue('10.0.0.1')]).compile('id')
+        self.assertTrue(match({str(LogField.SRC): '10.0.0.1'}))
+        self.assertTrue(match({LogField.SRC: '10.0.0.1'}))
+
+    def test_string_is_case_insensitive(self):
+        match = InFilter(FieldValue(LogField.ACTION),
+                         [StringValue('Discard')]).compile('name')
+        self.assertTrue(match({'Action': 'discard'}))
+        self.assertFalse(match({'Action': 'Allow'}))
+
+    def test_literal_left_matches_any_field(self):
+        match = InFilter(IPValue('1.1.1.1'), [FieldValue(
+            LogField.SRC, LogField.DST)]).compile('pretty')
+        self.assertTrue(match({'Dst Addr': '1.1.1.1'}))
+        self.assertFalse(match({'Src Addr': '1.1.1.2'}))
+
+    def test_constant_id_format(self):
+        match = InFilter(FieldValue(LogField.ACTION), [ConstantValue(
+            Actions.DISCARD, Actions.BLOCK)]).compile('id')
+        self.assertTrue(match({str(LogField.ACTION): Actions.DISCARD}))
+        self.assertTrue(match({str(LogField.ACTION): str(Actions.BLOCK)}))
+        self.assertFalse(match({str(LogField.ACTION): Actions.ALLOW}))
+
+    def test_constant_name_formats_raise(self):
+        for field_format in ('pretty', 'name'):
+            filt = InFilter(FieldValue(LogField.ACTION),
+                            [ConstantValue(Actions.DISCARD)])
+            self.assertRaises(ValueError, filt.compile, field_format)
+            filt = InFilter(ConstantValue(Actions.DISCARD),
+                            [FieldValue(LogField.ACTION)])
+            self.assertRaises(ValueError, filt.compile, field_format)
+
+    def test_and_or_not(self):
+        src = InFilter(FieldValue(LogField.SRC), [IPValue('10.0.0.0/8')])
+        dst = InFilter(FieldValue(LogField.DST), [IPValue('10.0.0.0/8')])
+        record = {'Src Addr': '10.1.1.1', 'Dst Addr': '8.8.8.8'}
+        self.assertFalse(AndFilter([src, dst]).compile()(record))
+        self.assertTrue(OrFilter([src, dst]).compile()(record))
+        self.assertTrue(NotFilter([dst]).compile()(record))
+
+    def test_defined(self):
+        match = DefinedFilter(FieldValue(LogField.SRC)).compile('pretty')
+        self.assertTrue(match({'Src Addr': '1.1.1.1'}))
+        self.assertFalse(match({'Src Addr': ''}))
+        self.assertFalse(match({}))
+
+    def test_translated(self):
+        filt = TranslatedFilter()
+        filt.within_ipv4_network('$Dst', ['192.168.4.0/24'])
+        match = filt.compile('name')
+        self.assertTrue(match({'Dst': '192.168.4.1'}))
+        self.assertFalse(match({'Dst': '192.168.5.1'}))
+
+        filt = TranslatedFilter()
+        filt.within_ipv4_range('$Src', ['1.1.1.1-1.1.1.10'])
+        match = filt.compile('name')
+        self.assertTrue(match({'Src': '1.1.1.5'}))
+        self.assertFalse(match({'Src': '1.1.1.11'}))
+
+    def test_unsupported(self):
+        filt = InFilter(FieldValue(LogField.SRC),
+                        [ElementValue(mock.Mock(href='http://1.1.1.1/elements/host/1'))])
+        self.assertRaises(ValueError, filt.compile)
+        self.assertRaises(ValueError, compile_filter, {'type': 'cs_like'})
+        self.assertRaises(ValueError, InFilter(
+            FieldValue(999), [IPValue('1.1.1.1')]).compile)
+
+
+@mock.patch('smc.monitoring.compiler.field_cache', FakeFieldCache())
+class TestDispatcher(unittest.TestCase):
+
+    def test_dispatch(self):
+        dispatcher = Dispatcher(field_format='pretty')
+        received = []
+        dispatcher.subscribe(InFilter(FieldValue(LogField.SRC), [
+            IPValue('10.0.0.0/8')]), callback=received.append)
+        everything = dispatcher.subscribe()
+        records = [{'Src Addr': '10.0.0.1'}, {'Src Addr': '1.1.1.1'}]
+        dispatcher.dispatch(records)
+        self.assertEqual(received, records[:1])
+        self.assertEqual(everything.drain(), records)
+        self.assertEqual(everything.drain(), [])
+
+        dispatcher.unsubscribe(everything)
+        dispatcher.dispatch(records)
+        self.assertEqual(everything.records, [])
+        self.assertEqual(len(received), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.monitoring import FetchFailed
+from smc.monitoring.diff import SnapshotDiff, Changes
+
+
+KEY = ['Src Addr', 'Dst Addr']
+
+
+def row(src, dst, state='open'):
+    return {'Src Addr': src, 'Dst Addr': dst, 'State': state}
+
+
+class FakeQuery(object):
+    """
+    Query returning the given results on each execute. A list of results
+    is returned as a generator, any other object is returned as is.
+    """
+    def __init__(self, *polls):
+        self.polls = list(polls)
+
+    def execute(self, **kw):
+        results = self.polls.pop(0)
+        if isinstance(results, Exception):
+            raise results
+        if isinstance(results, list):
+            return iter(results)
+        return results
+
+
+class TestSnapshotDiff(unittest.TestCase):
+
+    def test_key_is_required(self):
+        self.assertRaises(ValueError, SnapshotDiff, FakeQuery(), None)
+        self.assertRaises(TypeError, SnapshotDiff, FakeQuery())
+
+    def test_update(self):
+        diff = SnapshotDiff(FakeQuery(), key=KEY)
+        first = [row('1.1.1.1', '2.2.2.2'), row('1.1.1.2', '2.2.2.2')]
+        self.assertEqual(diff.update(first), Changes(first, [], []))
+        self.assertFalse(diff.update(first))
+
+        changes = diff.update([row('1.1.1.1', '2.2.2.2', 'closing'),
+                               row('1.1.1.3', '2.2.2.2')])
+        self.assertEqual(changes.added, [row('1.1.1.3', '2.2.2.2')])
+        self.assertEqual(changes.removed, [('1.1.1.2', '2.2.2.2')])
+        self.assertEqual(changes.changed,
+                         [row('1.1.1.1', '2.2.2.2', 'closing')])
+        self.assertEqual(len(diff), 2)
+
+    def test_callable_key(self):
+        diff = SnapshotDiff(FakeQuery(), key=lambda r: r['Src Addr'])
+        diff.update([row('1.1.1.1', '2.2.2.2')])
+        changes = diff.update([row('1.1.1.1', '3.3.3.3')])
+        self.assertEqual(changes, Changes([], [], [row('1.1.1.1', '3.3.3.3')]))
+
+    def test_reset(self):
+        diff = SnapshotDiff(FakeQuery(), key=KEY)
+        diff.update([row('1.1.1.1', '2.2.2.2')])
+        diff.reset()
+        self.assertEqual(len(diff.update([row('1.1.1.1', '2.2.2.2')]).added), 1)
+
+    def test_poll(self):
+        query = FakeQuery(
+            [{'records': [row('1.1.1.1', '2.2.2.2')]},
+             {'records': [row('1.1.1.2', '2.2.2.2')]}],
+            [{'records': []}])
+        diff = SnapshotDiff(query, key=KEY)
+        self.assertEqual(len(diff.poll().added), 2)
+        # An empty table that was received completely removes all rows
+        self.assertEqual(len(diff.poll().removed), 2)
+
+    def test_incomplete_poll_is_skipped(self):
+        query = FakeQuery(
+            [{'records': [row('1.1.1.1', '2.2.2.2')]}],
+            [],  # Timed out before any payload
+            [{'records': [row('1.1.1.1', '2.2.2.2')]}])
+        diff = SnapshotDiff(query, key=KEY)
+        diff.poll()
+        self.assertIsNone(diff.poll())
+        self.assertEqual(len(diff), 1)
+        self.assertFalse(diff.poll())
+
+    def test_incomplete_pooled_fetch_is_skipped(self):
+        fetch = mock.MagicMock(complete=False)
+        fetch.__iter__.return_value = iter(
+            [{'records': [row('1.1.1.1', '2.2.2.2')]}])
+        diff = SnapshotDiff(FakeQuery(fetch), key=KEY)
+        self.assertIsNone(diff.poll())
+        self.assertEqual(len(diff), 0)
+
+    def test_failed_poll_keeps_snapshot(self):
+        query = FakeQuery([{'records': [row('1.1.1.1', '2.2.2.2')]}],
+                          FetchFailed('failed'))
+        diff = SnapshotDiff(query, key=KEY)
+        diff.poll()
+        self.assertRaises(FetchFailed, diff.poll)
+        self.assertEqual(len(diff), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import io
+import json
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.api.exceptions import FetchElementFailed, SMCOperationFailure, \
+    UnsupportedEntryPoint
+from smc.administration.dump import dump_elements, load_elements
+
+URL = 'http://1.1.1.1:8082/6.2/elements'
+
+
+class Dumped(object):
+
+    def __init__(self, typeof, name, **data):
+        self.typeof = typeof
+        self.name = name
+        self.href = '{}/{}/{}'.format(URL, typeof, name)
+        self.data = dict(data, name=name, link=[])
+
+
+def failure(code):
+    error = SMCOperationFailure()
+    error.code = code
+    error.smcresult.msg = 'failed'
+    return error
+
+
+class TestDumpLoad(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('smc.administration.dump.session')
+        self.connection = patcher.start().connection
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('smc.administration.dump.fetch_entry_point',
+                             side_effect=lambda typeof: URL + '/' + typeof)
+        self.entry_point = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('smc.administration.dump._create',
+                             side_effect=self.create)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.listings = {}
+        self.created = []
+        self.connection.send_request.side_effect = self.listing
+
+    def listing(self, method, request):
+        typeof = request.href.split('/')[-1]
+        listing = self.listings.get(typeof, [])
+        if isinstance(listing, Exception):
+            raise listing
+        return mock.Mock(json=[{'name': name, 'href': '{}/{}/{}'.format(
+            URL, typeof, name)} for name in listing])
+
+    def create(self, typeof, data):
+        self.created.append((typeof, data['name'], data))
+        return '{}/{}/{}'.format(URL, typeof, data['name'])
+
+    def dump(self):
+        web = Dumped('host', 'web', address='10.0.0.1')
+        group = Dumped('group', 'servers', element=[web.href])
+        fp = io.StringIO() if str is not bytes else io.BytesIO()
+        self.assertEqual(dump_elements([group, web], fp), 2)
+        return fp.getvalue().splitlines()
+
+    def test_dump_stores_references_by_name(self):
+        lines = [json.loads(line) for line in self.dump()]
+        self.assertEqual(lines[0]['data']['element'],
+                         [{'$ref': ['host', 'web']}])
+        self.assertNotIn('link', lines[0]['data'])
+
+    def test_load_creates_in_dependency_order(self):
+        result = load_elements(self.dump())
+        self.assertEqual(result.created, [('host', 'web'),
+                                          ('group', 'servers')])
+        self.assertEqual(self.created[1][2]['element'],
+                         [URL + '/host/web'])
+
+    def test_existing_elements_are_skipped(self):
+        self.listings['host'] = ['web']
+        result = load_elements(self.dump())
+        self.assertEqual(result.existing, [('host', 'web')])
+        self.assertEqual(result.created, [('group', 'servers')])
+
+    def test_unavailable_type_has_no_elements(self):
+        self.listings['host'] = failure(404)
+        self.entry_point.side_effect = lambda typeof: \
+            URL + '/' + typeof if typeof == 'host' else \
+            self._unsupported(typeof)
+        result = load_elements(self.dump(), dry_run=True)
+        self.assertEqual(len(result.created), 2)
+        self.assertEqual(self.created, [])
+
+    def _unsupported(self, typeof):
+        raise UnsupportedEntryPoint(typeof)
+
+    def test_listing_failure_is_raised(self):
+        self.listings['group'] = failure(500)
+        self.assertRaises(FetchElementFailed, load_elements, self.dump())
+        self.assertEqual(self.created, [])
+
+    def test_unresolved_reference_is_reported(self):
+        web = Dumped('host', 'web', address='10.0.0.1')
+        group = Dumped('group', 'servers',
+                       element=[web.href, URL + '/host/gone'])
+        fp = io.StringIO() if str is not bytes else io.BytesIO()
+        with mock.patch('smc.administration.dump.LoadElement',
+                        side_effect=FetchElementFailed('not found')):
+            dump_elements([group, web], fp)
+        lines = fp.getvalue().splitlines()
+        self.assertEqual(json.loads(lines[0])['data']['element'], [
+            {'$ref': ['host', 'web']}, {'$unresolved': URL + '/host/gone'}])
+        result = load_elements(lines)
+        self.assertEqual(result.created, [('host', 'web')])
+        self.assertEqual(result.failed[0][0], ('group', 'servers'))
+        self.assertIn(URL + '/host/gone', result.failed[0][1])
+        self.assertEqual(len(self.created), 1)
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.monitoring.fields import FieldCache
+
+
+SRC = {'id': 1, 'name': 'Src', 'pretty': 'Src Addr'}
+DST = {'id': 2, 'name': 'Dst', 'pretty': 'Dst Addr'}
+
+
+@mock.patch('smc.monitoring.fields.query_field_ids')
+class TestFieldCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = FieldCache()
+
+    def test_resolve_fetches_missing_once(self, query):
+        query.return_value = [SRC, DST]
+        self.assertEqual(self.cache.resolve([1, 2]), [SRC, DST])
+        self.assertEqual(self.cache.resolve([2, 1]), [DST, SRC])
+        query.assert_called_once_with([1, 2])
+
+    def test_unknown_ids_are_cached_as_misses(self, query):
+        query.return_value = [SRC]
+        self.assertEqual(self.cache.resolve([1, 999]), [SRC])
+        self.assertIsNone(self.cache.get(999))
+        self.assertIsNone(self.cache.name_of(999))
+        query.assert_called_once_with([1, 999])
+
+    def test_added_field_clears_miss(self, query):
+        query.return_value = []
+        self.assertIsNone(self.cache.get(2))
+        self.cache.add([DST])
+        self.assertEqual(self.cache.get(2), DST)
+        query.assert_called_once_with([2])
+
+    def test_clear_forgets_misses(self, query):
+        query.return_value = []
+        self.cache.get(2)
+        self.cache.clear()
+        self.cache.get(2)
+        self.assertEqual(query.call_count, 2)
+
+    def test_decode(self, query):
+        query.return_value = [SRC, DST]
+        records = list(self.cache.decode([{'1': '1.1.1.1', '2': '2.2.2.2'}]))
+        self.assertEqual(records, [{'Src Addr': '1.1.1.1',
+                                    'Dst Addr': '2.2.2.2'}])
+
+    def test_save_and_load(self, query):
+        query.return_value = [SRC]
+        self.cache.resolve([1])
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.cache.save(path)
+            cache = FieldCache(path)
+            self.assertEqual(cache.get(1), SRC)
+            self.assertEqual(query.call_count, 1)
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
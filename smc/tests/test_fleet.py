@@ -0,0 +1,77 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.core.engine import Engine
+from smc.core.fleet import NodeCache, fleet_status
+from smc.core.node import NodeStatus
+
+
+def node(name, status='Online'):
+    node = mock.Mock()
+    node.name = name
+    if isinstance(status, Exception):
+        node.status.side_effect = status
+    else:
+        node.status.return_value = NodeStatus(status=status)
+    return node
+
+
+def engine(name, href, nodes):
+    engine = mock.Mock(spec=Engine, href=href, nodes=nodes)
+    engine.name = name
+    return engine
+
+
+class TestFleetStatus(unittest.TestCase):
+
+    def test_rows_in_engine_order(self):
+        engines = [
+            engine('fw1', 'http://1.1.1.1/engine/1', [node('fw1 node 1')]),
+            engine('cluster', 'http://1.1.1.1/engine/2', [
+                node('cluster node 1'),
+                node('cluster node 2', ValueError('no status'))])]
+        rows = fleet_status(engines, cache=None)
+        self.assertEqual([(r.engine, r.node, r.status) for r in rows], [
+            ('fw1', 'fw1 node 1', 'Online'),
+            ('cluster', 'cluster node 1', 'Online'),
+            ('cluster', 'cluster node 2', None)])
+        self.assertEqual(rows[2].error, 'no status')
+
+    def test_engine_without_nodes_has_a_row(self):
+        engines = [
+            engine('empty', 'http://1.1.1.1/engine/1', []),
+            engine('fw1', 'http://1.1.1.1/engine/2', [node('fw1 node 1')])]
+        rows = fleet_status(engines, cache=None)
+        self.assertEqual([(r.engine, r.node, r.error) for r in rows], [
+            ('empty', None, None), ('fw1', 'fw1 node 1', None)])
+
+    def test_unresolved_engine_has_error_row(self):
+        failing = engine('missing', 'http://1.1.1.1/engine/1', [])
+        type(failing).nodes = mock.PropertyMock(
+            side_effect=ValueError('not found'))
+        rows = fleet_status([failing], cache=None)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].error, 'not found')
+
+
+class TestNodeCache(unittest.TestCase):
+
+    def test_same_name_different_href(self):
+        cache = NodeCache()
+        first = engine('fw', 'http://1.1.1.1/engine/1', [node('a')])
+        second = engine('fw', 'http://1.1.1.1/engine/2', [node('b')])
+        self.assertEqual(cache.nodes(first), first.nodes)
+        self.assertEqual(cache.nodes(second), second.nodes)
+        self.assertEqual(len(cache), 2)
+
+    def test_clear_engine(self):
+        cache = NodeCache()
+        first = engine('fw', 'http://1.1.1.1/engine/1', [node('a')])
+        cache.nodes(first)
+        cache.clear(first.href)
+        self.assertEqual(len(cache), 0)
+        cache.nodes(first)
+        cache.clear(first)
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,123 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.api.common import SMCRequest
+from smc.api.exceptions import SMCConnectionError, SMCOperationFailure
+from smc.api.mirror import Mirror, MirrorConnection
+from smc.api.web import SMCAPIConnection
+
+LISTING = 'http://1.1.1.1/6.2/elements/host'
+
+
+def href(i):
+    return '{}/{}'.format(LISTING, i)
+
+
+class FakeSMC(object):
+    """
+    send_request replacement serving a host listing and host elements,
+    honouring if-none-match
+    """
+    def __init__(self, hosts):
+        self.hosts = hosts  # id -> (etag, json)
+        self.downloads = []
+
+    def send_request(self, method, request):
+        result = mock.Mock(code=200)
+        if request.href == LISTING:
+            result.etag = None
+            result.json = [{'name': data['name'], 'href': href(i),
+                            'type': 'host'}
+                           for i, (_, data) in sorted(self.hosts.items())]
+            return result
+        etag, data = self.hosts[int(request.href.split('/')[-1])]
+        if request.headers.get('if-none-match') == etag:
+            result.code, result.etag, result.json = 304, None, None
+        else:
+            self.downloads.append(request.href)
+            result.etag, result.json = etag, data
+        return result
+
+
+class TestMirror(unittest.TestCase):
+
+    def setUp(self):
+        self.mirror = Mirror(':memory:')
+        self.addCleanup(self.mirror.close)
+        self.smc = FakeSMC({
+            1: ('a1', {'name': 'web1', 'address': '10.0.0.1'}),
+            2: ('b1', {'name': 'web2', 'address': '10.0.0.2'})})
+        patcher = mock.patch('smc.api.mirror.session')
+        session = patcher.start()
+        self.addCleanup(patcher.stop)
+        session.connection = self.smc
+        session.url, session.api_version = 'http://1.1.1.1', 6.2
+        session.entry_points.entries = [{'rel': 'host', 'href': LISTING}]
+        session.entry_points.get.return_value = LISTING
+
+    def sync(self):
+        return self.mirror.sync(types=['host'], max_workers=2)
+
+    def test_sync_revalidates_with_etag(self):
+        result = self.sync()
+        self.assertEqual((result.fetched, result.unchanged, result.removed),
+                         (2, 0, 0))
+        self.assertEqual(len(self.mirror), 3)
+        self.smc.hosts[2] = ('b2', {'name': 'web2', 'address': '10.0.0.3'})
+        del self.smc.downloads[:]
+        result = self.sync()
+        self.assertEqual((result.fetched, result.unchanged), (1, 1))
+        self.assertEqual(self.smc.downloads, [href(2)])
+        self.assertEqual(self.mirror.get(href(2))[0], 'b2')
+        self.assertEqual(self.mirror.meta('api_version'), 6.2)
+
+    def test_removed_elements_are_pruned(self):
+        self.sync()
+        del self.smc.hosts[1]
+        result = self.sync()
+        self.assertEqual(result.removed, 1)
+        self.assertNotIn(href(1), self.mirror)
+        self.assertIn(href(2), self.mirror)
+
+    def test_requires_live_session(self):
+        with mock.patch('smc.api.mirror.session') as session:
+            session.connection = None
+            self.assertRaises(SMCConnectionError, self.mirror.sync)
+
+
+class TestMirrorConnection(unittest.TestCase):
+
+    def setUp(self):
+        mirror = Mirror(':memory:')
+        self.addCleanup(mirror.close)
+        mirror.put(LISTING, None, [
+            {'name': 'web1', 'href': href(1), 'type': 'host'},
+            {'name': 'db1', 'href': href(2), 'type': 'host'}])
+        mirror.put(href(1), 'a1', {'name': 'web1'}, LISTING)
+        self.connection = MirrorConnection(mirror)
+
+    def get(self, href, **params):
+        return self.connection.send_request(
+            SMCAPIConnection.GET, SMCRequest(href=href, params=params))
+
+    def test_serves_stored_element(self):
+        result = self.get(href(1))
+        self.assertEqual((result.code, result.etag, result.json),
+                         (200, 'a1', {'name': 'web1'}))
+
+    def test_listing_filter_matches_names(self):
+        self.assertEqual([item['name'] for item in
+                          self.get(LISTING, filter='web').json], ['web1'])
+        self.assertEqual(len(self.get(LISTING, limit=1).json), 1)
+
+    def test_missing_resource_is_not_found(self):
+        with self.assertRaises(SMCOperationFailure) as raised:
+            self.get(href(3))
+        self.assertEqual(raised.exception.code, 404)
+
+    def test_modifications_are_rejected(self):
+        self.assertRaises(
+            SMCConnectionError, self.connection.send_request,
+            SMCAPIConnection.PUT, SMCRequest(href=href(1), json={}))
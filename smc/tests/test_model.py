@@ -0,0 +1,116 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.base.concurrency import run_concurrent
+from smc.base.model import SimpleElement, Meta, Element, SubElement, \
+    lookup_class
+from smc.base.resource import Registry
+from smc.elements.network import Host
+from smc.api.exceptions import UpdateElementFailed
+
+
+class TestSimpleElement(unittest.TestCase):
+
+    def test_digest_is_not_computed_on_creation(self):
+        with mock.patch.object(SimpleElement, '_hash') as digest:
+            data = SimpleElement(etag='1', name='host', address='1.1.1.1')
+            self.assertFalse(digest.called)
+        self.assertEqual(data['name'], 'host')
+        self.assertTrue(data.changed)
+
+    def test_changed_after_mark_clean(self):
+        data = SimpleElement(etag='1', name='host', nested={'a': [1]})
+        data.mark_clean('2')
+        self.assertFalse(data.changed)
+        self.assertEqual(data._etag, '2')
+        data['nested']['a'].append(2)
+        self.assertTrue(data.changed)
+        data.mark_clean()
+        data['comment'] = 'new'
+        self.assertTrue(data.changed)
+
+
+def host(**data):
+    element = Host('web', href='http://1.1.1.1/elements/host/1',
+                   type='host')
+    element.data = SimpleElement(etag='1', name='web', **data)
+    return element
+
+
+@mock.patch('smc.base.model.SMCRequest')
+class TestUpdate(unittest.TestCase):
+
+    def test_loaded_element_is_sent(self, request):
+        request.return_value.update.return_value = mock.Mock(etag='2')
+        element = host(comment='a')
+        element.data['comment'] = 'b'  # Modified before update
+        element.update()
+        self.assertEqual(request.return_value.update.call_count, 1)
+        self.assertEqual(request.call_args[1]['json']['comment'], 'b')
+
+    def test_unmodified_element_not_sent_again(self, request):
+        request.return_value.update.return_value = mock.Mock(etag='2')
+        element = host(comment='a')
+        element.modify_attribute(comment='b')
+        element.modify_attribute(comment='b')
+        element.update()
+        self.assertEqual(request.return_value.update.call_count, 1)
+        self.assertEqual(element.data._etag, '2')
+        element.modify_attribute(comment='c')
+        self.assertEqual(request.return_value.update.call_count, 2)
+
+    def test_changeset_keeps_cache_for_action_href(self, request):
+        changes = mock.Mock()
+        changes.get.side_effect = lambda href, json: json
+        element = host(comment='a')
+        with mock.patch('smc.base.model.current_changeset',
+                        return_value=changes):
+            element.update(href='http://1.1.1.1/elements/host/1/enable')
+        self.assertEqual(changes.add.call_count, 1)
+        self.assertNotIn('data', element.__dict__)
+
+    def test_failed_modify_drops_cache(self, request):
+        request.return_value.update.side_effect = UpdateElementFailed('no')
+        element = host()
+        self.assertRaises(UpdateElementFailed,
+                          element.modify_attribute, comment='b')
+        self.assertNotIn('data', element.__dict__)
+
+
+class TestMeta(unittest.TestCase):
+
+    def test_type_is_shared(self):
+        first = Meta(href='http://1.1.1.1/elements/host/1', name='a',
+                     type=''.join(['ho', 'st']))
+        second = Meta(href='http://1.1.1.1/elements/host/2', name='b',
+                      type=''.join(['ho', 'st']))
+        self.assertIs(first.type, second.type)
+        self.assertIsNone(Meta(href='http://1.1.1.1/x').type)
+        self.assertFalse(hasattr(first, '__dict__'))
+
+
+class TestLookupClass(unittest.TestCase):
+
+    def test_registered_class(self):
+        self.assertIs(lookup_class('host'), Host)
+
+    def test_dynamic_class_is_cached(self):
+        cls = lookup_class('unknown_type_x')
+        self.assertIs(lookup_class('unknown_type_x'), cls)
+        self.assertTrue(issubclass(cls, Element))
+        self.assertEqual(cls.typeof, 'unknown_type_x')
+        self.assertNotIn('unknown_type_x', Registry._registry)
+
+    def test_dynamic_class_per_base(self):
+        element = lookup_class('unknown_type_y')
+        sub = lookup_class('unknown_type_y', SubElement)
+        self.assertIsNot(element, sub)
+        self.assertTrue(issubclass(sub, SubElement))
+        self.assertFalse(issubclass(sub, Element))
+
+    def test_concurrent_lookups_share_class(self):
+        classes = [result.result for result in run_concurrent(
+            lambda _: lookup_class('unknown_type_z'), range(50), 10)]
+        self.assertEqual(len(set(classes)), 1)
@@ -0,0 +1,54 @@
+import unittest
+from smc.administration.tasks import TaskOperationPoller
+from smc.base.polling import PollStats, FixedInterval, ExponentialBackoff, \
+    ProgressEstimate
+
+
+def poll(strategy, stats, progress=None):
+    stats.record(progress)
+    return strategy.schedule(stats)
+
+
+class TestPollingStrategies(unittest.TestCase):
+
+    def test_fixed_interval(self):
+        strategy, stats = FixedInterval(5, max_tries=2), PollStats()
+        self.assertEqual(strategy.schedule(stats), 5)
+        self.assertEqual(poll(strategy, stats), 5)
+        self.assertFalse(strategy.expired(stats))
+        stats.record()
+        self.assertTrue(strategy.expired(stats))
+
+    def test_exponential_backoff(self):
+        strategy = ExponentialBackoff(initial=1, factor=2, max_interval=5,
+                                      reset_on_progress=True)
+        stats = PollStats()
+        self.assertEqual(strategy.schedule(stats), 1)
+        self.assertEqual(poll(strategy, stats, 10), 1)
+        self.assertEqual(poll(strategy, stats, 10), 2)
+        self.assertEqual(poll(strategy, stats, 10), 4)
+        self.assertEqual(poll(strategy, stats, 10), 5)
+        self.assertEqual(poll(strategy, stats, 20), 1)
+
+    def test_deadline_limits_interval(self):
+        strategy, stats = FixedInterval(60, deadline=10), PollStats()
+        stats.started -= 8
+        self.assertAlmostEqual(strategy.schedule(stats), 2, places=1)
+        self.assertFalse(strategy.expired(stats))
+        stats.started -= 2
+        self.assertTrue(strategy.expired(stats))
+
+    def test_progress_estimate(self):
+        strategy = ProgressEstimate(min_interval=1, max_interval=100)
+        stats = PollStats()
+        self.assertEqual(strategy.schedule(stats), 1)
+        stats.started -= 20
+        stats.record(50)  # 50% in 20 seconds, 20 seconds remaining
+        self.assertAlmostEqual(strategy.schedule(stats), 10, places=0)
+
+    def test_task_poller_defaults_to_fixed_interval(self):
+        poller = TaskOperationPoller(
+            {'in_progress': False}, timeout=3, max_tries=10)
+        self.assertIsInstance(poller._polling, FixedInterval)
+        self.assertEqual(poller._polling.interval, 3)
+        self.assertEqual(poller._polling.max_tries, 10)
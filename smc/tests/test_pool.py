@@ -0,0 +1,135 @@
+import json
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+try:
+    import queue
+except ImportError:  # Python 2.7
+    import Queue as queue
+from websocket._exceptions import WebSocketTimeoutException
+from smc.monitoring import FetchFailed
+from smc.monitoring.pool import MonitoringSocket, MonitoringPool
+
+
+class FakeWebSocket(object):
+    """
+    Web socket replying to each sent message with the replies returned
+    by the reply function.
+    """
+    def __init__(self, reply):
+        self.reply = reply
+        self.connected = True
+        self.sent = []
+        self.incoming = queue.Queue()
+
+    def send(self, data):
+        data = json.loads(data)
+        self.sent.append(data)
+        for message in self.reply(data):
+            self.incoming.put(message)
+
+    def recv(self):
+        try:
+            message = self.incoming.get(timeout=0.05)
+        except queue.Empty:
+            if not self.connected:
+                raise IOError('closed')
+            raise WebSocketTimeoutException()
+        return json.dumps(message)
+
+    def close(self):
+        self.connected = False
+
+
+def query(name, fetch_size=None):
+    return mock.Mock(request={'query': name}, fetch_size=fetch_size,
+                     location='/monitoring/log/socket')
+
+
+class TestMonitoringSocket(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('smc.monitoring.pool.session',
+                             mock.Mock(session_id='JSESSIONID=1',
+                                       web_socket_url='ws://smc'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ids = iter(range(1, 100))
+        self.pending = []  # messages sent before the next ack
+
+    def reply(self, data):
+        if 'abort' in data:
+            return []
+        messages, self.pending = self.pending, []
+        return messages + [{'fetch': next(self.ids)}]
+
+    def socket(self):
+        self.ws = FakeWebSocket(self.reply)
+        with mock.patch('smc.monitoring.pool.websocket.create_connection',
+                        return_value=self.ws):
+            sock = MonitoringSocket('/monitoring/log/socket', timeout=1)
+        self.addCleanup(sock.close)
+        return sock
+
+    def test_start_binds_fetch_id(self):
+        sock = self.socket()
+        first = sock.start(query('a'), timeout=1)
+        second = sock.start(query('b'), timeout=1)
+        self.assertEqual((first.fetch_id, second.fetch_id), (1, 2))
+        self.assertEqual(sock.active, 2)
+
+        self.ws.incoming.put({'fetch': 2, 'records': [{'b': 1}]})
+        self.ws.incoming.put({'fetch': 1, 'records': [{'a': 1}]})
+        self.ws.incoming.put({'fetch': 1, 'end': True})
+        self.assertEqual(list(first), [{'fetch': 1, 'records': [{'a': 1}]}])
+        self.assertTrue(first.complete)
+        self.assertEqual(self.ws.sent[-1], {'abort': 1})
+        self.assertEqual(sock.active, 1)
+
+    def test_late_reply_of_released_fetch_is_dropped(self):
+        sock = self.socket()
+        first = sock.start(query('a'), timeout=1)
+        first.abort()
+        # The abort acknowledgement for fetch 1 arrives after the next
+        # query is sent, and must not be taken as it's acknowledgement
+        self.pending = [{'fetch': 1, 'end': True}]
+        second = sock.start(query('b'), timeout=1)
+        self.assertEqual(second.fetch_id, 2)
+
+    def test_start_failure(self):
+        sock = self.socket()
+        self.ws.reply = lambda data: [{'failure': 'Invalid query'}]
+        self.assertRaises(FetchFailed, sock.start, query('a'), 1)
+        self.assertEqual(sock.active, 0)
+
+    def test_socket_close_ends_fetches(self):
+        sock = self.socket()
+        fetch = sock.start(query('a'), timeout=5)
+        sock.close()
+        self.assertEqual(list(fetch), [])
+        self.assertFalse(fetch.complete)
+
+
+class TestMonitoringPool(unittest.TestCase):
+
+    def test_sockets_are_shared(self):
+        sockets = [mock.Mock(connected=True, active=0) for _ in range(2)]
+        with mock.patch('smc.monitoring.pool.MonitoringSocket',
+                        side_effect=sockets) as factory:
+            pool = MonitoringPool(max_sockets=2, max_fetches=1)
+            self.assertIs(pool._acquire('/loc'), sockets[0])
+            sockets[0].active = 1
+            self.assertIs(pool._acquire('/loc'), sockets[1])
+            sockets[1].active = 1
+            sockets[0].active = 0
+            self.assertIs(pool._acquire('/loc'), sockets[0])
+            self.assertEqual(factory.call_count, 2)
+            pool.close()
+            for sock in sockets:
+                sock.close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
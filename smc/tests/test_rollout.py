@@ -0,0 +1,126 @@
+import time
+import threading
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.administration.tasks import TaskOperationPoller
+from smc.core.rollout import Rollout, SUCCESS, FAILED, SKIPPED
+
+
+def engine(name, success=True):
+    engine = mock.Mock(nodes=[], success=success)
+    engine.name = name
+    return engine
+
+
+def operation(engine, **kw):
+    return TaskOperationPoller({
+        'in_progress': False, 'success': engine.success,
+        'last_message': 'done'})
+
+
+class TestRollout(unittest.TestCase):
+
+    def rollout(self, engines, **kw):
+        kw.setdefault('operation', operation)
+        kw.setdefault('concurrency', 1)
+        return Rollout(engines, **kw)
+
+    def test_all_succeed(self):
+        report = self.rollout(
+            [engine(str(i)) for i in range(5)], canary=1).run()
+        self.assertEqual(report.succeeded, 5)
+        self.assertFalse(report.aborted)
+
+    def test_canary_failure_aborts_when_pausing_on_failure(self):
+        engines = [engine('canary', False)] + [
+            engine(str(i)) for i in range(4)]
+        report = self.rollout(
+            engines, canary=1, pause_on_failure=True).run()
+        self.assertTrue(report.aborted)
+        self.assertEqual([r.state for r in report],
+                         [FAILED] + [SKIPPED] * 4)
+
+    def test_early_failure_within_threshold_continues(self):
+        engines = [engine('0', False)] + [engine(str(i)) for i in range(1, 10)]
+        report = self.rollout(
+            engines, canary=0, failure_threshold=0.2).run()
+        self.assertFalse(report.aborted)
+        self.assertEqual(report.failed, 1)
+        self.assertEqual(report.succeeded, 9)
+
+    def test_threshold_exceeded_aborts(self):
+        engines = [engine(str(i), i >= 3) for i in range(10)]
+        report = self.rollout(
+            engines, canary=0, failure_threshold=0.2).run()
+        self.assertTrue(report.aborted)
+        self.assertEqual(report.failed, 3)
+        self.assertEqual(report._count(SKIPPED), 7)
+
+    def start(self, rollout):
+        reports = []
+        thread = threading.Thread(target=lambda: reports.append(rollout.run()))
+        thread.daemon = True
+        thread.start()
+        return thread, reports
+
+    def wait_paused(self, rollout):
+        for _ in range(100):
+            if not rollout._running.is_set():
+                break
+            time.sleep(0.05)
+        self.assertFalse(rollout._running.is_set())
+
+    def test_threshold_exceeded_pauses(self):
+        engines = [engine(str(i), i >= 3) for i in range(10)]
+        rollout = self.rollout(
+            engines, canary=0, wave_size=5, failure_threshold=0.2,
+            pause_on_failure=True)
+        thread, reports = self.start(rollout)
+        self.wait_paused(rollout)
+        rollout.abort()
+        thread.join(5)
+        report = reports[0]
+        self.assertTrue(report.aborted)
+        self.assertEqual(report.failed, 2)  # No new tasks once paused
+        self.assertEqual(report._count(SKIPPED), 8)
+
+    def test_resume_continues_without_pausing_again(self):
+        engines = [engine(str(i), i >= 2) for i in range(10)]
+        started = []
+
+        def record(engine, **kw):
+            started.append(engine.name)
+            return operation(engine, **kw)
+        rollout = self.rollout(
+            engines, canary=0, wave_size=5, failure_threshold=0.2,
+            pause_on_failure=True, operation=record)
+        thread, reports = self.start(rollout)
+        self.wait_paused(rollout)
+        time.sleep(0.1)
+        self.assertEqual(started, ['0', '1'])
+        rollout.resume()
+        thread.join(5)
+        report = reports[0]
+        self.assertFalse(report.aborted)
+        self.assertEqual(report.failed, 2)
+        self.assertEqual(report.succeeded, 8)
+
+    def test_new_failure_after_resume_pauses(self):
+        engines = [engine(str(i), i >= 2 and i != 7) for i in range(10)]
+        rollout = self.rollout(
+            engines, canary=0, wave_size=5, failure_threshold=0.2,
+            pause_on_failure=True)
+        thread, reports = self.start(rollout)
+        self.wait_paused(rollout)
+        rollout.resume()
+        self.wait_paused(rollout)
+        rollout.abort()
+        thread.join(5)
+        report = reports[0]
+        self.assertTrue(report.aborted)
+        self.assertEqual(report.failed, 3)
+        self.assertEqual(report.succeeded, 5)
+        self.assertEqual(report._count(SKIPPED), 2)
@@ -0,0 +1,82 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.core.sginfo import SginfoCollector, COMPLETE, FAILED
+
+
+def node(name, content=b'sginfo', error=None):
+    node = mock.Mock()
+    node.name = name
+
+    def sginfo(filename, **kw):
+        if error is not None:
+            raise error
+        filename.write(content)
+    node.sginfo.side_effect = sginfo
+    return node
+
+
+def engine(name, nodes):
+    engine = mock.Mock(nodes=nodes)
+    engine.name = name
+    return engine
+
+
+class TestSginfoCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_same_node_names_on_different_engines(self):
+        engines = [engine('fw1', [node('node 1', b'one')]),
+                   engine('fw2', [node('node 1', b'two')])]
+        entries = SginfoCollector(self.directory, engines).run()
+        self.assertEqual([e.state for e in entries], [COMPLETE, COMPLETE])
+        self.assertNotEqual(entries[0].filename, entries[1].filename)
+        self.assertIn('fw1_node_1_', os.path.basename(entries[0].filename))
+        contents = []
+        for entry in entries:
+            with open(entry.filename, 'rb') as f:
+                contents.append(f.read())
+        self.assertEqual(contents, [b'one', b'two'])
+
+    def test_duplicate_names_get_unique_files(self):
+        engines = [engine('fw', [node('node 1')]),
+                   engine('fw', [node('node 1')])]
+        entries = SginfoCollector(self.directory, engines).run()
+        self.assertEqual(len(set(e.filename for e in entries)), 2)
+
+    def test_failures_are_recorded(self):
+        unresolved = mock.Mock()
+        unresolved.name = 'missing'
+        type(unresolved).nodes = mock.PropertyMock(
+            side_effect=ValueError('not found'))
+        engines = [unresolved, engine('fw1', [
+            node('node 1'), node('node 2', error=IOError('timed out'))])]
+        collector = SginfoCollector(self.directory, engines)
+        entries = collector.run()
+        self.assertEqual([(e.engine, e.node, e.state) for e in entries], [
+            ('missing', None, FAILED), ('fw1', 'node 1', COMPLETE),
+            ('fw1', 'node 2', FAILED)])
+        self.assertEqual(entries[2].error, 'timed out')
+        self.assertFalse(os.path.exists(entries[2].filename + '.part'))
+        self.assertEqual(collector.progress()[FAILED], 2)
+        with open(os.path.join(self.directory, 'index.json')) as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+    def test_callback_failure_fails_entry(self):
+        def callback(entry):
+            if entry.state == COMPLETE:
+                raise ValueError('callback failed')
+        entries = SginfoCollector(
+            self.directory, [engine('fw1', [node('node 1')])],
+            callback=callback).run()
+        self.assertEqual(entries[0].state, FAILED)
+        self.assertEqual(entries[0].error, 'callback failed')
@@ -0,0 +1,250 @@
+import time
+import datetime
+import unittest
+from concurrent import futures
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+try:
+    import asyncio
+except ImportError:  # Python 2.7
+    asyncio = None
+from smc.api.exceptions import TaskRunFailed
+from smc.administration.tasks import TaskMonitor, TaskOperationPoller, \
+    Task, TaskHistory, task_history, DownloadTask
+from smc.base.polling import FixedInterval
+
+
+def task(progress=0, in_progress=True, success=False):
+    return {'follower': 'http://1.1.1.1/task/1', 'last_message': 'msg',
+            'progress': progress, 'in_progress': in_progress,
+            'success': success, 'type': 'upload'}
+
+
+class Progress(object):
+    """
+    Replacement for Task.update_status completing a task after a number
+    of polls
+    """
+    def __init__(self, polls):
+        self.polls = polls
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        done = self.calls >= self.polls
+        return Task(task(progress=100 if done else self.calls * 10,
+                         in_progress=not done, success=done))
+
+
+class TestTaskMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = TaskMonitor(max_workers=2)
+        patcher = mock.patch('smc.administration.tasks.task_monitor',
+                             self.monitor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def poller(self, **kw):
+        return TaskOperationPoller(
+            task(), wait_for_finish=True,
+            polling=FixedInterval(0.01, max_tries=50), **kw)
+
+    def test_completed_task_is_not_registered(self):
+        poller = TaskOperationPoller(task(in_progress=False, success=True),
+                                     wait_for_finish=True)
+        self.assertTrue(poller.done())
+        self.assertEqual(len(self.monitor), 0)
+        self.assertIsNone(self.monitor._thread)
+
+    def test_many_tasks_share_one_scheduler(self):
+        progress = Progress(polls=30)
+        with mock.patch.object(Task, 'update_status', progress):
+            pollers = [self.poller() for _ in range(5)]
+            scheduler = self.monitor._thread
+            for poller in pollers:
+                poller.wait(5)
+                self.assertTrue(poller.done())
+            self.assertIs(self.monitor._thread, scheduler)
+        self.assertTrue(all(p.result().success for p in pollers))
+        self.assertEqual(len(self.monitor), 0)
+
+    def test_status_failure_completes_poller(self):
+        with mock.patch.object(Task, 'update_status',
+                               side_effect=ValueError('failed')):
+            poller = self.poller()
+            poller.wait(5)
+        self.assertTrue(poller.done())
+        self.assertIsInstance(poller.exception(), ValueError)
+
+    def test_stop_completes_with_current_task(self):
+        with mock.patch.object(Task, 'update_status',
+                               return_value=Task(task(progress=50))):
+            poller = TaskOperationPoller(
+                task(), wait_for_finish=True,
+                polling=FixedInterval(60))
+            poller.stop()
+        self.assertTrue(poller.done())
+        self.assertTrue(poller.result().in_progress)
+        self.assertEqual(len(self.monitor), 0)
+
+    def test_max_tries_stops_tracking(self):
+        with mock.patch.object(Task, 'update_status',
+                               return_value=Task(task(progress=10))):
+            poller = TaskOperationPoller(
+                task(), wait_for_finish=True,
+                polling=FixedInterval(0.01, max_tries=3))
+            poller.wait(5)
+        self.assertTrue(poller.done())
+        self.assertEqual(poller.stats.polls, 3)
+        self.assertTrue(poller.result().in_progress)
+
+    def test_callback_can_wait_on_another_task(self):
+        results = []
+
+        def callback(poller):
+            other = self.poller()
+            other.wait(5)
+            results.append(other.done())
+        with mock.patch.object(Task, 'update_status',
+                               return_value=Task(task(100, False, True))):
+            with self.monitor._cond:  # Add callback before completion
+                poller = self.poller()
+                poller.add_done_callback(callback)
+            poller.wait(5)
+            other = self.poller()
+            other.wait(5)
+            self.assertTrue(other.done())
+            for _ in range(50):
+                if results:
+                    break
+                time.sleep(0.1)
+        self.assertEqual(results, [True])
+
+    def test_download_not_attempted_when_task_times_out(self):
+        with mock.patch.object(Task, 'update_status',
+                               return_value=Task(task(progress=10))), \
+                mock.patch.object(DownloadTask, '_download') as download:
+            poller = DownloadTask('export.zip', task(),
+                                  polling=FixedInterval(0.01, max_tries=2))
+            self.assertRaises(TaskRunFailed, poller.download, 5)
+        self.assertFalse(download.called)
+
+
+class TestTaskOperationPollerFuture(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = TaskMonitor(max_workers=2)
+        patcher = mock.patch('smc.administration.tasks.task_monitor',
+                             self.monitor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_as_completed(self):
+        with mock.patch.object(Task, 'update_status',
+                               return_value=Task(task(100, False, True))):
+            pollers = [TaskOperationPoller(
+                task(), wait_for_finish=True, polling=FixedInterval(0.01))
+                for _ in range(3)]
+            completed = list(futures.as_completed(pollers, timeout=5))
+        self.assertEqual(set(completed), set(pollers))
+
+    def test_callback_receives_poller(self):
+        poller = TaskOperationPoller(task(in_progress=False, success=True))
+        received = []
+        poller.add_done_callback(received.append)
+        self.assertEqual(received, [poller])
+        self.assertTrue(poller.result().success)
+
+    def test_result_returns_current_task_until_done(self):
+        with mock.patch.object(Task, 'update_status',
+                               return_value=Task(task(progress=20))):
+            poller = TaskOperationPoller(
+                task(progress=10), wait_for_finish=True,
+                polling=FixedInterval(60))
+            self.assertFalse(poller.done())
+            self.assertEqual(poller.result(0).progress, 10)
+            self.assertTrue(poller.cancel())
+        self.assertEqual(len(self.monitor), 0)
+
+    def test_error_raised_from_result_once_done(self):
+        with mock.patch.object(Task, 'update_status',
+                               side_effect=ValueError('failed')):
+            poller = TaskOperationPoller(
+                task(), wait_for_finish=True, polling=FixedInterval(0.01))
+            self.assertRaises(ValueError, poller.result, 5)
+
+    @unittest.skipIf(asyncio is None, 'asyncio is not available')
+    def test_wrap_future(self):
+        poller = TaskOperationPoller(task(in_progress=False, success=True))
+        loop = asyncio.new_event_loop()
+        try:
+            result = loop.run_until_complete(asyncio.wrap_future(poller, loop=loop))
+        finally:
+            loop.close()
+        self.assertTrue(result.success)
+
+
+class Event(object):
+
+    def __init__(self, name, **data):
+        self.name = name
+        self.fetched = False
+        self.data = task(**data)
+        self.data.update(type=name.split()[0])
+
+    @property
+    def task(self):
+        self.fetched = True
+        return Task(self.data)
+
+
+class TestTaskHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.events = [
+            Event('upload fw1', in_progress=True),
+            Event('upload fw2', in_progress=False, success=True),
+            Event('refresh fw3', in_progress=False, success=False),
+            Event('upload fw4', in_progress=False, success=False)]
+        self.events[1].data.update(start_time=1500000000000)
+        self.events[3].data.update(start_time=1600000000000)
+        patcher = mock.patch('smc.administration.tasks.Search')
+        search = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.listing = search.objects.entry_point.return_value
+        self.listing.__iter__ = lambda _: iter(self.events)
+        self.listing.filter.return_value = self.listing
+
+    def test_all_tasks_in_order(self):
+        tasks = list(task_history(batch_size=3))
+        self.assertEqual([t.in_progress for t in tasks],
+                         [True, False, False, False])
+        self.assertEqual(len(TaskHistory()), 4)
+
+    def test_filter_is_passed_to_smc(self):
+        list(task_history('fw1'))
+        self.listing.filter.assert_called_once_with('fw1')
+
+    def test_state_and_type(self):
+        tasks = list(task_history(state='failed', typeof='upload'))
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(tasks[0].start_time.year, 2020)
+        running = list(task_history(state='running'))
+        self.assertEqual([t.type for t in running], ['upload'])
+        self.assertRaises(ValueError, list, task_history(state='invalid'))
+
+    def test_time_window(self):
+        since = datetime.datetime(2018, 1, 1)
+        tasks = list(task_history(since=since))
+        self.assertEqual([t.start_time.year for t in tasks], [2020])
+        tasks = list(task_history(until=since))
+        self.assertEqual([t.start_time.year for t in tasks], [2017])
+
+    def test_keep_skips_detail_requests(self):
+        tasks = list(task_history(keep=lambda e: 'fw2' in e.name))
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual([e.fetched for e in self.events],
+                         [False, True, False, False])
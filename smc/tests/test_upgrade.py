@@ -0,0 +1,56 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.api.exceptions import ActionCommandFailed, TaskRunFailed
+from smc.administration.tasks import TaskOperationPoller
+from smc.administration.upgrade import UpgradeManager
+
+
+def poller(success=True):
+    return TaskOperationPoller({'in_progress': False,
+                                'success': success, 'last_message': 'msg'})
+
+
+def package(links=('download', 'activate'), state='Available'):
+    package = mock.Mock(state=state)
+    package.name = 'Update Package 1000'
+    package.data.links = dict((rel, 'http://1.1.1.1/' + rel)
+                              for rel in links)
+    package.download.return_value = poller()
+    package.activate.return_value = mock.Mock(**{
+        'result.return_value': poller().result()})
+    return package
+
+
+class TestUpgradeManager(unittest.TestCase):
+
+    def test_download_and_activate(self):
+        pkg = package()
+        report = UpgradeManager(pkg).run()
+        pkg.download.assert_called_once_with(
+            wait_for_finish=True, polling=mock.ANY)
+        self.assertEqual(sorted(report.phases), ['activate', 'download'])
+        self.assertIsNone(report.rollout)
+
+    def test_downloaded_package_is_not_downloaded_again(self):
+        pkg = package(links=('activate',), state='Downloaded')
+        with mock.patch('smc.administration.upgrade.logger') as logger:
+            UpgradeManager(pkg).download()
+        self.assertFalse(pkg.download.called)
+        self.assertIn('Downloaded', logger.info.call_args[0])
+
+    def test_download_failure_is_raised(self):
+        pkg = package()
+        pkg.download.side_effect = ActionCommandFailed('No permission')
+        self.assertRaises(ActionCommandFailed, UpgradeManager(pkg).download)
+
+    def test_failed_task_raises(self):
+        pkg = package()
+        pkg.download.return_value = poller(success=False)
+        self.assertRaises(TaskRunFailed, UpgradeManager(pkg).download)
+        task = mock.Mock(in_progress=True)
+        pkg.activate.return_value.result.return_value = task
+        self.assertRaises(TaskRunFailed, UpgradeManager(pkg).activate)
+        task.abort.assert_called_once_with()
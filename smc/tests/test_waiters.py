@@ -0,0 +1,121 @@
+import time
+import unittest
+from concurrent import futures
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.base.polling import FixedInterval
+from smc.core.node import NodeStatus
+from smc.core.waiters import StatusMonitor, NodeStatusWaiter, \
+    NodeStateWaiter
+
+
+class Node(object):
+
+    def __init__(self, href, *statuses):
+        self.href = href
+        self.statuses = list(statuses)
+        self.reads = 0
+
+    def status(self):
+        self.reads += 1
+        status = self.statuses.pop(0) if len(self.statuses) > 1 \
+            else self.statuses[0]
+        if isinstance(status, Exception):
+            raise status
+        return NodeStatus(status=status)
+
+
+class TestNodeWaiter(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = StatusMonitor(max_workers=2)
+        patcher = mock.patch('smc.core.waiters.status_monitor', self.monitor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def waiter(self, node, status='Online', interval=0.01, **kw):
+        return NodeStatusWaiter(
+            node, status, polling=FixedInterval(interval, **kw))
+
+    def test_waiter_is_future(self):
+        node = Node('http://1.1.1.1/node/1', 'Offline', 'Online')
+        waiter = self.waiter(node)
+        received = []
+        waiter.add_done_callback(received.append)
+        done, _ = futures.wait([waiter], timeout=5)
+        self.assertEqual(done, set([waiter]))
+        self.assertEqual(waiter.result(), 'Online')
+        self.assertEqual(received, [waiter])
+        self.assertEqual(len(self.monitor), 0)
+
+    def test_read_error_raised_from_result(self):
+        node = Node('http://1.1.1.1/node/1', ValueError('failed'))
+        waiter = self.waiter(node)
+        self.assertRaises(ValueError, waiter.result, 5)
+
+    def test_result_returns_last_status_until_done(self):
+        node = Node('http://1.1.1.1/node/1', 'Offline')
+        waiter = self.waiter(node, interval=60)
+        self.assertIsNone(waiter.result(0))
+        self.assertFalse(waiter.done())
+        waiter.stop()
+        self.assertTrue(waiter.done())
+        self.assertEqual(len(self.monitor), 0)
+
+    def test_notify_completes_waiter(self):
+        node = Node('http://1.1.1.1/node/1', 'Offline')
+        waiter = self.waiter(node, interval=60)
+        self.monitor.notify(node.href, {'status': 'Online'})
+        self.assertTrue(waiter.done())
+        self.assertEqual(waiter.result(), 'Online')
+        self.assertEqual(node.reads, 0)
+
+    def test_partial_status_keeps_other_fields(self):
+        node = Node('http://1.1.1.1/node/1', 'Offline')
+        state = NodeStateWaiter(node, 'READY', polling=FixedInterval(60))
+        self.monitor.notify(node.href, {'state': 'INITIAL'})
+        self.monitor.notify(node.href, {'status': 'Online'})
+        self.assertFalse(state.done())
+        self.assertEqual(state.result(0), 'INITIAL')
+        state.stop()
+        self.assertEqual(state.result(), 'INITIAL')
+
+    def test_callback_can_wait_on_another_waiter(self):
+        node = Node('http://1.1.1.1/node/1', 'Online')
+        results = []
+
+        def callback(waiter):
+            other = self.waiter(node)
+            other.wait(5)
+            results.append(other.done())
+        with self.monitor._cond:  # Add callback before completion
+            waiter = self.waiter(node)
+            waiter.add_done_callback(callback)
+        waiter.wait(5)
+        for _ in range(50):
+            if results:
+                break
+            time.sleep(0.1)
+        self.assertEqual(results, [True])
+
+    def test_waiters_on_same_node_share_reads(self):
+        node = Node('http://1.1.1.1/node/1', 'Offline')
+        with self.monitor._cond:  # All waiters become due together
+            waiters = [self.waiter(node, max_tries=1) for _ in range(3)]
+            time.sleep(0.05)
+        futures.wait(waiters, timeout=5)
+        self.assertTrue(all(waiter.done() for waiter in waiters))
+        self.assertEqual(node.reads, 1)
+
+    def test_cancel_removes_waiter(self):
+        node = Node('http://1.1.1.1/node/1', 'Offline')
+        waiter = self.waiter(node, interval=60)
+        self.assertEqual(len(self.monitor), 1)
+        self.assertTrue(waiter.cancel())
+        self.assertTrue(waiter.cancelled())
+        self.assertEqual(len(self.monitor), 0)
+        self.assertNotIn(node.href, self.monitor._waiters)
+        self.monitor.notify(node.href, {'status': 'Online'})
+        self.assertTrue(waiter.cancelled())
@@ -0,0 +1,71 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:  # Python 2.7
+    import mock
+from smc.api.common import SMCRequest
+from smc.api.web import SMCAPIConnection
+from smc.base.model import SimpleElement
+from smc.elements.network import Host
+
+
+def response(code, etag=None):
+    return mock.Mock(status_code=code, headers={'ETag': etag} if etag
+                     else {}, encoding=None)
+
+
+class TestDelete(unittest.TestCase):
+
+    def setUp(self):
+        self.http = mock.Mock()
+        self.connection = SMCAPIConnection(
+            mock.Mock(timeout=10, session=self.http))
+        self.request = SMCRequest(href='http://1.1.1.1/elements/host/1',
+                                  headers={'if-match': 'old'})
+
+    def send(self):
+        return self.connection.send_request(
+            SMCAPIConnection.DELETE, self.request)
+
+    def test_conflict_retries_with_etag_from_response(self):
+        self.http.delete.side_effect = [response(409, 'new'), response(204)]
+        self.assertEqual(self.send().code, 204)
+        self.assertFalse(self.http.get.called)
+        self.assertEqual(self.http.delete.call_args[1]['headers'],
+                         {'if-match': 'new'})
+
+    def test_conflict_without_etag_reads_element(self):
+        self.http.delete.side_effect = [response(409), response(204)]
+        self.http.get.return_value = response(200, 'current')
+        self.assertEqual(self.send().code, 204)
+        self.assertEqual(self.http.get.call_count, 1)
+        self.assertEqual(self.http.delete.call_args[1]['headers'],
+                         {'if-match': 'current'})
+
+
+class TestUnconditionalDelete(unittest.TestCase):
+
+    def setUp(self):
+        self.element = Host('web', href='http://1.1.1.1/elements/host/1',
+                            type='host')
+        patcher = mock.patch.object(Host, 'del_cmd')
+        self.del_cmd = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unconditional_delete_has_no_precondition(self):
+        with mock.patch('smc.base.model.LoadElement') as load:
+            self.element.delete(unconditional=True)
+            self.assertFalse(load.called)
+        self.assertNotIn('headers', self.del_cmd.call_args[1])
+
+    def test_session_default(self):
+        with mock.patch('smc.base.model.session') as session:
+            session.UNCONDITIONAL_DELETE = True
+            self.element.delete()
+        self.assertNotIn('headers', self.del_cmd.call_args[1])
+
+    def test_conditional_delete_uses_etag(self):
+        self.element.data = SimpleElement(etag='etag1', name='web')
+        self.element.delete(unconditional=False)
+        self.assertEqual(self.del_cmd.call_args[1]['headers'],
+                         {'if-match': 'etag1'})